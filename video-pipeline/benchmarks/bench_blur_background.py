@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark the 9:16 to 16:9 blurred background filter graphs side by side.
+
+Each variant runs the transcoder's own filter graph into a null output, so
+the timings cover decode and filtering only (no encode). PSNR against the
+full-size gaussian blur shows how close the cheaper graphs look.
+
+Usage:
+    python benchmarks/bench_blur_background.py [input/vertical.mp4] [--background-fps 10]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import ffmpeg
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.video_transcoder import VideoTranscoder
+
+def make_source(path, duration):
+    """Render a synthetic 1080x1920 test video."""
+    (
+        ffmpeg
+        .input(f'testsrc2=size=1080x1920:rate=30:duration={duration}', format='lavfi')
+        .output(path, vcodec='libx264', pix_fmt='yuv420p', preset='ultrafast')
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+def get_video_info(video_path):
+    """Read width, height and fps of a video."""
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return width, height, fps
+
+def make_transcoder(work_dir, blur_mode, background_fps=None):
+    """Create a transcoder configured for one background variant."""
+    return VideoTranscoder(
+        temp_dir=work_dir,
+        output_dir=work_dir,
+        blur_mode=blur_mode,
+        background_fps=background_fps
+    )
+
+def time_variant(transcoder, video_path, width, height, fps, threads):
+    """Run one filter graph into a null output and return (seconds, frames)."""
+    graph = transcoder._apply_16_9_filters(ffmpeg.input(video_path), width, height, fps)
+    command = graph.output('-', format='null', threads=threads).compile()
+    
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    seconds = time.perf_counter() - start
+    
+    frames = re.findall(r'frame=\s*(\d+)', result.stderr)
+    return seconds, int(frames[-1]) if frames else 0
+
+def measure_psnr(reference, candidate, video_path, width, height, fps):
+    """Average PSNR of a candidate graph against the reference graph."""
+    branches = ffmpeg.input(video_path).video.split()
+    ref = reference._apply_16_9_filters(branches[0], width, height, fps)
+    cand = candidate._apply_16_9_filters(branches[1], width, height, fps)
+    
+    command = ffmpeg.filter([cand, ref], 'psnr').output('-', format='null').compile()
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    
+    match = re.search(r'PSNR .*average:([\d.]+|inf)', result.stderr)
+    return float(match.group(1)) if match else None
+
+def main():
+    """Run the blurred background benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark blurred background filter graphs')
+    parser.add_argument('video', nargs='?', help='9:16 video to convert (default: synthetic source)')
+    parser.add_argument('--duration', type=int, default=10, help='Synthetic source length in seconds (default: 10)')
+    parser.add_argument('--background-fps', type=float, default=10, help='Reduced background rate to test (default: 10)')
+    parser.add_argument('--threads', type=int, default=0, help='ffmpeg threads (default: auto)')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        video_path = args.video
+        if not video_path:
+            video_path = os.path.join(work_dir, 'source_9x16.mp4')
+            make_source(video_path, args.duration)
+        
+        width, height, fps = get_video_info(video_path)
+        
+        variants = {
+            'gblur': make_transcoder(work_dir, 'gblur'),
+            'fast': make_transcoder(work_dir, 'fast'),
+            f'fast_{args.background_fps:g}fps': make_transcoder(work_dir, 'fast', args.background_fps)
+        }
+        
+        results = {'video': args.video or 'synthetic', 'resolution': f"{width}x{height}", 'variants': {}}
+        for name, transcoder in variants.items():
+            seconds, frames = time_variant(transcoder, video_path, width, height, fps, args.threads)
+            results['variants'][name] = {
+                'seconds': seconds,
+                'frames': frames,
+                'fps': frames / seconds if seconds else 0.0,
+                'psnr_vs_gblur': measure_psnr(variants['gblur'], transcoder, video_path, width, height, fps)
+            }
+    
+    print(f"\n{results['video']} ({results['resolution']})")
+    print(f"  {'variant':<16} {'seconds':>8} {'fps':>7} {'speedup':>8} {'PSNR dB':>8}")
+    
+    baseline = results['variants']['gblur']['seconds']
+    for name, result in results['variants'].items():
+        speedup = baseline / result['seconds'] if result['seconds'] else 0.0
+        psnr = f"{result['psnr_vs_gblur']:.1f}" if result['psnr_vs_gblur'] is not None else '-'
+        print(f"  {name:<16} {result['seconds']:>8.2f} {result['fps']:>7.1f} {speedup:>7.1f}x {psnr:>8}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark face detection at full resolution against the downscaled and
+threaded detection pipeline.
+
+Usage:
+    python benchmarks/bench_face_detection.py input/video.mp4 [more videos...]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.face_detector import FaceDetector
+from src.frame_sampler import FrameSampler
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = ix * iy
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union else 0.0
+
+def compare_detections(reference, candidate):
+    """Match candidate boxes to reference boxes and summarize accuracy."""
+    matched = 0
+    center_errors = []
+    candidate_total = sum(len(faces) for faces in candidate)
+    reference_total = sum(len(faces) for faces in reference)
+    
+    for ref_faces, cand_faces in zip(reference, candidate):
+        remaining = list(cand_faces)
+        for ref in ref_faces:
+            best = max(remaining, key=lambda c: iou(ref, c), default=None)
+            if best is not None and iou(ref, best) >= 0.5:
+                remaining.remove(best)
+                matched += 1
+                center_errors.append(np.hypot(
+                    (ref[0] + ref[2] / 2) - (best[0] + best[2] / 2),
+                    (ref[1] + ref[3] / 2) - (best[1] + best[3] / 2)
+                ))
+    
+    return {
+        'reference_faces': reference_total,
+        'candidate_faces': candidate_total,
+        'recall': matched / reference_total if reference_total else 1.0,
+        'precision': matched / candidate_total if candidate_total else 1.0,
+        'mean_center_error_px': float(np.mean(center_errors)) if center_errors else 0.0
+    }
+
+def crop_center_x(detections):
+    """Average face center_x, as used for the static crop."""
+    centers = [x + w / 2 for faces in detections for x, y, w, h in faces]
+    return float(np.mean(centers)) if centers else None
+
+def time_detection(detector, frames, batched):
+    """Run detection over frames and return (detections, seconds)."""
+    start = time.perf_counter()
+    if batched:
+        detections = detector.detect_faces_batch(frames)
+    else:
+        detections = [detector.detect_faces_in_frame(frame) for frame in frames]
+    return detections, time.perf_counter() - start
+
+def benchmark_video(video_path, frame_count, analysis_width, threads):
+    """Benchmark the detection variants on one video."""
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / (cap.get(cv2.CAP_PROP_FPS) or 30.0)
+    cap.release()
+    
+    # Full-resolution frames so every variant starts from the same input
+    sampler = FrameSampler(analysis_width=None)
+    frames = [frame for _, frame in sampler.sample(video_path, width, height, duration, frame_count)]
+    
+    variants = {
+        'full_res': (FaceDetector(analysis_width=None, detection_threads=1), False),
+        'downscaled': (FaceDetector(analysis_width=analysis_width, detection_threads=1), False),
+        'downscaled_threaded': (FaceDetector(analysis_width=analysis_width, detection_threads=threads), True)
+    }
+    
+    results = {'video': video_path, 'resolution': f"{width}x{height}", 'frames': len(frames), 'variants': {}}
+    reference = None
+    
+    for name, (detector, batched) in variants.items():
+        detections, seconds = time_detection(detector, frames, batched)
+        if reference is None:
+            reference = detections
+        
+        result = {
+            'seconds': seconds,
+            'ms_per_frame': seconds * 1000 / max(1, len(frames)),
+            'crop_center_x': crop_center_x(detections)
+        }
+        result.update(compare_detections(reference, detections))
+        results['variants'][name] = result
+    
+    return results
+
+def main():
+    """Run the face detection benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark downscaled face detection')
+    parser.add_argument('videos', nargs='+', help='Video files to analyze')
+    parser.add_argument('--frames', type=int, default=20, help='Frames to sample per video (default: 20)')
+    parser.add_argument('--analysis-width', type=int, default=640, help='Downscaled analysis width (default: 640)')
+    parser.add_argument('--threads', type=int, default=min(8, os.cpu_count() or 1), help='Detection threads')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+    
+    all_results = []
+    
+    for video_path in args.videos:
+        results = benchmark_video(video_path, args.frames, args.analysis_width, args.threads)
+        all_results.append(results)
+        
+        print(f"\n{video_path} ({results['resolution']}, {results['frames']} frames)")
+        print(f"  {'variant':<22} {'ms/frame':>9} {'speedup':>8} {'recall':>7} {'precision':>9} {'ctr err':>8} {'crop x':>8}")
+        
+        baseline = results['variants']['full_res']['seconds']
+        for name, result in results['variants'].items():
+            speedup = baseline / result['seconds'] if result['seconds'] else 0.0
+            crop_x = f"{result['crop_center_x']:.0f}" if result['crop_center_x'] is not None else '-'
+            print(f"  {name:<22} {result['ms_per_frame']:>9.1f} {speedup:>7.1f}x "
+                  f"{result['recall']:>7.2f} {result['precision']:>9.2f} "
+                  f"{result['mean_center_error_px']:>8.1f} {crop_x:>8}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(all_results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Benchmark the transcoding hot paths on synthetic fixture videos.
+
+Fixtures are rendered locally with ffmpeg's testsrc2/sine sources at each
+requested size and duration, and reused between runs. Every case runs in a
+fresh forked process so its peak memory (Python plus ffmpeg children) is
+measured on its own. Results can be saved as a JSON baseline, and later runs
+compared against it to flag regressions.
+
+Usage:
+    python benchmarks/bench_pipeline.py --json baseline.json
+    python benchmarks/bench_pipeline.py --baseline baseline.json [--tolerance 0.15]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import ffmpeg
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.media_info import probe_media
+from src.utils import determine_aspect_ratio
+from src.video_transcoder import VideoTranscoder
+
+FIXTURE_FPS = 30
+DEFAULT_SIZES = '1280x720,1920x1080,720x1280,1080x1920'
+DEFAULT_DURATIONS = '5,20'
+# Slowdowns smaller than this are timer noise, whatever the ratio
+MIN_SLOWDOWN_SECONDS = 0.1
+
+def make_fixture(fixtures_dir, width, height, duration):
+    """Render a synthetic H.264/AAC test clip unless it already exists."""
+    path = os.path.join(fixtures_dir, f'testsrc_{width}x{height}_{duration}s.mp4')
+    if os.path.exists(path):
+        return path
+    
+    video = ffmpeg.input(f'testsrc2=size={width}x{height}:rate={FIXTURE_FPS}:duration={duration}', format='lavfi')
+    audio = ffmpeg.input(f'sine=frequency=440:sample_rate=48000:duration={duration}', format='lavfi')
+    
+    partial = path + '.part'
+    (
+        ffmpeg
+        .output(
+            video, audio, partial,
+            format='mp4',
+            vcodec='libx264',
+            pix_fmt='yuv420p',
+            preset='veryfast',
+            g=2 * FIXTURE_FPS,
+            acodec='aac',
+            audio_bitrate='128k'
+        )
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    os.replace(partial, path)
+    return path
+
+def make_transcoder(work_dir, **options):
+    """Create a transcoder writing into a case's own directory."""
+    return VideoTranscoder(
+        temp_dir=os.path.join(work_dir, 'processing'),
+        output_dir=os.path.join(work_dir, 'output'),
+        **options
+    )
+
+def run_case(case, inputs, work_dir, options):
+    """
+    Run one benchmark case; called in a fresh child process.
+    
+    Returns:
+        Tuple of (seconds, peak_rss_kb)
+    """
+    transcoder = make_transcoder(work_dir, **options)
+    input_path = inputs[0]
+    
+    # Probe up front so every case times the same work
+    media_info = probe_media(input_path)
+    aspect_ratio = determine_aspect_ratio(media_info.width, media_info.height)
+    
+    start = time.perf_counter()
+    
+    if case == 'process_video':
+        transcoder.process_video(input_path)
+    elif case in ('original_remux', 'original_encode'):
+        transcoder._create_original_version(input_path, aspect_ratio, media_info)
+    elif case == 'converted':
+        transcoder._create_converted_version(input_path, aspect_ratio, media_info)
+    elif case == 'crop_center':
+        transcoder.face_detector.get_optimal_crop_center(input_path, 9/16, media_info)
+    elif case == 'batch_process':
+        batch_dir = os.path.join(work_dir, 'batch_input')
+        os.makedirs(batch_dir, exist_ok=True)
+        for path in inputs:
+            os.symlink(os.path.abspath(path), os.path.join(batch_dir, os.path.basename(path)))
+        transcoder.batch_process(batch_dir)
+    else:
+        raise ValueError(f"Unknown case: {case}")
+    
+    seconds = time.perf_counter() - start
+    
+    # ru_maxrss is in kilobytes on Linux
+    peak_kb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    return seconds, peak_kb
+
+def time_case(case, inputs, frames, options, repeat):
+    """Run a case ``repeat`` times in isolated processes and keep the fastest."""
+    runs = []
+    context = multiprocessing.get_context('fork')
+    
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as work_dir:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                runs.append(executor.submit(run_case, case, inputs, work_dir, options).result())
+    
+    seconds = min(run[0] for run in runs)
+    return {
+        'seconds': seconds,
+        'fps': frames / seconds if seconds else 0.0,
+        'peak_rss_mb': max(run[1] for run in runs) / 1024,
+        'frames': frames
+    }
+
+def get_cases(fixtures):
+    """
+    List the benchmark cases for a set of fixtures.
+    
+    Returns:
+        List of (name, case, inputs, frames, transcoder options)
+    """
+    cases = []
+    
+    for path, width, height, duration in fixtures:
+        label = f'{width}x{height}_{duration}s'
+        frames = duration * FIXTURE_FPS
+        
+        cases.append((f'process_video/{label}', 'process_video', [path], frames, {}))
+        cases.append((f'original_remux/{label}', 'original_remux', [path], frames, {}))
+        cases.append((f'original_encode/{label}', 'original_encode', [path], frames, {'stream_copy': False}))
+        
+        if width > height:
+            cases.append((f'convert_16_9_to_9_16/{label}', 'converted', [path], frames, {}))
+            cases.append((f'crop_center/{label}', 'crop_center', [path], frames, {}))
+            cases.append((f'crop_center_saliency/{label}', 'crop_center', [path], frames, {'detector': 'saliency'}))
+        else:
+            cases.append((f'convert_9_16_to_16_9/{label}', 'converted', [path], frames, {}))
+    
+    all_frames = sum(duration * FIXTURE_FPS for _, _, _, duration in fixtures)
+    cases.append(('batch_process/all', 'batch_process', [path for path, _, _, _ in fixtures], all_frames, {}))
+    return cases
+
+def compare(results, baseline, tolerance, memory_tolerance):
+    """Flag cases that got slower or use more memory than the baseline."""
+    regressions = []
+    
+    for name, result in results['cases'].items():
+        base = baseline.get('cases', {}).get(name)
+        if not base:
+            continue
+        
+        result['seconds_vs_baseline'] = result['seconds'] / base['seconds'] if base['seconds'] else None
+        result['memory_vs_baseline'] = result['peak_rss_mb'] / base['peak_rss_mb'] if base['peak_rss_mb'] else None
+        
+        slowdown = result['seconds'] - base['seconds']
+        if result['seconds_vs_baseline'] and result['seconds_vs_baseline'] > 1 + tolerance and slowdown > MIN_SLOWDOWN_SECONDS:
+            regressions.append(f"{name}: {result['seconds']:.2f}s vs {base['seconds']:.2f}s baseline")
+        if result['memory_vs_baseline'] and result['memory_vs_baseline'] > 1 + memory_tolerance:
+            regressions.append(f"{name}: {result['peak_rss_mb']:.0f} MB vs {base['peak_rss_mb']:.0f} MB baseline")
+    
+    return regressions
+
+def get_environment():
+    """Describe the machine, so baselines are only compared like for like."""
+    version = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True).stdout.split('\n')[0]
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'ffmpeg': version
+    }
+
+def main():
+    """Run the pipeline benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark transcoding hot paths on synthetic videos')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'Comma-separated WxH fixture sizes (default: {DEFAULT_SIZES})')
+    parser.add_argument('--durations', default=DEFAULT_DURATIONS, help=f'Comma-separated fixture lengths in seconds (default: {DEFAULT_DURATIONS})')
+    parser.add_argument('--fixtures-dir', default=os.path.join(os.path.dirname(__file__), 'fixtures'), help='Where generated fixtures are kept')
+    parser.add_argument('--cases', help='Only run cases whose name contains one of these comma-separated strings')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case; the fastest is kept (default: 1)')
+    parser.add_argument('--json', help='Write results to this JSON file (use as a baseline later)')
+    parser.add_argument('--baseline', help='Compare against results saved with --json')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed slowdown vs the baseline (default: 0.15)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='Allowed peak memory growth vs the baseline (default: 0.25)')
+    args = parser.parse_args()
+    
+    if not shutil.which('ffmpeg'):
+        print("ffmpeg not found on PATH")
+        return 1
+    
+    os.makedirs(args.fixtures_dir, exist_ok=True)
+    
+    fixtures = []
+    for size in args.sizes.split(','):
+        width, height = (int(value) for value in size.lower().split('x'))
+        for duration in args.durations.split(','):
+            duration = int(duration)
+            fixtures.append((make_fixture(args.fixtures_dir, width, height, duration), width, height, duration))
+    
+    cases = get_cases(fixtures)
+    if args.cases:
+        wanted = args.cases.split(',')
+        cases = [case for case in cases if any(w in case[0] for w in wanted)]
+    
+    results = {'environment': get_environment(), 'cases': {}}
+    for name, case, inputs, frames, options in cases:
+        print(f"  running {name}...", flush=True)
+        results['cases'][name] = time_case(case, inputs, frames, options, args.repeat)
+    
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != results['environment']:
+            print("Warning: baseline was recorded on a different environment")
+        regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+    
+    print(f"\n  {'case':<40} {'seconds':>8} {'fps':>8} {'peak MB':>8} {'vs base':>8}")
+    for name, result in results['cases'].items():
+        ratio = result.get('seconds_vs_baseline')
+        ratio = f"{ratio:.2f}x" if ratio else '-'
+        print(f"  {name:<40} {result['seconds']:>8.2f} {result['fps']:>8.1f} {result['peak_rss_mb']:>8.0f} {ratio:>8}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,42 +9,24 @@ that converts videos between 16:9 and 9:16 aspect ratios for multi-platform deli
 import argparse
 import logging
 import os
+import signal
 import sys
-import time
+import threading
 from pathlib import Path
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
 from dotenv import load_dotenv
 
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from video_transcoder import VideoTranscoder
-from utils import setup_logging, validate_video_file
-
-class VideoFileHandler(FileSystemEventHandler):
-    """File system event handler for monitoring new video files."""
-    
-    def __init__(self, transcoder: VideoTranscoder):
-        self.transcoder = transcoder
-        self.logger = logging.getLogger(__name__)
-        
-    def on_created(self, event):
-        """Handle new file creation events."""
-        if event.is_directory:
-            return
-            
-        file_path = event.src_path
-        
-        # Wait a moment for file to be fully written
-        time.sleep(2)
-        
-        if validate_video_file(file_path):
-            self.logger.info(f"New video detected: {file_path}")
-            try:
-                self.transcoder.process_video(file_path)
-            except Exception as e:
-                self.logger.error(f"Failed to process {file_path}: {e}")
+from job_queue import JobQueue
+from transcoder_service import TranscoderService
+from file_watcher import FileWatcher
+from ingest_server import IngestServer
+from metrics import ProgressLogger
+from encoding_profiles import CATEGORY_PROFILES, PROFILES, get_category_from_path
+from utils import setup_logging
 
 def main():
     """Main entry point for the video transcoder pipeline."""
@@ -61,6 +43,8 @@ Examples:
   %(prog)s --batch input/                       # Process all videos in directory
   %(prog)s --monitor input/                     # Monitor directory for new videos
   %(prog)s --monitor --input input/ --output output/  # Custom directories
+  %(prog)s --serve                              # Run queue worker for the webhook
+  %(prog)s --ingest --port 3000                 # Receive webhook videos and transcode in-process
         """
     )
     
@@ -87,12 +71,69 @@ Examples:
         help='Process all videos in input directory'
     )
     
+    parser.add_argument(
+        '--batch-manifest',
+        default=os.getenv('BATCH_MANIFEST'),
+        help='Record finished batch inputs here and skip them on reruns (default: disabled)'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Reprocess batch inputs the manifest lists as done'
+    )
+    
     parser.add_argument(
         '--monitor',
         action='store_true',
         help='Monitor input directory for new videos'
     )
     
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Run a persistent worker that processes jobs from the queue directory'
+    )
+    
+    parser.add_argument(
+        '--ingest',
+        action='store_true',
+        help='Serve the webhook routes over HTTP and transcode received videos in this process'
+    )
+    
+    parser.add_argument(
+        '--host',
+        default=os.getenv('INGEST_HOST', '0.0.0.0'),
+        help='Address the --ingest server listens on (default: 0.0.0.0)'
+    )
+    
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=os.getenv('PORT', '3000'),
+        help='Port the --ingest server listens on (default: 3000)'
+    )
+    
+    parser.add_argument(
+        '--queue-dir',
+        default=os.getenv('QUEUE_DIR', 'queue'),
+        help='Job queue directory used by --serve, --ingest and --monitor (default: queue/)'
+    )
+    
+    parser.add_argument(
+        '--job-lease',
+        type=float,
+        default=float(os.getenv('JOB_LEASE_SECONDS', '60')),
+        help='Seconds before a running job whose service stopped renewing it is requeued (default: 60)'
+    )
+    
+    parser.add_argument(
+        '--settle-time',
+        type=float,
+        default=os.getenv('MONITOR_SETTLE_SECONDS', '5'),
+        help='Seconds a new file must stop changing before --monitor processes it (default: 5)'
+    )
+    
     parser.add_argument(
         '--video-bitrate',
         default=os.getenv('VIDEO_BITRATE', '2M'),
@@ -105,6 +146,183 @@ Examples:
         help='Audio bitrate for encoding (default: 128k)'
     )
     
+    parser.add_argument(
+        '--profile',
+        choices=list(PROFILES),
+        default=os.getenv('ENCODING_PROFILE'),
+        help='Encoding speed/quality tier (default: libx264 at --video-bitrate)'
+    )
+    
+    parser.add_argument(
+        '--category',
+        choices=list(CATEGORY_PROFILES),
+        help='Webhook category of --input, picks per-output profiles with --category-profiles (default: from the input directory name)'
+    )
+    
+    parser.add_argument(
+        '--category-profiles',
+        action='store_true',
+        default=os.getenv('CATEGORY_PROFILES', 'false').lower() == 'true',
+        help='Pick encoding profiles per output from the webhook category (default: --profile or --video-bitrate for every job)'
+    )
+    
+    parser.add_argument(
+        '--single-decode',
+        action='store_true',
+        default=os.getenv('SINGLE_DECODE', 'false').lower() == 'true',
+        help='Decode the source once and encode both versions from one ffmpeg process'
+    )
+    
+    parser.add_argument(
+        '--no-stream-copy',
+        dest='stream_copy',
+        action='store_false',
+        default=os.getenv('STREAM_COPY', 'true').lower() == 'true',
+        help='Always re-encode the original aspect version, even for compliant sources'
+    )
+    
+    parser.add_argument(
+        '--segment-threshold',
+        type=float,
+        default=os.getenv('SEGMENT_THRESHOLD'),
+        help='Encode videos at least this many seconds long in parallel segments (default: disabled)'
+    )
+    
+    parser.add_argument(
+        '--segments',
+        type=int,
+        default=os.getenv('SEGMENT_COUNT'),
+        help='Parallel segments per segmented encode (default: half the thread budget)'
+    )
+    
+    parser.add_argument(
+        '--crop-mode',
+        choices=['static', 'tracking', 'scene'],
+        default=os.getenv('CROP_MODE', 'static'),
+        help='16:9 to 9:16 crop: one position, follow the subject, or re-center per scene (default: static)'
+    )
+    
+    parser.add_argument(
+        '--detector',
+        choices=['haar', 'dnn', 'saliency'],
+        default=os.getenv('FACE_DETECTOR', 'haar'),
+        help='Crop analysis backend: Haar cascade, OpenCV DNN face detector, or most salient region (default: haar)'
+    )
+    
+    parser.add_argument(
+        '--detector-model',
+        default=os.getenv('FACE_DETECTION_MODEL'),
+        help='Haar cascade (path or bundled OpenCV name) or DNN model (.caffemodel or YuNet .onnx)'
+    )
+    
+    parser.add_argument(
+        '--detector-config',
+        default=os.getenv('FACE_DETECTION_CONFIG'),
+        help='deploy.prototxt of a res10 SSD --detector-model'
+    )
+    
+    parser.add_argument(
+        '--subject-fallback',
+        action='store_true',
+        default=os.getenv('SUBJECT_FALLBACK', 'false').lower() == 'true',
+        help='Crop to the most salient region in frames without faces'
+    )
+    
+    parser.add_argument(
+        '--adaptive-crop-tolerance',
+        type=float,
+        default=os.getenv('ADAPTIVE_CROP_TOLERANCE'),
+        help='Static crop: stop sampling once the crop center is known to within this many pixels (default: always 20 frames)'
+    )
+    
+    parser.add_argument(
+        '--blur-mode',
+        choices=['fast', 'gblur'],
+        default=os.getenv('BLUR_MODE', 'gblur'),
+        help='9:16 to 16:9 background blur: full-size gaussian or box blur at 1/8 scale (default: gblur)'
+    )
+    
+    parser.add_argument(
+        '--background-fps',
+        type=float,
+        default=os.getenv('BLUR_BACKGROUND_FPS'),
+        help='Update the fast blurred background at this frame rate (default: every frame)'
+    )
+    
+    parser.add_argument(
+        '--hls-ladder',
+        type=lambda value: [int(size) for size in value.split(',') if size.strip()] or None,
+        default=os.getenv('HLS_LADDER'),
+        help='Also package outputs as HLS with these rendition sizes (short side), e.g. 1080,720,480 (default: disabled)'
+    )
+    
+    parser.add_argument(
+        '--hls-segment-seconds',
+        type=float,
+        default=os.getenv('HLS_SEGMENT_SECONDS', '4'),
+        help='Target HLS segment duration in seconds (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--thumbnails',
+        action='store_true',
+        default=os.getenv('THUMBNAILS', 'false').lower() == 'true',
+        help='Also write a poster, sprite sheet and WebVTT sprite index for every output'
+    )
+    
+    parser.add_argument(
+        '--thumbnail-format',
+        choices=['jpg', 'webp'],
+        default=os.getenv('THUMBNAIL_FORMAT', 'jpg'),
+        help='Image format of posters and sprite sheets (default: jpg)'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        default=os.getenv('RESULT_CACHE_DIR'),
+        help='Reuse outputs of identical inputs from this cache directory (default: disabled)'
+    )
+    
+    parser.add_argument(
+        '--cache-max-gb',
+        type=float,
+        default=os.getenv('RESULT_CACHE_MAX_GB', '20'),
+        help='Size limit of the result cache in GB (default: 20)'
+    )
+    
+    parser.add_argument(
+        '--analysis-cache',
+        default=os.getenv('ANALYSIS_CACHE'),
+        help='SQLite file storing crop analysis results, so re-encodes skip face detection (default: disabled)'
+    )
+    
+    parser.add_argument(
+        '--metrics-dir',
+        default=os.getenv('METRICS_DIR'),
+        help='Write per-job stage metrics (JSON lines and a Prometheus textfile) here (default: disabled)'
+    )
+    
+    parser.add_argument(
+        '--stall-timeout',
+        type=float,
+        default=os.getenv('FFMPEG_STALL_TIMEOUT'),
+        help='Kill ffmpeg after this many seconds without progress (default: no timeout)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.getenv('MAX_CONCURRENT_JOBS'),
+        help='Concurrent jobs for batch and serve modes (default: CPU count / 4)'
+    )
+    
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=os.getenv('FFMPEG_THREADS'),
+        help='ffmpeg threads per encode (default: even share of cores per job)'
+    )
+    
     parser.add_argument(
         '--log-level',
         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
@@ -125,10 +343,10 @@ Examples:
     logger = logging.getLogger(__name__)
     
     # Validate arguments
-    if not args.input and not args.monitor:
-        parser.error("Must specify --input or --monitor")
+    if not args.input and not args.monitor and not args.serve and not args.ingest:
+        parser.error("Must specify --input, --monitor, --serve or --ingest")
     
-    if args.monitor and not args.input:
+    if (args.monitor or args.ingest) and not args.input:
         args.input = os.getenv('INPUT_DIR', 'input')
     
     # Initialize transcoder
@@ -137,7 +355,34 @@ Examples:
             temp_dir=args.temp_dir,
             output_dir=args.output,
             video_bitrate=args.video_bitrate,
-            audio_bitrate=args.audio_bitrate
+            audio_bitrate=args.audio_bitrate,
+            single_decode=args.single_decode,
+            max_workers=args.workers,
+            ffmpeg_threads=args.threads,
+            crop_mode=args.crop_mode,
+            cache_dir=args.cache_dir,
+            cache_max_bytes=int(args.cache_max_gb * 1024 ** 3),
+            stream_copy=args.stream_copy,
+            segment_threshold=args.segment_threshold,
+            segment_count=args.segments,
+            blur_mode=args.blur_mode,
+            background_fps=args.background_fps,
+            profile=args.profile,
+            category_profiles=args.category_profiles,
+            metrics_dir=args.metrics_dir,
+            progress_callback=ProgressLogger(),
+            stall_timeout=args.stall_timeout,
+            batch_manifest=args.batch_manifest,
+            hls_ladder=args.hls_ladder,
+            hls_segment_seconds=args.hls_segment_seconds,
+            thumbnails=args.thumbnails,
+            thumbnail_format=args.thumbnail_format,
+            analysis_cache=args.analysis_cache,
+            detector=args.detector,
+            detector_model=args.detector_model,
+            detector_config=args.detector_config,
+            subject_fallback=args.subject_fallback,
+            adaptive_crop_tolerance=args.adaptive_crop_tolerance
         )
         logger.info("Video transcoder initialized successfully")
     except Exception as e:
@@ -146,7 +391,42 @@ Examples:
     
     # Process videos based on mode
     try:
-        if args.monitor:
+        if args.serve:
+            # Queue worker mode
+            job_queue = JobQueue(args.queue_dir, args.job_lease)
+            service = TranscoderService(transcoder, job_queue, workers=args.workers)
+            signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+            
+            logger.info(f"Starting queue worker on: {args.queue_dir}")
+            logger.info("Press Ctrl+C to stop serving...")
+            
+            try:
+                service.run()
+            except KeyboardInterrupt:
+                logger.info("Stopping queue worker...")
+            
+        elif args.ingest:
+            # HTTP ingestion: the server thread streams videos in, the service transcodes them
+            job_queue = JobQueue(args.queue_dir, args.job_lease)
+            service = TranscoderService(transcoder, job_queue, workers=args.workers)
+            server = IngestServer(job_queue, input_dir=args.input, host=args.host, port=args.port)
+            signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+            
+            server_thread = threading.Thread(target=server.run, name="ingest-server", daemon=True)
+            server_thread.start()
+            
+            logger.info(f"Receiving videos on {args.host}:{args.port}, saving to {args.input}")
+            logger.info("Press Ctrl+C to stop...")
+            
+            try:
+                service.run()
+            except KeyboardInterrupt:
+                logger.info("Stopping ingest server...")
+            finally:
+                server.stop()
+                server_thread.join(timeout=10)
+            
+        elif args.monitor:
             # Monitor mode
             input_path = Path(args.input)
             if not input_path.exists():
@@ -156,18 +436,28 @@ Examples:
             logger.info(f"Starting monitor mode on directory: {args.input}")
             logger.info("Press Ctrl+C to stop monitoring...")
             
-            event_handler = VideoFileHandler(transcoder)
+            # The watcher only enqueues finished files; the service's workers transcode them
+            job_queue = JobQueue(args.queue_dir, args.job_lease)
+            service = TranscoderService(transcoder, job_queue, workers=args.workers)
+            signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+            
+            watcher = FileWatcher(
+                lambda path: job_queue.enqueue(path, get_category_from_path(path)),
+                settle_time=args.settle_time
+            )
             observer = Observer()
-            observer.schedule(event_handler, str(input_path), recursive=True)
+            observer.schedule(watcher, str(input_path), recursive=True)
             observer.start()
+            watcher.start()
             
             try:
-                while True:
-                    time.sleep(1)
+                service.run()
             except KeyboardInterrupt:
                 logger.info("Stopping monitor mode...")
+            finally:
                 observer.stop()
-            observer.join()
+                watcher.stop()
+                observer.join()
             
         elif args.batch:
             # Batch processing mode
@@ -176,13 +466,14 @@ Examples:
                 sys.exit(1)
             
             logger.info(f"Starting batch processing of directory: {args.input}")
-            results = transcoder.batch_process(args.input)
+            results = transcoder.batch_process(args.input, force=args.force)
             
             # Print summary
             logger.info("=== Processing Summary ===")
             logger.info(f"Successfully processed: {len(results['processed'])} videos")
             logger.info(f"Failed to process: {len(results['failed'])} videos")
             logger.info(f"Skipped: {len(results['skipped'])} videos")
+            logger.info(f"Unchanged since last batch: {len(results['unchanged'])} videos")
             
             if results['failed']:
                 logger.warning("Failed videos:")
@@ -196,7 +487,8 @@ Examples:
                 sys.exit(1)
             
             logger.info(f"Processing single video: {args.input}")
-            output_files = transcoder.process_video(args.input)
+            category = args.category or get_category_from_path(args.input)
+            output_files = transcoder.process_video(args.input, category)
             
             logger.info("=== Processing Complete ===")
             logger.info(f"Input: {args.input}")
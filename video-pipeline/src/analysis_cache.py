@@ -0,0 +1,126 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .utils import ensure_directory, compute_file_fingerprint
+
+class AnalysisCache:
+    """
+    Persistent store of crop analysis results.
+    
+    Entries are keyed on the source fingerprint, the analysis kind and its
+    parameters, and the face detector settings (including the model file),
+    so re-encoding a video with other bitrates or profiles skips face
+    detection, while changing anything that affects detection misses.
+    Results are small JSON documents; entries unused for ``max_age_days``
+    are pruned.
+    """
+    
+    # Bump when the stored result format changes
+    CACHE_VERSION = 1
+    
+    def __init__(self, db_path: str, max_age_days: float = 90):
+        """
+        Initialize analysis cache.
+        
+        Args:
+            db_path: Path to the SQLite store
+            max_age_days: Drop entries not used for this many days
+        """
+        self.db_path = db_path
+        self.max_age_days = max_age_days
+        self.logger = logging.getLogger(__name__)
+        
+        ensure_directory(str(Path(db_path).parent))
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, "
+                "params TEXT NOT NULL, result TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "DELETE FROM analyses WHERE last_used < ?",
+                (time.time() - max_age_days * 86400,)
+            )
+    
+    def make_key(self, video_path: str, kind: str, params: dict) -> str:
+        """
+        Build the key for an analysis of a video.
+        
+        Args:
+            video_path: Path to video file
+            kind: Analysis kind, e.g. "static", "tracking" or "scene"
+            params: Analysis and detector parameters
+        
+        Returns:
+            Hex cache key
+        """
+        key_data = json.dumps({
+            'version': self.CACHE_VERSION,
+            'fingerprint': compute_file_fingerprint(video_path),
+            'kind': kind,
+            'params': params
+        }, sort_keys=True)
+        return hashlib.sha256(key_data.encode()).hexdigest()
+    
+    def lookup(self, key: str) -> Optional[dict]:
+        """
+        Get a stored analysis result.
+        
+        Args:
+            key: Key from make_key()
+        
+        Returns:
+            Stored result, or None on a miss
+        """
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT result FROM analyses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (time.time(), key))
+            
+            self.logger.info(f"Analysis cache hit {key[:12]}")
+            return json.loads(row[0])
+        
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.warning(f"Analysis cache lookup failed: {e}")
+            return None
+    
+    def store(self, key: str, kind: str, params: dict, result: dict) -> None:
+        """
+        Store an analysis result.
+        
+        Args:
+            key: Key from make_key()
+            kind: Analysis kind
+            params: Parameters the key was built from (kept for inspection)
+            result: JSON-serializable analysis result
+        """
+        try:
+            now = time.time()
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO analyses "
+                    "(key, kind, params, result, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, json.dumps(params, sort_keys=True), json.dumps(result), now, now)
+                )
+        
+        except sqlite3.Error as e:
+            self.logger.warning(f"Failed to store analysis result: {e}")
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the store for one transaction."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from .utils import ensure_directory, compute_file_fingerprint
+
+class BatchManifest:
+    """
+    Persistent record of batch inputs that were already processed.
+    
+    Each input path maps to its content fingerprint, the encoding
+    parameters and the outputs it produced. Reruns skip inputs whose
+    content, parameters and outputs are unchanged. Inputs are marked as
+    running before they start, so a crashed batch simply redoes them, and
+    inputs missing an expected output are recorded as failed.
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Initialize batch manifest.
+        
+        Args:
+            db_path: Path to the SQLite manifest file
+        """
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        
+        ensure_directory(str(Path(db_path).parent))
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS inputs ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                "fingerprint TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL, "
+                "outputs TEXT, error TEXT, updated_at REAL NOT NULL)"
+            )
+    
+    @staticmethod
+    def make_params_key(params: dict) -> str:
+        """
+        Hash the encoding parameters that affect the outputs.
+        
+        Args:
+            params: Encoding parameters
+        
+        Returns:
+            Hex parameters key
+        """
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    
+    def is_current(self, input_path: str, params_key: str, expected_outputs: List[str]) -> bool:
+        """
+        Check whether an input was already processed with these parameters.
+        
+        The size and mtime are compared first; the content fingerprint is
+        only computed when they differ, so unchanged archives are cheap to
+        rescan.
+        
+        Args:
+            input_path: Path to input video file
+            params_key: Key from make_params_key()
+            expected_outputs: Outputs a complete run creates (one MP4 per
+                aspect); the recorded outputs must include all of them
+        
+        Returns:
+            True if the recorded outputs are complete and still valid
+        """
+        path = os.path.abspath(input_path)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT size, mtime_ns, fingerprint, params, status, outputs FROM inputs WHERE path = ?",
+                (path,)
+            ).fetchone()
+        
+        if row is None:
+            return False
+        
+        size, mtime_ns, fingerprint, params, status, outputs = row
+        if status != 'done' or params != params_key:
+            return False
+        
+        outputs = json.loads(outputs or '[]')
+        recorded = {os.path.abspath(output) for output in outputs}
+        if not outputs or not all(os.path.abspath(output) in recorded for output in expected_outputs):
+            self.logger.info(f"Incomplete outputs recorded for {input_path}, reprocessing")
+            return False
+        
+        if not all(os.path.exists(output) for output in outputs):
+            self.logger.info(f"Outputs missing for {input_path}, reprocessing")
+            return False
+        
+        stat = os.stat(path)
+        if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns):
+            return True
+        
+        # Touched but possibly identical, e.g. re-copied from the archive
+        if compute_file_fingerprint(path) != fingerprint:
+            return False
+        
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE inputs SET size = ?, mtime_ns = ?, updated_at = ? WHERE path = ?",
+                (stat.st_size, stat.st_mtime_ns, time.time(), path)
+            )
+        return True
+    
+    def mark_running(self, input_path: str, params_key: str) -> None:
+        """
+        Record that processing of an input started.
+        
+        Args:
+            input_path: Path to input video file
+            params_key: Key from make_params_key()
+        """
+        path = os.path.abspath(input_path)
+        stat = os.stat(path)
+        fingerprint = compute_file_fingerprint(path)
+        
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO inputs "
+                "(path, size, mtime_ns, fingerprint, params, status, outputs, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'running', NULL, NULL, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, fingerprint, params_key, time.time())
+            )
+    
+    def mark_done(self, input_path: str, outputs: list) -> None:
+        """
+        Record the outputs of a finished input.
+        
+        Args:
+            input_path: Path to input video file
+            outputs: Output file paths
+        """
+        self._set_status(input_path, 'done', outputs=json.dumps(outputs))
+    
+    def mark_failed(self, input_path: str, error: str) -> None:
+        """
+        Record a failed input so the next run retries it.
+        
+        Args:
+            input_path: Path to input video file
+            error: Error message
+        """
+        self._set_status(input_path, 'failed', error=error)
+    
+    def _set_status(self, input_path: str, status: str, outputs: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Update the status of a recorded input."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE inputs SET status = ?, outputs = ?, error = ?, updated_at = ? WHERE path = ?",
+                (status, outputs, error, time.time(), os.path.abspath(input_path))
+            )
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the manifest database for one transaction."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
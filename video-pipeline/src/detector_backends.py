@@ -0,0 +1,446 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]
+
+class DetectorStats:
+    """Thread-safe per-frame latency counters of a detector backend."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.load_seconds = 0.0
+    
+    def add_load(self, seconds: float) -> None:
+        """Record the time spent loading another model instance."""
+        with self._lock:
+            self.load_seconds += seconds
+    
+    def add(self, seconds: float) -> None:
+        """Record the latency of one detection."""
+        with self._lock:
+            self.frames += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+    
+    def snapshot(self) -> Tuple[int, float]:
+        """Get (frames, total_seconds), to measure one analysis with since()."""
+        with self._lock:
+            return self.frames, self.total_seconds
+    
+    def since(self, snapshot: Tuple[int, float]) -> dict:
+        """
+        Summarize the detections after a snapshot.
+        
+        Args:
+            snapshot: Value of snapshot() taken before the analysis
+        
+        Returns:
+            Dictionary with the frame count and mean latency in milliseconds
+        """
+        frames, total_seconds = self.snapshot()
+        frames -= snapshot[0]
+        total_seconds -= snapshot[1]
+        return {
+            'frames': frames,
+            'mean_ms': round(1000 * total_seconds / frames, 2) if frames else None
+        }
+    
+    def to_dict(self) -> dict:
+        """Convert to a JSON-serializable dictionary."""
+        with self._lock:
+            return {
+                'frames': self.frames,
+                'mean_ms': round(1000 * self.total_seconds / self.frames, 2) if self.frames else None,
+                'max_ms': round(1000 * self.max_seconds, 2),
+                'load_ms': round(1000 * self.load_seconds, 2)
+            }
+
+class DetectorBackend:
+    """
+    Base class of face/subject detectors used for crop analysis.
+    
+    Models are loaded on first use, not when the backend is created, so
+    processes that never analyze a 16:9 source never pay for them. Backends
+    are shared by every FaceDetector of a process (see get_backend), so
+    concurrent jobs and detection threads call the same instance: a backend
+    must never run one OpenCV model on two frames at once, either by
+    serializing calls (DNNBackend) or by giving each caller its own model
+    (HaarBackend).
+    """
+    
+    name = "base"
+    
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.stats = DetectorStats()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._available = False
+    
+    @property
+    def available(self) -> bool:
+        """True if the model loaded; loads it on first access."""
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    try:
+                        self._load()
+                        self._available = True
+                        self.logger.info(f"Loaded {self.name} detector")
+                    except Exception as e:
+                        self.logger.error(f"Failed to load {self.name} detector: {e}")
+                    self.stats.load_seconds = time.perf_counter() - start
+                    self._loaded = True
+        return self._available
+    
+    def detect(self, frame: np.ndarray) -> List[Box]:
+        """
+        Detect faces or subjects in a frame.
+        
+        Args:
+            frame: BGR frame
+        
+        Returns:
+            List of bounding boxes (x, y, w, h) in frame coordinates
+        """
+        if not self.available:
+            return []
+        
+        start = time.perf_counter()
+        try:
+            return self._detect(frame)
+        finally:
+            self.stats.add(time.perf_counter() - start)
+    
+    def get_params(self) -> dict:
+        """Describe the settings that affect detections (for cache keys)."""
+        return {'backend': self.name}
+    
+    def _load(self) -> None:
+        """Load the model; raise on failure."""
+    
+    def _detect(self, frame: np.ndarray) -> List[Box]:
+        """Run the detector on a frame."""
+        raise NotImplementedError
+    
+    def _file_digest(self, path: Optional[str]) -> Optional[str]:
+        """Hash a model file, so cached analyses follow model changes."""
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+class HaarBackend(DetectorBackend):
+    """
+    OpenCV Haar cascade face detector (fast, frontal faces only).
+    
+    ``detectMultiScale`` is not safe to call concurrently on one
+    CascadeClassifier, so each concurrent caller borrows its own cascade.
+    Cascades are returned to a free list after use and reused, so at most
+    one is loaded per detection running at the same time.
+    """
+    
+    name = "haar"
+    
+    # detectMultiScale settings
+    SCALE_FACTOR = 1.1
+    MIN_NEIGHBORS = 5
+    MIN_FACE_SIZE = (30, 30)
+    
+    def __init__(self, model_path: Optional[str] = None):
+        """
+        Initialize Haar cascade backend.
+        
+        Args:
+            model_path: Cascade XML file, or the name of one of OpenCV's
+                bundled cascades (default: haarcascade_frontalface_default.xml)
+        """
+        super().__init__()
+        self.model_file = self._resolve(model_path)
+        self._digest = None
+        
+        # Idle cascades; a detection takes one or loads a new one
+        self._cascades: List[cv2.CascadeClassifier] = []
+        self._cascades_lock = threading.Lock()
+    
+    def get_params(self) -> dict:
+        """Describe the cascade and its settings."""
+        if self._digest is None:
+            self._digest = self._file_digest(self.model_file)
+        return {
+            'backend': self.name,
+            'model': self._digest,
+            'scale_factor': self.SCALE_FACTOR,
+            'min_neighbors': self.MIN_NEIGHBORS,
+            'min_face_size': list(self.MIN_FACE_SIZE)
+        }
+    
+    def _resolve(self, model_path: Optional[str]) -> str:
+        """Find the cascade file, falling back to OpenCV's bundled models."""
+        if model_path and os.path.exists(model_path):
+            return model_path
+        
+        bundled = os.path.join(cv2.data.haarcascades, os.path.basename(model_path or 'haarcascade_frontalface_default.xml'))
+        if model_path and not os.path.exists(bundled):
+            self.logger.warning(f"Cascade {model_path} not found, using the default model")
+            bundled = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+        return bundled
+    
+    def _load(self) -> None:
+        self._cascades.append(self._load_cascade())
+    
+    def _load_cascade(self) -> cv2.CascadeClassifier:
+        """Load one cascade from the model file."""
+        cascade = cv2.CascadeClassifier(self.model_file)
+        if cascade.empty():
+            raise RuntimeError(f"Failed to load face detection model {self.model_file}")
+        return cascade
+    
+    def _detect(self, frame: np.ndarray) -> List[Box]:
+        with self._cascades_lock:
+            cascade = self._cascades.pop() if self._cascades else None
+        if cascade is None:
+            # Every idle cascade is busy with another job or thread
+            start = time.perf_counter()
+            cascade = self._load_cascade()
+            self.stats.add_load(time.perf_counter() - start)
+        
+        try:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = cascade.detectMultiScale(
+                gray,
+                scaleFactor=self.SCALE_FACTOR,
+                minNeighbors=self.MIN_NEIGHBORS,
+                minSize=self.MIN_FACE_SIZE,
+                flags=cv2.CASCADE_SCALE_IMAGE
+            )
+            return [(int(x), int(y), int(w), int(h)) for x, y, w, h in faces]
+        finally:
+            with self._cascades_lock:
+                self._cascades.append(cascade)
+
+class DNNBackend(DetectorBackend):
+    """
+    OpenCV DNN face detector on the CPU.
+    
+    Supports the res10 300x300 SSD (Caffe ``.caffemodel`` plus its
+    ``deploy.prototxt``) and YuNet (``.onnx``, through cv2.FaceDetectorYN).
+    Both find profile and partially occluded faces the Haar cascade misses,
+    at a higher cost per frame. Model files are not bundled with OpenCV.
+    """
+    
+    name = "dnn"
+    
+    # Mean BGR values the res10 SSD was trained with
+    SSD_MEAN = (104.0, 177.0, 123.0)
+    SSD_SIZE = 300
+    
+    def __init__(self, model_path: Optional[str] = None, config_path: Optional[str] = None, confidence: float = 0.5):
+        """
+        Initialize DNN backend.
+        
+        Args:
+            model_path: ``.caffemodel`` (res10 SSD) or ``.onnx`` (YuNet) file
+            config_path: ``deploy.prototxt`` for the res10 SSD
+            confidence: Minimum detection score (0-1)
+        """
+        super().__init__()
+        self.model_path = model_path
+        self.config_path = config_path
+        self.confidence = confidence
+        self.net = None
+        self.yunet = None
+        self._digest = None
+        
+        # Neither network may run forward passes concurrently
+        self._lock = threading.Lock()
+    
+    def get_params(self) -> dict:
+        """Describe the network files and threshold."""
+        if self._digest is None:
+            self._digest = [self._file_digest(self.model_path), self._file_digest(self.config_path)]
+        return {'backend': self.name, 'model': self._digest, 'confidence': self.confidence}
+    
+    def _load(self) -> None:
+        if not self.model_path or not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"DNN face model not found: {self.model_path}")
+        
+        if self.model_path.endswith('.onnx'):
+            self.yunet = cv2.FaceDetectorYN.create(self.model_path, "", (320, 320), self.confidence)
+            self.yunet.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.yunet.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        else:
+            if not self.config_path or not os.path.exists(self.config_path):
+                raise FileNotFoundError(f"DNN face model config not found: {self.config_path}")
+            self.net = cv2.dnn.readNetFromCaffe(self.config_path, self.model_path)
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+    
+    def _detect(self, frame: np.ndarray) -> List[Box]:
+        height, width = frame.shape[:2]
+        
+        if self.yunet is not None:
+            with self._lock:
+                self.yunet.setInputSize((width, height))
+                _, faces = self.yunet.detect(frame)
+            if faces is None:
+                return []
+            return [self._clip(x, y, w, h, width, height) for x, y, w, h in faces[:, :4]]
+        
+        blob = cv2.dnn.blobFromImage(
+            cv2.resize(frame, (self.SSD_SIZE, self.SSD_SIZE)), 1.0, (self.SSD_SIZE, self.SSD_SIZE), self.SSD_MEAN
+        )
+        with self._lock:
+            self.net.setInput(blob)
+            detections = self.net.forward()
+        
+        boxes = []
+        for _, _, score, x1, y1, x2, y2 in detections[0, 0]:
+            if score >= self.confidence:
+                boxes.append(self._clip(x1 * width, y1 * height, (x2 - x1) * width, (y2 - y1) * height, width, height))
+        return boxes
+    
+    def _clip(self, x: float, y: float, w: float, h: float, width: int, height: int) -> Box:
+        """Clip a box to the frame and convert it to ints."""
+        x0 = max(0, int(x))
+        y0 = max(0, int(y))
+        x1 = min(width, int(x + w))
+        y1 = min(height, int(y + h))
+        return x0, y0, max(1, x1 - x0), max(1, y1 - y0)
+
+class SaliencyBackend(DetectorBackend):
+    """
+    Spectral residual saliency, for content without faces.
+    
+    The frame is reduced to a small grayscale image; the residual of its
+    log amplitude spectrum marks regions that stand out from the rest, and
+    the largest salient region is returned as the subject box. Needs no
+    model file.
+    """
+    
+    name = "saliency"
+    
+    def __init__(self, size: int = 64, threshold: float = 3.0):
+        """
+        Initialize saliency backend.
+        
+        Args:
+            size: Side of the image the saliency map is computed on
+            threshold: Saliency, as a multiple of the mean, that counts as salient
+        """
+        super().__init__()
+        self.size = size
+        self.threshold = threshold
+    
+    def get_params(self) -> dict:
+        """Describe the saliency settings."""
+        return {'backend': self.name, 'size': self.size, 'threshold': self.threshold}
+    
+    def _detect(self, frame: np.ndarray) -> List[Box]:
+        height, width = frame.shape[:2]
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (self.size, self.size), interpolation=cv2.INTER_AREA).astype(np.float32)
+        
+        spectrum = np.fft.fft2(small)
+        log_amplitude = np.log(np.abs(spectrum) + 1e-6).astype(np.float32)
+        residual = log_amplitude - cv2.blur(log_amplitude, (3, 3))
+        saliency = np.abs(np.fft.ifft2(np.exp(residual + 1j * np.angle(spectrum)))) ** 2
+        saliency = cv2.GaussianBlur(saliency.astype(np.float32), (0, 0), self.size / 24)
+        
+        mean = float(saliency.mean())
+        if mean <= 0:
+            return []
+        
+        mask = (saliency > self.threshold * mean).astype(np.uint8)
+        count, _, regions, _ = cv2.connectedComponentsWithStats(mask)
+        if count <= 1:
+            return []
+        
+        # Label 0 is the background
+        x, y, w, h, _ = max(regions[1:], key=lambda region: region[cv2.CC_STAT_AREA])
+        scale_x = width / self.size
+        scale_y = height / self.size
+        return [(int(x * scale_x), int(y * scale_y), int(w * scale_x), int(h * scale_y))]
+
+class FallbackBackend(DetectorBackend):
+    """Use a second backend on frames where the first finds nothing."""
+    
+    def __init__(self, primary: DetectorBackend, fallback: DetectorBackend):
+        """
+        Initialize fallback backend.
+        
+        Args:
+            primary: Backend tried first
+            fallback: Backend used when the primary finds nothing
+        """
+        super().__init__()
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+    
+    def get_params(self) -> dict:
+        """Describe both backends."""
+        return {'backend': self.name, 'primary': self.primary.get_params(), 'fallback': self.fallback.get_params()}
+    
+    def _load(self) -> None:
+        if not self.primary.available:
+            raise RuntimeError(f"{self.primary.name} detector is not available")
+    
+    def _detect(self, frame: np.ndarray) -> List[Box]:
+        return self.primary.detect(frame) or self.fallback.detect(frame)
+
+BACKENDS = {
+    'haar': HaarBackend,
+    'dnn': DNNBackend,
+    'saliency': SaliencyBackend
+}
+
+# Backends created in this process, shared by every FaceDetector
+_backends: Dict[tuple, DetectorBackend] = {}
+_backends_lock = threading.RLock()
+
+def get_backend(name: str = "haar",
+                model_path: Optional[str] = None,
+                config_path: Optional[str] = None,
+                subject_fallback: bool = False) -> DetectorBackend:
+    """
+    Get the process-wide detector backend for a configuration.
+    
+    Args:
+        name: "haar", "dnn" or "saliency"
+        model_path: Model file (Haar cascade or DNN network)
+        config_path: Network config (res10 SSD deploy.prototxt)
+        subject_fallback: Fall back to saliency on frames without faces
+    
+    Returns:
+        Shared backend; its model is loaded on first use
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {name}")
+    
+    key = (name, model_path, config_path, subject_fallback and name != 'saliency')
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            if name == 'haar':
+                backend = HaarBackend(model_path)
+            elif name == 'dnn':
+                backend = DNNBackend(model_path, config_path)
+            else:
+                backend = SaliencyBackend()
+            
+            if key[3]:
+                backend = FallbackBackend(backend, get_backend('saliency'))
+            _backends[key] = backend
+        return backend
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    """
+    A named libx264 speed/quality tier.
+    
+    Profiles with a CRF encode at constant quality, optionally capped by a
+    VBV maxrate/bufsize; profiles without one fall back to the transcoder's
+    average video bitrate.
+    """
+    
+    name: str
+    preset: str
+    crf: Optional[int] = None
+    maxrate: Optional[str] = None
+    bufsize: Optional[str] = None
+    tune: Optional[str] = None
+    gop_seconds: Optional[float] = None
+    threads: Optional[int] = None
+    
+    def get_video_options(self, video_bitrate: str, fps: Optional[float] = None) -> dict:
+        """
+        Get the ffmpeg video encoder options for this profile.
+        
+        Args:
+            video_bitrate: Average bitrate used when the profile has no CRF
+            fps: Source frame rate, used to convert the GOP length to frames
+        
+        Returns:
+            Dictionary of ffmpeg output keyword arguments
+        """
+        options = {'vcodec': 'libx264', 'preset': self.preset}
+        
+        if self.crf is not None:
+            options['crf'] = self.crf
+        else:
+            options['video_bitrate'] = video_bitrate
+        
+        if self.maxrate:
+            options['maxrate'] = self.maxrate
+            options['bufsize'] = self.bufsize or self.maxrate
+        if self.tune:
+            options['tune'] = self.tune
+        if self.gop_seconds:
+            options['g'] = max(1, int(round(self.gop_seconds * (fps or 30.0))))
+        
+        return options
+
+# Speed/quality tiers, fastest first
+PROFILES: Dict[str, EncodingProfile] = {
+    'fast-preview': EncodingProfile(
+        name='fast-preview',
+        preset='veryfast',
+        crf=28,
+        maxrate='1500k',
+        bufsize='3000k',
+        gop_seconds=2
+    ),
+    'standard': EncodingProfile(
+        name='standard',
+        preset='medium',
+        crf=23,
+        maxrate='4M',
+        bufsize='8M',
+        gop_seconds=2
+    ),
+    'archive': EncodingProfile(
+        name='archive',
+        preset='slow',
+        crf=18,
+        tune='film',
+        gop_seconds=4
+    )
+}
+
+# Profile per output aspect ratio for each webhook category
+CATEGORY_PROFILES: Dict[str, Dict[str, str]] = {
+    # Vertical clips are the product; the 16:9 copy is secondary
+    'short_form_9_16': {'9:16': 'standard', '16:9': 'fast-preview'},
+    'long_form_16_9_or_9_16': {'16:9': 'standard', '9:16': 'fast-preview'},
+    # Listing videos are kept long-term
+    'listings_16_9': {'16:9': 'archive', '9:16': 'standard'}
+}
+
+def get_profile(name: str) -> EncodingProfile:
+    """
+    Look up an encoding profile by name.
+    
+    Args:
+        name: Profile name
+    
+    Returns:
+        EncodingProfile
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Unknown encoding profile: {name} (expected one of {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+def get_category_from_path(video_path: str) -> Optional[str]:
+    """
+    Get the webhook category of a video from its upload directory.
+    
+    The webhook saves uploads to ``input/<category>/``.
+    
+    Args:
+        video_path: Path to video file
+    
+    Returns:
+        Category name, or None if the directory is not a known category
+    """
+    category = Path(video_path).parent.name
+    return category if category in CATEGORY_PROFILES else None
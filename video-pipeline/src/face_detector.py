@@ -1,119 +1,165 @@
+import bisect
 import cv2
 import numpy as np
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, List, Optional
 
+from .analysis_cache import AnalysisCache
+from .detector_backends import get_backend
+from .frame_reader import SharedFrameReader
+from .frame_sampler import FrameSampler
+from .scene_detector import SceneDetector
+from .thumbnails import PreviewCollector
+from .media_info import MediaInfo, probe_media
+
 class FaceDetector:
     """Face detection utility for intelligent video cropping."""
     
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self,
+                 model_path: Optional[str] = None,
+                 sampling_mode: str = "keyframes",
+                 analysis_width: Optional[int] = 640,
+                 detection_threads: Optional[int] = None,
+                 analysis_cache: Optional[AnalysisCache] = None,
+                 backend: str = "haar",
+                 config_path: Optional[str] = None,
+                 subject_fallback: bool = False,
+                 adaptive_tolerance: Optional[float] = None):
         """
         Initialize face detector.
         
+        The detector model is not loaded here but on first use, and is
+        shared with every other FaceDetector of the process using the same
+        backend settings.
+        
         Args:
-            model_path: Path to Haar cascade model file
+            model_path: Model file of the backend: a Haar cascade (path or
+                name of a bundled OpenCV cascade) or a DNN network
+            sampling_mode: How frames are sampled for crop analysis,
+                "keyframes" or "sequential"
+            analysis_width: Width frames are decoded and searched for faces
+                at; None analyzes at full resolution
+            detection_threads: Threads used to detect faces in sampled frames
+                (default: CPU count, up to 8)
+            analysis_cache: Store of earlier analysis results, looked up
+                before any frame is decoded (default: always analyze)
+            backend: "haar" (Haar cascade), "dnn" (OpenCV DNN: res10 SSD or
+                YuNet) or "saliency" (most salient region, no faces needed)
+            config_path: Network config for the res10 SSD (deploy.prototxt)
+            subject_fallback: Use the most salient region on frames where
+                no face is found
+            adaptive_tolerance: Sample the static crop adaptively, stopping
+                once the crop center is known to within this many source
+                pixels (default: always sample 20 frames)
         """
         self.logger = logging.getLogger(__name__)
-        
-        # Try to load face detection model
-        try:
-            if model_path and os.path.exists(model_path):
-                self.face_cascade = cv2.CascadeClassifier(model_path)
-            else:
-                # Use built-in OpenCV model
-                self.face_cascade = cv2.CascadeClassifier(
-                    cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-                )
-            
-            if self.face_cascade.empty():
-                raise RuntimeError("Failed to load face detection model")
-                
-            self.logger.info("Face detector initialized successfully")
-            
-        except Exception as e:
-            self.logger.error(f"Failed to initialize face detector: {e}")
-            self.face_cascade = None
+        self.analysis_width = analysis_width
+        self.detection_threads = detection_threads or min(8, os.cpu_count() or 1)
+        self.sampling_mode = sampling_mode
+        self.frame_sampler = FrameSampler(analysis_width=analysis_width, mode=sampling_mode)
+        self.analysis_cache = analysis_cache
+        self.backend = get_backend(backend, model_path, config_path, subject_fallback)
+        self.adaptive_tolerance = adaptive_tolerance
     
     def detect_faces_in_frame(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """
         Detect faces in a single frame.
         
+        Frames wider than ``analysis_width`` are downscaled before detection;
+        the returned boxes are mapped back to the frame's own coordinates.
+        
         Args:
             frame: Video frame as numpy array
             
         Returns:
             List of face bounding boxes (x, y, w, h)
         """
-        if self.face_cascade is None:
-            return []
-        
         try:
-            # Convert to grayscale for face detection
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Detect faces
-            faces = self.face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(30, 30),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
+            # Detect on a downscaled copy of large frames
+            scale = 1.0
+            if self.analysis_width and frame.shape[1] > self.analysis_width:
+                scale = frame.shape[1] / self.analysis_width
+                analysis_height = int(round(frame.shape[0] / scale))
+                frame = cv2.resize(frame, (self.analysis_width, analysis_height), interpolation=cv2.INTER_AREA)
+            
+            faces = self.backend.detect(frame)
             
-            return [(int(x), int(y), int(w), int(h)) for x, y, w, h in faces]
+            return [
+                (int(x * scale), int(y * scale), int(w * scale), int(h * scale))
+                for x, y, w, h in faces
+            ]
             
         except Exception as e:
             self.logger.warning(f"Face detection failed for frame: {e}")
             return []
     
-    def get_optimal_crop_center(self, video_path: str, target_aspect: float = 9/16) -> Tuple[int, int]:
+    def detect_faces_batch(self, frames: List[np.ndarray]) -> List[List[Tuple[int, int, int, int]]]:
+        """
+        Detect faces in several frames concurrently.
+        
+        OpenCV releases the GIL during detection, so frames are spread over a
+        thread pool. Backends never run one model instance on two frames at
+        once (see HaarBackend), which OpenCV does not support.
+        
+        Args:
+            frames: Video frames as numpy arrays
+            
+        Returns:
+            List of face bounding boxes per frame, in input order
+        """
+        if len(frames) <= 1 or self.detection_threads <= 1:
+            return [self.detect_faces_in_frame(frame) for frame in frames]
+        
+        with ThreadPoolExecutor(max_workers=self.detection_threads) as executor:
+            return list(executor.map(self.detect_faces_in_frame, frames))
+    
+    def get_optimal_crop_center(self,
+                                video_path: str,
+                                target_aspect: float = 9/16,
+                                media_info: Optional[MediaInfo] = None,
+                                preview: Optional[PreviewCollector] = None) -> Tuple[int, int]:
         """
         Analyze video frames to find optimal crop center based on face positions.
         
         Args:
             video_path: Path to video file
             target_aspect: Target aspect ratio (height/width)
+            media_info: Probe results for the video (probed if not given)
+            preview: Also offer the sampled frames to this collector (optional)
             
         Returns:
             Tuple of (center_x, center_y) for optimal crop
         """
-        if self.face_cascade is None:
+        if not self.backend.available:
             self.logger.warning("Face detector not available, using center crop")
-            return self._get_center_crop(video_path)
+            return self._get_center_crop(video_path, media_info)
         
         try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise RuntimeError(f"Cannot open video: {video_path}")
-            
             # Get video properties
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            info = media_info or probe_media(video_path)
+            width = info.width
+            height = info.height
             
-            # Sample frames throughout the video
-            sample_frames = min(20, frame_count)  # Sample up to 20 frames
-            frame_indices = np.linspace(0, frame_count - 1, sample_frames, dtype=int)
-            
-            all_face_centers = []
+            adaptive = bool(self.adaptive_tolerance) and info.duration > 0
+            params = self._get_analysis_params(
+                target_aspect=target_aspect,
+                max_frames=20,
+                adaptive_tolerance=self.adaptive_tolerance if adaptive else None
+            )
+            key, cached = self._lookup_analysis(video_path, 'static', params)
+            if cached:
+                return tuple(cached['center'])
             
-            for frame_idx in frame_indices:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = cap.read()
-                
-                if not ret:
-                    continue
-                
-                faces = self.detect_faces_in_frame(frame)
-                
-                # Calculate center points of detected faces
-                for x, y, w, h in faces:
-                    center_x = x + w // 2
-                    center_y = y + h // 2
-                    all_face_centers.append((center_x, center_y))
+            if adaptive:
+                detections = self._sample_adaptive(video_path, info, self.adaptive_tolerance, 20, preview=preview)
+            else:
+                # Sample up to 20 frames throughout the video at analysis resolution
+                samples = list(self.frame_sampler.sample(video_path, width, height, info.duration, 20, info.fps))
+                detections = self._detect_centers(samples, width, preview)
             
-            cap.release()
+            all_face_centers = [center for timestamp, centers in detections for center in centers]
             
             if all_face_centers:
                 # Calculate average face center
@@ -133,34 +179,578 @@ class FaceDetector:
                 center_x = max(min_x, min(max_x, avg_x))
                 center_y = max(min_y, min(max_y, avg_y))
                 
-                self.logger.info(f"Found {len(all_face_centers)} face detections, using center: ({center_x}, {center_y})")
-                return center_x, center_y
+                self.logger.info(f"Found {len(all_face_centers)} face detections in {len(detections)} frames, "
+                                 f"using center: ({center_x}, {center_y})")
             
             else:
                 self.logger.info("No faces detected, using center crop")
-                return self._get_center_crop(video_path)
+                center_x, center_y = width // 2, height // 2
+            
+            self._store_analysis(key, 'static', params, {'center': [center_x, center_y], 'faces': detections})
+            return center_x, center_y
                 
         except Exception as e:
             self.logger.error(f"Error in face-based crop analysis: {e}")
-            return self._get_center_crop(video_path)
+            return self._get_center_crop(video_path, media_info)
     
-    def _get_center_crop(self, video_path: str) -> Tuple[int, int]:
+    def _detect_centers(self,
+                        samples: List[Tuple[float, np.ndarray]],
+                        width: int,
+                        preview: Optional[PreviewCollector] = None) -> List[Tuple[float, List[Tuple[int, int]]]]:
+        """
+        Detect faces in sampled frames.
+        
+        Args:
+            samples: (timestamp, frame) pairs at analysis resolution
+            width: Source video width
+            preview: Also offer the frames to this collector (optional)
+            
+        Returns:
+            List of (timestamp, face centers in source coordinates) per frame
+        """
+        detections = []
+        frames = [frame for timestamp, frame in samples]
+        
+        for (timestamp, frame), faces in zip(samples, self.detect_faces_batch(frames)):
+            if preview:
+                preview.add(timestamp, frame, faces)
+            
+            # Calculate center points of detected faces in source coordinates
+            scale = width / frame.shape[1]
+            centers = [(int((x + w / 2) * scale), int((y + h / 2) * scale)) for x, y, w, h in faces]
+            detections.append((timestamp, centers))
+        
+        return detections
+    
+    def _sample_adaptive(self,
+                         video_path: str,
+                         info: MediaInfo,
+                         tolerance: float,
+                         max_frames: int = 20,
+                         min_frames: int = 5,
+                         frames_per_round: int = 3,
+                         preview: Optional[PreviewCollector] = None) -> List[Tuple[float, List[Tuple[int, int]]]]:
+        """
+        Sample frames until the crop center estimate converges.
+        
+        ``min_frames`` evenly spaced frames are searched first. Sampling
+        stops once the standard error of the per-frame face centers (and the
+        change of their mean since the previous round) is within
+        ``tolerance``, or when none of the frames shows a face. Otherwise
+        each round bisects the intervals whose neighboring samples disagree
+        most (different centers, or a face in only one of them), up to
+        ``max_frames`` in total.
+        
+        Samples are keyframes when the keyframe times can be probed, so
+        requested times are snapped to distinct keyframes first: several
+        times sharing a keyframe would otherwise count one frame as several
+        independent samples. Intervals are then only bisected at a keyframe
+        between their ends. Without keyframe times, or with too few keyframes
+        for the first round, frames are sought accurately and intervals are
+        split down to two frames.
+        
+        Args:
+            video_path: Path to video file
+            info: Probe results for the video
+            tolerance: Convergence tolerance in source pixels
+            max_frames: Maximum frames sampled
+            min_frames: Frames sampled in the first round
+            frames_per_round: Frames added per later round
+            preview: Also offer the frames to this collector (optional)
+            
+        Returns:
+            List of (timestamp, face centers in source coordinates) per
+            sampled frame, in time order
+        """
+        duration = info.duration
+        keyframes = self.frame_sampler.get_keyframes(video_path)
+        timestamps = [duration * (i + 0.5) / min_frames for i in range(min_frames)]
+        
+        # Very long GOPs leave too few distinct keyframes; seek accurately instead
+        if keyframes and len(self.frame_sampler.snap_to_keyframes(timestamps, keyframes)) < min_frames:
+            self.logger.info(f"Keyframes too sparse for {min_frames} adaptive samples, seeking accurately")
+            keyframes = None
+        timestamps = self.frame_sampler.snap_to_keyframes(timestamps, keyframes)
+        detections = {}
+        estimate = None
+        
+        while timestamps:
+            samples = self.frame_sampler.sample_at(video_path, info.width, info.height, timestamps, keyframes)
+            for timestamp, centers in self._detect_centers(samples, info.width, preview):
+                detections[timestamp] = centers
+            # Times that decoded nothing are not retried
+            for timestamp in timestamps:
+                detections.setdefault(timestamp, [])
+            
+            frame_centers = [np.mean([x for x, y in centers]) for centers in detections.values() if centers]
+            if not frame_centers:
+                self.logger.info(f"No faces in {len(detections)} adaptive samples, stopping")
+                break
+            
+            previous = estimate
+            estimate = float(np.mean(frame_centers))
+            error = float(np.std(frame_centers) / np.sqrt(len(frame_centers))) if len(frame_centers) > 1 else float('inf')
+            if previous is not None:
+                error = max(error, abs(estimate - previous))
+            
+            if error <= tolerance:
+                self.logger.info(f"Crop center converged to {estimate:.0f} (+/- {error:.1f}px) after {len(detections)} frames")
+                break
+            if len(detections) >= max_frames:
+                self.logger.info(f"Crop center not converged (+/- {error:.1f}px) after {len(detections)} frames")
+                break
+            
+            # Bisect the intervals where neighboring samples disagree most
+            ordered = sorted(detections)
+            means = {t: np.mean([x for x, y in detections[t]]) if detections[t] else None for t in ordered}
+            gaps = []
+            for start, end in zip(ordered, ordered[1:]):
+                if means[start] is None and means[end] is None:
+                    disagreement = 0.0
+                elif means[start] is None or means[end] is None:
+                    disagreement = float(info.width)
+                else:
+                    disagreement = abs(means[start] - means[end])
+                
+                midpoint = self._get_split_point(start, end, keyframes, info.fps)
+                if midpoint is not None:
+                    gaps.append((disagreement, end - start, midpoint))
+            
+            gaps.sort(reverse=True)
+            count = min(frames_per_round, max_frames - len(detections))
+            timestamps = [midpoint for disagreement, length, midpoint in gaps[:count] if disagreement > tolerance]
+            if not timestamps:
+                self.logger.info(f"Sample disagreement within tolerance after {len(detections)} frames")
+        
+        return [(timestamp, detections[timestamp]) for timestamp in sorted(detections)]
+    
+    def _get_split_point(self,
+                         start: float,
+                         end: float,
+                         keyframes: Optional[List[float]],
+                         fps: Optional[float]) -> Optional[float]:
+        """
+        Find where to sample between two adaptive samples.
+        
+        Args:
+            start: Earlier sample time
+            end: Later sample time
+            keyframes: Keyframe times, or None when seeking accurately
+            fps: Source frame rate
+        
+        Returns:
+            Keyframe closest to the middle of the interval (or the middle
+            itself without keyframes), or None if no other frame can be
+            sampled in between
+        """
+        middle = (start + end) / 2
+        if keyframes:
+            inside = keyframes[bisect.bisect_right(keyframes, start):bisect.bisect_left(keyframes, end)]
+            return min(inside, key=lambda keyframe: abs(keyframe - middle)) if inside else None
+        
+        # Never split finer than a frame
+        return middle if end - start > 2 / (fps or 30.0) else None
+    
+    def get_crop_trajectory(self,
+                            video_path: str,
+                            sample_interval: float = 0.5,
+                            redetect_interval: int = 4,
+                            smoothing: float = 0.3,
+                            media_info: Optional[MediaInfo] = None,
+                            preview: Optional[PreviewCollector] = None) -> List[Tuple[float, int]]:
+        """
+        Follow the main face through the video to build a crop trajectory.
+        
+        Frames are sampled every ``sample_interval`` seconds in a single forward
+        pass. The Haar cascade only runs every ``redetect_interval`` samples (or
+        when tracking is lost); in between, the face is followed with template
+        matching around its previous position.
+        
+        Args:
+            video_path: Path to video file
+            sample_interval: Seconds between trajectory points
+            redetect_interval: Samples between full cascade detections
+            smoothing: Exponential smoothing factor (0-1, lower is smoother)
+            media_info: Probe results for the video (probed if not given)
+            preview: Also offer the sampled frames to this collector (optional)
+            
+        Returns:
+            List of (timestamp, center_x) points in source pixel coordinates
+        """
+        if not self.backend.available:
+            self.logger.warning("Face detector not available, using center crop")
+            center_x, _ = self._get_center_crop(video_path, media_info)
+            return [(0.0, center_x)]
+        
+        try:
+            info = media_info or probe_media(video_path)
+            fps = info.fps
+            width = info.width
+            
+            params = self._get_analysis_params(sample_interval=sample_interval, redetect_interval=redetect_interval, smoothing=smoothing)
+            key, cached = self._lookup_analysis(video_path, 'tracking', params)
+            if cached:
+                return [tuple(point) for point in cached['trajectory']]
+            
+            # Track at analysis resolution; centers are scaled back at the end
+            frame_width, frame_height = self.frame_sampler.get_analysis_size(width, info.height)
+            scale = width / frame_width
+            
+            # One forward decode; ffmpeg only scales and converts the sampled frames
+            reader = SharedFrameReader(video_path, frame_width, frame_height, source_fps=fps, sample_fps=1 / sample_interval)
+            
+            timestamps = []
+            centers = []
+            box = None
+            template = None
+            since_detection = redetect_interval
+            detections = 0
+            
+            for timestamp, frame in reader.frames():
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                
+                if box is not None and since_detection < redetect_interval:
+                    box = self._track_face(gray, template, box)
+                else:
+                    box = None
+                
+                if box is None:
+                    box = self._pick_face(self.detect_faces_in_frame(frame), prev_center=centers[-1] if centers else None)
+                    since_detection = 0
+                    detections += 1
+                else:
+                    since_detection += 1
+                
+                if box is not None:
+                    x, y, w, h = box
+                    template = gray[y:y + h, x:x + w].copy()
+                    centers.append(x + w // 2)
+                else:
+                    centers.append(None)
+                
+                if preview:
+                    preview.add(timestamp, frame, [box] if box is not None else None)
+                timestamps.append(timestamp)
+            
+            if not any(c is not None for c in centers):
+                self.logger.info("No faces tracked, using center crop")
+                trajectory = [(0.0, width // 2)]
+            else:
+                trajectory = [
+                    (timestamp, int(center_x * scale))
+                    for timestamp, center_x in zip(timestamps, self._smooth_centers(centers, smoothing))
+                ]
+                self.logger.info(f"Tracked faces over {len(trajectory)} samples with {detections} full detections")
+            
+            self._store_analysis(key, 'tracking', params, {
+                'faces': [(timestamp, int(c * scale) if c is not None else None) for timestamp, c in zip(timestamps, centers)],
+                'trajectory': trajectory
+            })
+            return trajectory
+            
+        except Exception as e:
+            self.logger.error(f"Error in face tracking analysis: {e}")
+            center_x, _ = self._get_center_crop(video_path, media_info)
+            return [(0.0, center_x)]
+    
+    def get_scene_crop_plan(self,
+                            video_path: str,
+                            samples_per_scene: int = 4,
+                            analysis_fps: float = 10.0,
+                            scene_detector: Optional[SceneDetector] = None,
+                            media_info: Optional[MediaInfo] = None,
+                            preview: Optional[PreviewCollector] = None) -> List[Tuple[float, int]]:
+        """
+        Choose one crop center per scene.
+        
+        A single decode feeds both the scene detector and a per-scene frame
+        buffer. When a scene ends, ``samples_per_scene`` evenly spaced frames
+        of it are searched for faces, so every shot gets its own crop and
+        detection cost grows with the number of shots rather than frames.
+        
+        Args:
+            video_path: Path to video file
+            samples_per_scene: Frames searched for faces in each scene
+            analysis_fps: Rate frames are decoded at for scene detection
+            scene_detector: Detector to use (default: SceneDetector defaults)
+            media_info: Probe results for the video (probed if not given)
+            preview: Also offer the decoded frames to this collector (optional)
+            
+        Returns:
+            List of (scene_start, center_x) points in source pixel coordinates
+        """
+        if not self.backend.available:
+            self.logger.warning("Face detector not available, using center crop")
+            center_x, _ = self._get_center_crop(video_path, media_info)
+            return [(0.0, center_x)]
+        
+        try:
+            info = media_info or probe_media(video_path)
+            width = info.width
+            
+            frame_width, frame_height = self.frame_sampler.get_analysis_size(width, info.height)
+            scale = width / frame_width
+            
+            scene_detector = scene_detector or SceneDetector()
+            params = self._get_analysis_params(
+                samples_per_scene=samples_per_scene,
+                analysis_fps=analysis_fps,
+                scene_threshold=scene_detector.threshold,
+                min_scene_length=scene_detector.min_scene_length,
+                scene_bins=scene_detector.bins,
+                scene_max_width=scene_detector.max_width
+            )
+            key, cached = self._lookup_analysis(video_path, 'scene', params)
+            if cached:
+                return [tuple(point) for point in cached['plan']]
+            
+            reader = SharedFrameReader(video_path, frame_width, frame_height, source_fps=info.fps, sample_fps=analysis_fps)
+            
+            # Candidate frames of the current scene, thinned to a bounded set
+            candidates = []
+            stride = 1
+            seen = 0
+            scene_centers = []
+            
+            def finish_scene():
+                if len(candidates) > samples_per_scene:
+                    picks = np.linspace(0, len(candidates) - 1, samples_per_scene + 2)[1:-1]
+                    frames = [candidates[int(round(i))] for i in picks]
+                else:
+                    frames = list(candidates)
+                
+                centers = [
+                    (x + w / 2) * scale
+                    for faces in self.detect_faces_batch(frames)
+                    for x, y, w, h in faces
+                ]
+                scene_centers.append(int(np.mean(centers)) if centers else None)
+            
+            def collect(timestamp, frame):
+                nonlocal stride, seen
+                if scene_detector.process(timestamp, frame):
+                    finish_scene()
+                    candidates.clear()
+                    stride = 1
+                    seen = 0
+                
+                if seen % stride == 0:
+                    candidates.append(frame.copy())
+                    if len(candidates) > 4 * samples_per_scene:
+                        # Keep every other frame; spacing stays even
+                        del candidates[1::2]
+                        stride *= 2
+                seen += 1
+            
+            reader.subscribe(collect)
+            if preview:
+                reader.subscribe(preview.add)
+            reader.run()
+            finish_scene()
+            
+            found = [c for c in scene_centers if c is not None]
+            if not found:
+                self.logger.info("No faces detected in any scene, using center crop")
+                plan = [(0.0, width // 2)]
+            else:
+                # Scenes without faces keep the crop of the video as a whole
+                fallback = int(np.mean(found))
+                plan = [
+                    (start, center_x if center_x is not None else fallback)
+                    for (start, _), center_x in zip(scene_detector.scenes, scene_centers)
+                ]
+                self.logger.info(f"Crop plan for {len(plan)} scenes, faces found in {len(found)}")
+            
+            self._store_analysis(key, 'scene', params, {
+                'faces': [(start, center_x) for (start, _), center_x in zip(scene_detector.scenes, scene_centers)],
+                'plan': plan
+            })
+            return plan
+            
+        except Exception as e:
+            self.logger.error(f"Error in scene-based crop analysis: {e}")
+            center_x, _ = self._get_center_crop(video_path, media_info)
+            return [(0.0, center_x)]
+    
+    def fill_preview(self,
+                     video_path: str,
+                     preview: PreviewCollector,
+                     media_info: Optional[MediaInfo] = None) -> None:
+        """
+        Sample frames for a preview collector when no crop analysis ran.
+        
+        Args:
+            video_path: Path to video file
+            preview: Collector to fill
+            media_info: Probe results for the video (probed if not given)
+        """
+        try:
+            info = media_info or probe_media(video_path)
+            samples = list(self.frame_sampler.sample(video_path, info.width, info.height, info.duration, preview.max_tiles, info.fps))
+            faces = self.detect_faces_batch([frame for timestamp, frame in samples])
+            
+            for (timestamp, frame), frame_faces in zip(samples, faces):
+                preview.add(timestamp, frame, frame_faces)
+                
+        except Exception as e:
+            self.logger.error(f"Failed to sample preview frames: {e}")
+    
+    def get_detector_params(self) -> dict:
+        """
+        Describe the detector settings that affect analysis results.
+        
+        Returns:
+            Dictionary of detector settings, including the model digest
+        """
+        return dict(
+            self.backend.get_params(),
+            opencv=cv2.__version__,
+            analysis_width=self.analysis_width,
+            sampling_mode=self.sampling_mode
+        )
+    
+    def get_detector_stats(self) -> dict:
+        """
+        Get the per-frame latency of the detector backend in this process.
+        
+        Returns:
+            Dictionary with the backend name, frames detected, mean and max
+            latency and model load time in milliseconds
+        """
+        return dict(self.backend.stats.to_dict(), backend=self.backend.name)
+    
+    def _get_analysis_params(self, **analysis_params) -> dict:
+        """Combine the parameters of one analysis with the detector settings."""
+        return dict(self.get_detector_params(), **analysis_params)
+    
+    def _lookup_analysis(self, video_path: str, kind: str, params: dict) -> Tuple[Optional[str], Optional[dict]]:
+        """
+        Look up a stored analysis result.
+        
+        Args:
+            video_path: Path to video file
+            kind: Analysis kind ("static", "tracking" or "scene")
+            params: Parameters from _get_analysis_params()
+            
+        Returns:
+            Tuple of (cache key, stored result); the key is None when
+            caching is disabled and the result None on a miss
+        """
+        if not self.analysis_cache:
+            return None, None
+        
+        try:
+            key = self.analysis_cache.make_key(video_path, kind, params)
+        except OSError as e:
+            self.logger.warning(f"Failed to fingerprint {video_path} for the analysis cache: {e}")
+            return None, None
+        
+        return key, self.analysis_cache.lookup(key)
+    
+    def _store_analysis(self, key: Optional[str], kind: str, params: dict, result: dict) -> None:
+        """Store a successful analysis result under a key from _lookup_analysis()."""
+        if key:
+            self.analysis_cache.store(key, kind, params, result)
+    
+    def _track_face(self,
+                    gray: np.ndarray,
+                    template: np.ndarray,
+                    box: Tuple[int, int, int, int],
+                    min_score: float = 0.6) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Follow a face into the next sample with template matching.
+        
+        Args:
+            gray: Grayscale frame
+            template: Grayscale face patch from the previous sample
+            box: Previous face bounding box (x, y, w, h)
+            min_score: Minimum normalized correlation to accept the match
+            
+        Returns:
+            New face bounding box, or None if tracking was lost
+        """
+        x, y, w, h = box
+        frame_h, frame_w = gray.shape[:2]
+        
+        # Search a window twice the face size around the previous position
+        x0 = max(0, x - w)
+        y0 = max(0, y - h)
+        x1 = min(frame_w, x + 2 * w)
+        y1 = min(frame_h, y + 2 * h)
+        search = gray[y0:y1, x0:x1]
+        
+        if search.shape[0] < h or search.shape[1] < w:
+            return None
+        
+        result = cv2.matchTemplate(search, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (match_x, match_y) = cv2.minMaxLoc(result)
+        
+        if score < min_score:
+            return None
+        
+        return x0 + match_x, y0 + match_y, w, h
+    
+    def _pick_face(self,
+                   faces: List[Tuple[int, int, int, int]],
+                   prev_center: Optional[int] = None) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Choose the face to follow from a set of detections.
+        
+        Args:
+            faces: Detected face bounding boxes
+            prev_center: Previous tracked center_x, used to stay on the same subject
+            
+        Returns:
+            Chosen face bounding box, or None if there are no faces
+        """
+        if not faces:
+            return None
+        
+        if prev_center is not None:
+            return min(faces, key=lambda f: abs(f[0] + f[2] // 2 - prev_center))
+        
+        # Otherwise follow the largest face
+        return max(faces, key=lambda f: f[2] * f[3])
+    
+    def _smooth_centers(self, centers: List[Optional[int]], smoothing: float) -> List[int]:
+        """
+        Fill gaps and smooth a sequence of tracked centers.
+        
+        Args:
+            centers: Tracked center_x per sample, None where no face was found
+            smoothing: Exponential smoothing factor (0-1, lower is smoother)
+            
+        Returns:
+            Smoothed center_x per sample
+        """
+        # Interpolate across samples without a face, holding the ends
+        known = [i for i, c in enumerate(centers) if c is not None]
+        filled = np.interp(np.arange(len(centers)), known, [centers[i] for i in known])
+        
+        # Average a forward and a backward pass so the path doesn't lag the subject
+        forward = filled.copy()
+        backward = filled.copy()
+        for i in range(1, len(filled)):
+            forward[i] = smoothing * filled[i] + (1 - smoothing) * forward[i - 1]
+        for i in range(len(filled) - 2, -1, -1):
+            backward[i] = smoothing * filled[i] + (1 - smoothing) * backward[i + 1]
+        
+        return [int(round(c)) for c in (forward + backward) / 2]
+    
+    def _get_center_crop(self, video_path: str, media_info: Optional[MediaInfo] = None) -> Tuple[int, int]:
         """
         Get center crop position as fallback.
         
         Args:
             video_path: Path to video file
+            media_info: Probe results for the video (probed if not given)
             
         Returns:
             Tuple of (center_x, center_y)
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            cap.release()
-            
-            return width // 2, height // 2
+            info = media_info or probe_media(video_path)
+            return info.width // 2, info.height // 2
             
         except Exception as e:
             self.logger.error(f"Failed to get video dimensions: {e}")
@@ -0,0 +1,165 @@
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from watchdog.events import FileSystemEventHandler
+
+from .utils import VIDEO_EXTENSIONS, validate_video_file
+
+@dataclass
+class _PendingFile:
+    """A watched file that is still being written."""
+    
+    signature: Optional[Tuple[int, int]] = None
+    last_change: float = 0.0
+    closed: bool = False
+
+class FileWatcher(FileSystemEventHandler):
+    """
+    Watchdog handler that hands off video files once they are fully written.
+    
+    Events only mark a path as pending; a background thread polls pending
+    files and calls ``on_ready`` once their size and mtime have stopped
+    changing for ``settle_time`` seconds (or sooner after a close-after-write
+    event on inotify). Repeated events for the same path are collapsed,
+    renames follow the file to its new name (so ``.part`` uploads are picked
+    up when renamed), and a file is handed off again only if its contents
+    change. ``on_ready`` should be quick, e.g. enqueue a job.
+    """
+    
+    def __init__(self,
+                 on_ready: Callable[[str], None],
+                 settle_time: float = 5.0,
+                 poll_interval: float = 1.0):
+        """
+        Initialize file watcher.
+        
+        Args:
+            on_ready: Called with the path of each completely written video
+            settle_time: Seconds a file's size and mtime must stay unchanged
+            poll_interval: Seconds between stability checks
+        """
+        super().__init__()
+        self.on_ready = on_ready
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+        
+        self._pending: Dict[str, _PendingFile] = {}
+        # Signature of the last hand-off per path, to drop duplicate events
+        self._handed_off: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Start the stability polling thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the stability polling thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+    
+    def on_created(self, event):
+        """Track new files."""
+        if not event.is_directory:
+            self._touch(event.src_path)
+    
+    def on_modified(self, event):
+        """Restart the settle timer of files still being written."""
+        if not event.is_directory:
+            self._touch(event.src_path)
+    
+    def on_closed(self, event):
+        """Treat a close after writing as a strong hint the file is complete."""
+        if not event.is_directory:
+            self._touch(event.src_path, closed=True)
+    
+    def on_moved(self, event):
+        """Follow renames, e.g. 'upload.mp4.part' to 'upload.mp4'."""
+        if event.is_directory:
+            return
+        self._forget(event.src_path)
+        self._touch(event.dest_path)
+    
+    def on_deleted(self, event):
+        """Stop tracking deleted files."""
+        if not event.is_directory:
+            self._forget(event.src_path)
+    
+    def _touch(self, path: str, closed: bool = False) -> None:
+        """Mark a path as pending, ignoring non-video files."""
+        if Path(path).suffix.lower() not in VIDEO_EXTENSIONS:
+            return
+            
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is None:
+                pending = self._pending[path] = _PendingFile(last_change=time.monotonic())
+                self.logger.debug(f"Watching new file: {path}")
+            pending.closed = pending.closed or closed
+    
+    def _forget(self, path: str) -> None:
+        """Stop tracking a path."""
+        with self._lock:
+            self._pending.pop(path, None)
+            self._handed_off.pop(path, None)
+    
+    def _run(self) -> None:
+        """Poll pending files until stopped."""
+        while not self._stop_event.wait(self.poll_interval):
+            for path in self._check_pending():
+                self.logger.info(f"New video ready: {path}")
+                try:
+                    self.on_ready(path)
+                except Exception as e:
+                    self.logger.error(f"Failed to hand off {path}: {e}")
+    
+    def _check_pending(self) -> list:
+        """
+        Find pending files that have stopped changing.
+        
+        Returns:
+            List of paths ready to hand off
+        """
+        now = time.monotonic()
+        ready = []
+        
+        with self._lock:
+            for path, pending in list(self._pending.items()):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Deleted or renamed before we saw the event
+                    del self._pending[path]
+                    continue
+                    
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if signature != pending.signature:
+                    pending.signature = signature
+                    pending.last_change = now
+                    continue
+                    
+                # A closed file only needs one unchanged poll to confirm
+                settle_time = self.poll_interval if pending.closed else self.settle_time
+                if now - pending.last_change < settle_time:
+                    continue
+                    
+                del self._pending[path]
+                if self._handed_off.get(path) == signature:
+                    self.logger.debug(f"Ignoring duplicate event for unchanged file: {path}")
+                    continue
+                    
+                if validate_video_file(path):
+                    self._handed_off[path] = signature
+                    ready.append(path)
+                    
+        return ready
@@ -0,0 +1,216 @@
+import re
+import queue
+import logging
+import threading
+import subprocess
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import ffmpeg
+import numpy as np
+
+# Bytes per pixel of the supported raw output formats
+PIXEL_FORMATS = {'bgr24': 3, 'gray': 1}
+
+FrameCallback = Callable[[float, np.ndarray], None]
+
+class SharedFrameReader:
+    """
+    Decode a video once with ffmpeg and hand raw analysis frames to consumers.
+    
+    ffmpeg scales frames to the analysis size and writes them as raw pixels to
+    a pipe. Every frame is read into the same preallocated buffer, and
+    consumers see it through a numpy array that wraps that buffer without
+    copying. The array is overwritten by the next frame, so consumers that
+    keep a frame must copy it.
+    
+    Frames are either every frame at the source rate, a constant
+    ``sample_fps`` (decoded fully, but only kept frames are scaled and
+    converted) or, with ``keyframe_interval``, keyframes only at least that
+    many seconds apart. With ``start``, decoding begins at the keyframe at or
+    before that time instead of the beginning of the video, or exactly at
+    that time with ``accurate_seek``.
+    """
+    
+    def __init__(self,
+                 video_path: str,
+                 frame_width: int,
+                 frame_height: int,
+                 source_fps: float = 30.0,
+                 sample_fps: Optional[float] = None,
+                 keyframe_interval: Optional[float] = None,
+                 pix_fmt: str = 'bgr24',
+                 threads: Optional[int] = None,
+                 start: Optional[float] = None,
+                 max_frames: Optional[int] = None,
+                 accurate_seek: bool = False):
+        """
+        Initialize shared frame reader.
+        
+        Args:
+            video_path: Path to video file
+            frame_width: Width of the delivered frames
+            frame_height: Height of the delivered frames
+            source_fps: Source frame rate, for timestamps of unsampled frames
+            sample_fps: Deliver frames at this constant rate (default: every frame)
+            keyframe_interval: Decode keyframes only, at least this many
+                seconds apart; takes precedence over sample_fps
+            pix_fmt: "bgr24" or "gray"
+            threads: ffmpeg decoder threads (default: ffmpeg decides)
+            start: Seek to the keyframe at or before this time (seconds)
+            max_frames: Stop after this many frames (default: all)
+            accurate_seek: Decode from that keyframe but drop the frames
+                before ``start``, so the first frame is the one at ``start``
+        """
+        if pix_fmt not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported pixel format: {pix_fmt}")
+        
+        self.video_path = video_path
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.source_fps = source_fps or 30.0
+        self.sample_fps = sample_fps
+        self.keyframe_interval = keyframe_interval
+        self.pix_fmt = pix_fmt
+        self.threads = threads
+        self.start = start
+        self.max_frames = max_frames
+        self.accurate_seek = accurate_seek
+        self.logger = logging.getLogger(__name__)
+        
+        channels = PIXEL_FORMATS[pix_fmt]
+        self.frame_size = frame_width * frame_height * channels
+        self._buffer = bytearray(self.frame_size)
+        shape = (frame_height, frame_width, channels) if channels > 1 else (frame_height, frame_width)
+        self._frame = np.frombuffer(self._buffer, np.uint8).reshape(shape)
+        self._subscribers: List[FrameCallback] = []
+    
+    def subscribe(self, callback: FrameCallback) -> None:
+        """
+        Register a consumer for run().
+        
+        Args:
+            callback: Called with (timestamp, frame) for every frame
+        """
+        self._subscribers.append(callback)
+    
+    def run(self) -> int:
+        """
+        Decode the video once, passing every frame to all subscribers.
+        
+        Returns:
+            Number of frames delivered
+        """
+        count = 0
+        for timestamp, frame in self.frames():
+            for callback in self._subscribers:
+                callback(timestamp, frame)
+            count += 1
+        return count
+    
+    def frames(self) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Decode the video, yielding frames as they arrive.
+        
+        In keyframe mode a RuntimeError is raised if ffmpeg reports no
+        timestamp for a frame.
+        
+        Returns:
+            Iterator of (timestamp, frame); the frame array is reused
+        """
+        input_options = {}
+        if self.keyframe_interval:
+            input_options['skip_frame'] = 'nokey'
+        if self.start:
+            input_options['ss'] = self.start
+            if not self.accurate_seek:
+                # Start at the preceding keyframe rather than decoding up to the exact time
+                input_options['noaccurate_seek'] = None
+        stream = ffmpeg.input(self.video_path, **input_options)
+        
+        if self.keyframe_interval:
+            stream = stream.filter('select', f'isnan(prev_selected_t)+gte(t-prev_selected_t,{self.keyframe_interval:.3f})')
+        elif self.sample_fps:
+            stream = stream.filter('fps', fps=self.sample_fps)
+        
+        stream = stream.filter('scale', self.frame_width, self.frame_height)
+        if self.keyframe_interval:
+            # Keyframe times are irregular; showinfo reports them on stderr
+            stream = stream.filter('showinfo')
+        
+        output_options = {'format': 'rawvideo', 'pix_fmt': self.pix_fmt, 'vsync': 0}
+        if self.threads:
+            output_options['threads'] = self.threads
+        if self.max_frames:
+            output_options['vframes'] = self.max_frames
+        
+        command = (
+            stream
+            .output('pipe:', **output_options)
+            .global_args('-nostdin', '-loglevel', 'info' if self.keyframe_interval else 'error')
+            .compile()
+        )
+        
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE if self.keyframe_interval else subprocess.DEVNULL
+        )
+        
+        timestamps = None
+        reader = None
+        if self.keyframe_interval:
+            timestamps = queue.Queue()
+            reader = threading.Thread(target=self._read_timestamps, args=(process.stderr, timestamps), daemon=True)
+            reader.start()
+        
+        rate = self.sample_fps or self.source_fps
+        view = memoryview(self._buffer)
+        index = 0
+        
+        try:
+            while self._read_frame(process.stdout, view):
+                if timestamps is not None:
+                    try:
+                        timestamp = timestamps.get(timeout=5)
+                    except queue.Empty:
+                        # A guessed time would misplace the frame; stop instead
+                        raise RuntimeError(f"No showinfo timestamp for keyframe {index} of {self.video_path}")
+                else:
+                    timestamp = (self.start or 0.0) + index / rate
+                
+                yield timestamp, self._frame
+                index += 1
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            if reader:
+                reader.join(timeout=1)
+            self.logger.debug(f"Read {index} frames from {self.video_path}")
+    
+    def _read_frame(self, stdout, view: memoryview) -> bool:
+        """
+        Fill the frame buffer from the pipe.
+        
+        Args:
+            stdout: ffmpeg stdout pipe
+            view: memoryview over the frame buffer
+        
+        Returns:
+            True if a whole frame was read
+        """
+        filled = 0
+        while filled < self.frame_size:
+            read = stdout.readinto(view[filled:])
+            if not read:
+                return False
+            filled += read
+        return True
+    
+    def _read_timestamps(self, stderr, timestamps: queue.Queue) -> None:
+        """Collect frame timestamps from ffmpeg showinfo output."""
+        pattern = re.compile(rb'Parsed_showinfo.*pts_time:\s*(-?[\d.]+)')
+        for line in stderr:
+            match = pattern.search(line)
+            if match:
+                timestamps.put(float(match.group(1)))
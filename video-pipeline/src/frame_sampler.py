@@ -0,0 +1,231 @@
+import bisect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .frame_reader import SharedFrameReader
+from .media_info import probe_keyframes
+
+# Seek this far past a keyframe, so rounding in its printed time never
+# lands the seek on the keyframe before it
+KEYFRAME_SEEK_OFFSET = 0.001
+
+class FrameSampler:
+    """
+    Decode sample frames for analysis without random seeks.
+    
+    The default ``keyframes`` mode asks ffmpeg to decode keyframes only
+    (``-skip_frame nokey``), thin them to roughly ``max_frames`` evenly spaced
+    frames and pipe them out as raw BGR at the analysis resolution. The
+    ``sequential`` mode decodes the video in one forward pass and only
+    scales and converts the frames it keeps. Both read through a
+    SharedFrameReader.
+    """
+    
+    def __init__(self, analysis_width: Optional[int] = 640, mode: str = "keyframes"):
+        """
+        Initialize frame sampler.
+        
+        Args:
+            analysis_width: Width frames are decoded at (height keeps the
+                aspect); None decodes at source resolution
+            mode: "keyframes" or "sequential"
+        """
+        self.analysis_width = analysis_width
+        self.mode = mode
+        self.logger = logging.getLogger(__name__)
+    
+    def sample(self,
+               video_path: str,
+               width: int,
+               height: int,
+               duration: float,
+               max_frames: int = 20,
+               fps: Optional[float] = None) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Yield evenly spaced frames from a video.
+        
+        Args:
+            video_path: Path to video file
+            width: Source video width
+            height: Source video height
+            duration: Source duration in seconds
+            max_frames: Approximate number of frames to return
+            fps: Source frame rate, for timestamps when duration is unknown
+        
+        Returns:
+            Iterator of (timestamp, frame) with frames as BGR numpy arrays at
+            the analysis resolution
+        """
+        frame_width, frame_height = self.get_analysis_size(width, height)
+        
+        if self.mode == "keyframes" and duration > 0:
+            sampled = 0
+            try:
+                for sample in self._sample_keyframes(video_path, frame_width, frame_height, duration, max_frames):
+                    sampled += 1
+                    yield sample
+            except RuntimeError as e:
+                # Frames already yielded have correct times; keep them if there are enough
+                self.logger.warning(f"Keyframe sampling stopped after {sampled} frames: {e}")
+            
+            # Very long GOPs leave too few keyframes; fall back to a forward pass
+            if sampled >= min(max_frames, 3):
+                return
+            self.logger.info(f"Only {sampled} keyframes decoded, falling back to sequential sampling")
+        
+        yield from self._sample_sequential(video_path, frame_width, frame_height, duration, max_frames, fps)
+    
+    def get_keyframes(self, video_path: str) -> Optional[List[float]]:
+        """
+        Get the keyframe times sample_at() can seek to cheaply.
+        
+        Args:
+            video_path: Path to video file
+        
+        Returns:
+            Sorted keyframe timestamps, or None if they cannot be probed
+        """
+        try:
+            return probe_keyframes(video_path) or None
+        except Exception as e:
+            self.logger.warning(f"Could not probe keyframes, seeking accurately: {e}")
+            return None
+    
+    def snap_to_keyframes(self, timestamps: List[float], keyframes: Optional[List[float]]) -> List[float]:
+        """
+        Map times to the frames sample_at() actually decodes for them.
+        
+        Args:
+            timestamps: Requested times in seconds
+            keyframes: Keyframe times from get_keyframes(), or None
+        
+        Returns:
+            Sorted distinct times: the keyframe at or before each time, or
+            the times themselves without keyframes
+        """
+        if not keyframes:
+            return sorted(set(timestamps))
+        return sorted({keyframes[max(0, bisect.bisect_right(keyframes, timestamp) - 1)] for timestamp in timestamps})
+    
+    def sample_at(self,
+                  video_path: str,
+                  width: int,
+                  height: int,
+                  timestamps: List[float],
+                  keyframes: Optional[List[float]] = None,
+                  max_workers: int = 4) -> List[Tuple[float, np.ndarray]]:
+        """
+        Decode one frame at each of a set of times.
+        
+        Each frame is decoded by its own short ffmpeg run after an input
+        seek; the runs overlap on a small thread pool. Used to pick sample
+        positions adaptively.
+        
+        With ``keyframes``, each time snaps to the keyframe at or before it,
+        which decodes a single frame, and times sharing a keyframe yield
+        that frame once. Without, the seek is accurate, decoding from the
+        preceding keyframe up to the requested time.
+        
+        Args:
+            video_path: Path to video file
+            width: Source video width
+            height: Source video height
+            timestamps: Times to sample, in seconds
+            keyframes: Keyframe times from get_keyframes() (optional)
+            max_workers: Concurrent ffmpeg runs
+        
+        Returns:
+            List of (timestamp, frame) in time order, where timestamp is the
+            time of the decoded frame, with frames as BGR numpy arrays at the
+            analysis resolution; times that yield no frame are left out
+        """
+        frame_width, frame_height = self.get_analysis_size(width, height)
+        timestamps = self.snap_to_keyframes(timestamps, keyframes)
+        
+        def read(timestamp):
+            if keyframes:
+                reader = SharedFrameReader(video_path, frame_width, frame_height, start=timestamp + KEYFRAME_SEEK_OFFSET, max_frames=1)
+            else:
+                reader = SharedFrameReader(video_path, frame_width, frame_height, start=timestamp, max_frames=1, accurate_seek=True)
+            for _, frame in reader.frames():
+                return timestamp, frame.copy()
+            return None
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(timestamps)))) as executor:
+            return [sample for sample in executor.map(read, timestamps) if sample is not None]
+    
+    def _sample_keyframes(self,
+                          video_path: str,
+                          frame_width: int,
+                          frame_height: int,
+                          duration: float,
+                          max_frames: int) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Decode keyframes only and pipe them out as raw frames.
+        
+        Args:
+            video_path: Path to video file
+            frame_width: Output frame width
+            frame_height: Output frame height
+            duration: Source duration in seconds
+            max_frames: Approximate number of frames to return
+        
+        Returns:
+            Iterator of (timestamp, frame)
+        """
+        reader = SharedFrameReader(video_path, frame_width, frame_height, keyframe_interval=duration / max_frames)
+        
+        # The reader reuses its buffer; callers may keep the sampled frames
+        for timestamp, frame in reader.frames():
+            yield timestamp, frame.copy()
+    
+    def _sample_sequential(self,
+                           video_path: str,
+                           frame_width: int,
+                           frame_height: int,
+                           duration: float,
+                           max_frames: int,
+                           fps: Optional[float] = None) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Read the video in one forward pass, keeping evenly spaced frames.
+        
+        Args:
+            video_path: Path to video file
+            frame_width: Output frame width
+            frame_height: Output frame height
+            duration: Source duration in seconds (0 if unknown)
+            max_frames: Number of frames to return
+            fps: Source frame rate (optional)
+        
+        Returns:
+            Iterator of (timestamp, frame)
+        """
+        # ffmpeg's fps filter keeps evenly spaced frames without converting the rest
+        sample_fps = max_frames / duration if duration > 0 else None
+        reader = SharedFrameReader(video_path, frame_width, frame_height, source_fps=fps or 30.0, sample_fps=sample_fps)
+        
+        for count, (timestamp, frame) in enumerate(reader.frames()):
+            if count >= max_frames:
+                break
+            yield timestamp, frame.copy()
+    
+    def get_analysis_size(self, width: int, height: int) -> Tuple[int, int]:
+        """
+        Get the decode size for analysis frames.
+        
+        Args:
+            width: Source video width
+            height: Source video height
+        
+        Returns:
+            Tuple of (width, height), never larger than the source
+        """
+        if not self.analysis_width or width <= self.analysis_width:
+            return width, height
+        
+        frame_width = self.analysis_width - self.analysis_width % 2
+        frame_height = int(round(height * frame_width / width / 2)) * 2
+        return frame_width, frame_height
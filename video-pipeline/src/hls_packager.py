@@ -0,0 +1,296 @@
+import os
+import json
+import shutil
+import logging
+from typing import List, Optional, Tuple
+
+import ffmpeg
+
+from .media_info import MediaInfo, probe_keyframes, probe_media
+from .metrics import run_ffmpeg
+from .utils import compute_file_fingerprint
+
+# Video bitrate of a 1920x1080 rendition; smaller rungs scale from it
+REFERENCE_BITRATE_KBPS = 5000
+REFERENCE_PIXELS = 1920 * 1080
+
+# Records the MP4 fingerprint and settings a ladder was built from
+STAMP_FILE = '.source.json'
+
+class HLSPackager:
+    """
+    Package a finished MP4 as an HLS ladder with fMP4 (CMAF) segments.
+    
+    The rung at the MP4's own size is the MP4's video stream copied as is,
+    so the top rendition costs no encode and loses no quality. The smaller
+    rungs come from one decode of the MP4, split and scaled in the same
+    ffmpeg process, with keyframes forced exactly where the MP4 has them so
+    every rendition cuts its segments at the same times and switches
+    cleanly. The AAC audio is copied once and shared by all renditions
+    through an audio group. Segments, variant playlists and
+    ``master.m3u8`` go into a directory next to the MP4.
+    
+    Since the input is already compressed, no rung gets more bits than the
+    MP4 itself has at that size: a higher bitrate would only grow the
+    segments, never restore detail the first encode dropped.
+    
+    Each ladder records the fingerprint of the MP4 and the settings it was
+    built from, and is reused while both are unchanged, e.g. when the
+    transcoder serves a video from its result cache.
+    """
+    
+    # Longest keyframe list passed to -force_key_frames; longer videos
+    # encode every rung with keyframes on segment boundaries instead
+    MAX_FORCED_KEYFRAMES = 5000
+    
+    def __init__(self,
+                 ladder: List[int],
+                 segment_seconds: float = 4.0,
+                 audio_bitrate: str = "128k",
+                 threads: Optional[int] = None):
+        """
+        Initialize HLS packager.
+        
+        Args:
+            ladder: Rendition sizes as the short side in pixels, e.g.
+                [1080, 720, 480]; rungs above the source size are skipped
+            segment_seconds: Target segment duration
+            audio_bitrate: Bitrate of the shared audio rendition when the
+                MP4's audio is not AAC
+            threads: ffmpeg encoder threads (default: ffmpeg decides)
+        """
+        self.ladder = sorted(set(ladder), reverse=True)
+        self.segment_seconds = segment_seconds
+        self.audio_bitrate = audio_bitrate
+        self.threads = threads
+        self.logger = logging.getLogger(__name__)
+    
+    def get_keyframe_options(self) -> dict:
+        """
+        Get encoder options putting keyframes on segment boundaries.
+        
+        Added to the main MP4 encode, they keep the copied top rung's
+        segments close to ``segment_seconds``.
+        
+        Returns:
+            Dictionary of ffmpeg output keyword arguments
+        """
+        return {'force_key_frames': f'expr:gte(t,n_forced*{self.segment_seconds:g})'}
+    
+    def package(self, mp4_path: str, preset: Optional[str] = None) -> Optional[str]:
+        """
+        Build the HLS ladder for one output.
+        
+        Args:
+            mp4_path: Finished MP4 output
+            preset: libx264 preset for the encoded renditions
+                (default: libx264's)
+        
+        Returns:
+            Path to the master playlist, or None if packaging failed
+        """
+        hls_dir = os.path.splitext(mp4_path)[0] + '_hls'
+        work_dir = hls_dir + '.tmp'
+        master_path = os.path.join(hls_dir, 'master.m3u8')
+        
+        try:
+            stamp = {
+                'source': compute_file_fingerprint(mp4_path),
+                'ladder': self.ladder,
+                'segment_seconds': self.segment_seconds,
+                'audio_bitrate': self.audio_bitrate,
+                'preset': preset
+            }
+            if self._is_current(hls_dir, stamp):
+                self.logger.info(f"HLS ladder up to date: {hls_dir}")
+                return master_path
+            
+            media_info = probe_media(mp4_path)
+            rungs = self.get_rungs(media_info.width, media_info.height)
+            source_kbps = self.get_source_kbps(media_info)
+            keyframes = self._get_keyframes(mp4_path)
+            
+            # The top rung is the MP4 itself when it has the MP4's size
+            copy_top = keyframes is not None and rungs[0] == (media_info.width, media_info.height)
+            encoded = rungs[1:] if copy_top else rungs
+            
+            shutil.rmtree(work_dir, ignore_errors=True)
+            os.makedirs(work_dir)
+            
+            source = ffmpeg.input(mp4_path)
+            streams = [source['v:0']] if copy_top else []
+            if encoded:
+                split = source['v:0'].filter_multi_output('split', len(encoded))
+                streams += [split[i].filter('scale', width, height) for i, (width, height) in enumerate(encoded)]
+            
+            options = {
+                'f': 'hls',
+                'hls_time': self.segment_seconds,
+                'hls_playlist_type': 'vod',
+                'hls_segment_type': 'fmp4',
+                'hls_fmp4_init_filename': 'init_%v.mp4',
+                'hls_segment_filename': os.path.join(work_dir, 'stream_%v_%05d.m4s'),
+                'master_pl_name': 'master.m3u8'
+            }
+            if encoded:
+                options.update({'pix_fmt': 'yuv420p', 'sc_threshold': 0})
+                if preset:
+                    options['preset'] = preset
+                if self.threads:
+                    options['threads'] = self.threads
+            
+            if keyframes is not None:
+                # Just before each keyframe, so rounding in its printed time never skips a frame
+                forced_keyframes = ','.join(f'{max(0.0, keyframe - 0.001):.6f}' for keyframe in keyframes)
+            
+            stream_map = []
+            for i, (width, height) in enumerate(rungs):
+                if copy_top and i == 0:
+                    options['c:v:0'] = 'copy'
+                else:
+                    bitrate = self.get_bitrate_kbps(width, height, source_kbps, media_info.width * media_info.height)
+                    options[f'c:v:{i}'] = 'libx264'
+                    options[f'b:v:{i}'] = f'{bitrate}k'
+                    options[f'maxrate:v:{i}'] = f'{int(bitrate * 1.1)}k'
+                    options[f'bufsize:v:{i}'] = f'{bitrate * 2}k'
+                    if keyframes is not None:
+                        options[f'force_key_frames:v:{i}'] = forced_keyframes
+                    else:
+                        options[f'force_key_frames:v:{i}'] = self.get_keyframe_options()['force_key_frames']
+                stream_map.append(f'v:{i},agroup:audio' if media_info.has_audio else f'v:{i}')
+            
+            if media_info.has_audio:
+                streams.append(source['a:0'])
+                if media_info.audio_codec == 'aac':
+                    options['c:a'] = 'copy'
+                else:
+                    options['c:a'] = 'aac'
+                    options['audio_bitrate'] = self.audio_bitrate
+                stream_map.append('a:0,agroup:audio')
+            options['var_stream_map'] = ' '.join(stream_map)
+            
+            run_ffmpeg(
+                ffmpeg.output(*streams, os.path.join(work_dir, 'stream_%v.m3u8'), **options).overwrite_output(),
+                'package_hls',
+                media_info.duration
+            )
+            
+            with open(os.path.join(work_dir, STAMP_FILE), 'w') as f:
+                json.dump(stamp, f)
+            
+            # Swap in the finished ladder so players never see a partial one
+            shutil.rmtree(hls_dir, ignore_errors=True)
+            os.replace(work_dir, hls_dir)
+            
+            sizes = ', '.join(f'{width}x{height}' for width, height in rungs)
+            copied = ", top rung copied" if copy_top else ""
+            self.logger.info(f"Packaged HLS ladder ({sizes}{copied}): {hls_dir}")
+            return master_path
+        
+        except Exception as e:
+            self.logger.error(f"Failed to package HLS for {mp4_path}: {e}")
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return None
+    
+    def _is_current(self, hls_dir: str, stamp: dict) -> bool:
+        """
+        Check whether an existing ladder was built from this MP4 and settings.
+        
+        Args:
+            hls_dir: Ladder directory
+            stamp: Source fingerprint and packaging settings
+        
+        Returns:
+            True if the ladder can be reused
+        """
+        try:
+            with open(os.path.join(hls_dir, STAMP_FILE)) as f:
+                return json.load(f) == stamp and os.path.exists(os.path.join(hls_dir, 'master.m3u8'))
+        except (OSError, ValueError):
+            return False
+    
+    def _get_keyframes(self, mp4_path: str) -> Optional[List[float]]:
+        """
+        Get the MP4's keyframe times, which the encoded rungs copy.
+        
+        Args:
+            mp4_path: Finished MP4 output
+        
+        Returns:
+            Keyframe times, or None to encode every rung with keyframes on
+            segment boundaries instead
+        """
+        try:
+            keyframes = probe_keyframes(mp4_path)
+        except Exception as e:
+            self.logger.warning(f"Could not probe keyframes of {mp4_path}, encoding every rung: {e}")
+            return None
+        
+        if not keyframes or len(keyframes) > self.MAX_FORCED_KEYFRAMES:
+            return None
+        return keyframes
+    
+    def get_rungs(self, width: int, height: int) -> List[Tuple[int, int]]:
+        """
+        Get the rendition sizes for a video.
+        
+        Args:
+            width: Video width
+            height: Video height
+        
+        Returns:
+            List of (width, height), largest first, with even dimensions
+        """
+        short_side = min(width, height)
+        sizes = [size for size in self.ladder if size <= short_side] or [short_side]
+        
+        rungs = []
+        for size in sizes:
+            long_side = int(round(size * max(width, height) / short_side / 2)) * 2
+            size -= size % 2
+            rungs.append((long_side, size) if width >= height else (size, long_side))
+        return rungs
+    
+    def get_bitrate_kbps(self,
+                         width: int,
+                         height: int,
+                         source_kbps: Optional[float] = None,
+                         source_pixels: Optional[int] = None) -> int:
+        """
+        Get the video bitrate of a rendition.
+        
+        Bitrate grows slower than the pixel count, since larger frames
+        compress better. With the source bitrate, the same curve anchored at
+        the source caps the result, so a rung at the source size never
+        exceeds the source bitrate and smaller rungs stay below it.
+        
+        Args:
+            width: Rendition width
+            height: Rendition height
+            source_kbps: Video bitrate of the MP4 being packaged (optional)
+            source_pixels: Frame size of that MP4 in pixels
+        
+        Returns:
+            Bitrate in kbit/s
+        """
+        bitrate = REFERENCE_BITRATE_KBPS * (width * height / REFERENCE_PIXELS) ** 0.75
+        if source_kbps and source_pixels:
+            bitrate = min(bitrate, source_kbps * min(1.0, width * height / source_pixels) ** 0.75)
+        return max(1, int(round(bitrate)))
+    
+    def get_source_kbps(self, media_info: MediaInfo) -> Optional[float]:
+        """
+        Get the video bitrate of the MP4 being packaged.
+        
+        Args:
+            media_info: Probe results for the MP4
+        
+        Returns:
+            Bitrate in kbit/s, or None if the probe reported none
+        """
+        if media_info.video_bitrate:
+            return media_info.video_bitrate / 1000
+        if media_info.bit_rate:
+            # Container bitrate less the audio
+            return max(0, media_info.bit_rate - (media_info.audio_bitrate or 0)) / 1000 or None
+        return None
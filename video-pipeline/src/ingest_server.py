@@ -0,0 +1,610 @@
+import os
+import re
+import ssl
+import json
+import time
+import asyncio
+import logging
+from http import HTTPStatus
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+from .job_queue import JobQueue
+from .media_info import cache_probe, probe_media
+from .utils import VIDEO_EXTENSIONS, ensure_directory
+
+# Webhook routes, same as webhook-server-fixed.js: path -> (category, label)
+ROUTES = {
+    '/webhook/video-upload/short-form': ('short_form_9_16', 'Short form'),
+    '/webhook/video-upload/long-form': ('long_form_16_9_or_9_16', 'Long form'),
+    '/webhook/video-upload/listings': ('listings_16_9', 'Listings')
+}
+
+# Bytes read from a socket or written to disk at a time
+CHUNK_SIZE = 256 * 1024
+
+MAX_JSON_BYTES = 1024 * 1024
+MAX_REDIRECTS = 5
+
+class _HTTPError(Exception):
+    """Request failure reported to the client as a JSON error."""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class _MoovScanner:
+    """
+    Follow the top-level boxes of a streamed MP4/MOV file.
+    
+    Reports when the ``moov`` box (the index ffprobe needs) has been received
+    completely. Files with the index at the front ("faststart") can be probed
+    long before the media data has arrived.
+    """
+    
+    def __init__(self):
+        self.received = 0
+        self.moov_end: Optional[int] = None
+        self.failed = False
+        # Start and collected header bytes of the next top-level box
+        self._offset = 0
+        self._header = b''
+    
+    @property
+    def ready(self) -> bool:
+        """True once the whole moov box has been received."""
+        return self.moov_end is not None and self.received >= self.moov_end
+    
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Account for the next chunk of the file.
+        
+        Args:
+            chunk: Bytes following everything fed so far
+        
+        Returns:
+            True once the whole moov box has been received
+        """
+        start = self.received
+        self.received += len(chunk)
+        
+        while self.moov_end is None and not self.failed:
+            # Next header byte we still need, relative to this chunk
+            position = self._offset + len(self._header) - start
+            if position >= len(chunk):
+                break
+            
+            needed = (16 if self._header[:4] == b'\x00\x00\x00\x01' else 8) - len(self._header)
+            self._header += chunk[position:position + needed]
+            if len(self._header) < 8:
+                break
+            
+            size = int.from_bytes(self._header[:4], 'big')
+            box_type = self._header[4:8]
+            if size == 1:
+                if len(self._header) < 16:
+                    continue
+                size = int.from_bytes(self._header[8:16], 'big')
+            
+            if (self._offset == 0 and box_type != b'ftyp') or size < 8:
+                # Not ISO BMFF, or a box running to the end of the file
+                self.failed = True
+            elif box_type == b'moov':
+                self.moov_end = self._offset + size
+            else:
+                self._offset += size
+                self._header = b''
+        
+        return self.ready
+
+class _BodyReader:
+    """Read a request body with a known length through a bounded buffer."""
+    
+    def __init__(self, reader: asyncio.StreamReader, length: int, timeout: float):
+        self.reader = reader
+        self.remaining = length
+        self.timeout = timeout
+        self.buffer = bytearray()
+    
+    async def _fill(self) -> None:
+        """Read the next chunk of the body into the buffer."""
+        if self.remaining <= 0:
+            raise _HTTPError(400, 'Malformed multipart body')
+        
+        data = await asyncio.wait_for(self.reader.read(min(CHUNK_SIZE, self.remaining)), self.timeout)
+        if not data:
+            raise _HTTPError(400, 'Incomplete request body')
+        
+        self.remaining -= len(data)
+        self.buffer += data
+    
+    async def read_exactly(self, count: int) -> bytes:
+        """Read a fixed number of bytes."""
+        while len(self.buffer) < count:
+            await self._fill()
+        data = bytes(self.buffer[:count])
+        del self.buffer[:count]
+        return data
+    
+    async def read_until(self, marker: bytes, limit: int) -> bytes:
+        """Read up to a marker (consumed, not returned), buffering at most ``limit`` bytes."""
+        while True:
+            index = self.buffer.find(marker)
+            if index >= 0:
+                data = bytes(self.buffer[:index])
+                del self.buffer[:index + len(marker)]
+                return data
+            
+            if len(self.buffer) > limit:
+                raise _HTTPError(400, 'Multipart field too large')
+            await self._fill()
+    
+    async def stream_until(self, marker: bytes, write: Callable[[bytes], Awaitable[None]]) -> None:
+        """Pass everything up to a marker to ``write`` without buffering it all."""
+        while True:
+            index = self.buffer.find(marker)
+            if index >= 0:
+                await write(bytes(self.buffer[:index]))
+                del self.buffer[:index + len(marker)]
+                return
+            
+            # Hold back a possible partial marker at the end of the buffer
+            keep = len(marker) - 1
+            if len(self.buffer) > keep:
+                await write(bytes(self.buffer[:-keep]))
+                del self.buffer[:-keep]
+            await self._fill()
+
+class _IncomingVideo:
+    """
+    A video being received, written to ``<name>.part`` until complete.
+    
+    As soon as the MP4 index has arrived the partial file is probed in the
+    background, so broken or non-video uploads are rejected before the rest
+    is transferred. The result is kept for the final path, so transcoding
+    does not probe the file again.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.part_path = path + '.part'
+        self.size = 0
+        self.logger = logging.getLogger(__name__)
+        
+        self._file = open(self.part_path, 'wb')
+        self._scanner = _MoovScanner()
+        self._probe: Optional[asyncio.Task] = None
+    
+    async def write(self, data: bytes) -> None:
+        """Append a chunk, probing early once the index is complete."""
+        if not data:
+            return
+        
+        # Disk writes run in a thread so other transfers keep flowing
+        await asyncio.to_thread(self._file.write, data)
+        self.size += len(data)
+        
+        if self._probe is None and self._scanner.feed(data):
+            await asyncio.to_thread(self._file.flush)
+            self._probe = asyncio.create_task(asyncio.to_thread(probe_media, self.part_path))
+        
+        if self._probe is not None and self._probe.done():
+            self._check_probe()
+    
+    async def finish(self) -> str:
+        """
+        Complete the file and move it into place.
+        
+        Returns:
+            Final file path
+        """
+        await asyncio.to_thread(self._file.close)
+        
+        info = None
+        if self._probe is not None:
+            await asyncio.wait([self._probe])
+            info = self._check_probe()
+            if info:
+                self.logger.info(f"Early probe of {os.path.basename(self.path)}: {info.width}x{info.height}, {info.duration:.1f}s")
+        
+        os.replace(self.part_path, self.path)
+        
+        # Seed the probe memo under the final name for an in-process service
+        if info:
+            cache_probe(self.path, info)
+        return self.path
+    
+    def abort(self) -> None:
+        """Discard the partial file."""
+        if self._probe is not None:
+            self._probe.cancel()
+        self._file.close()
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
+    
+    def _check_probe(self):
+        """Raise if the early probe found the file unusable."""
+        try:
+            return self._probe.result()
+        except Exception as e:
+            raise _HTTPError(422, f'Not a valid video: {e}')
+
+class IngestServer:
+    """
+    Asyncio HTTP server that receives videos and queues them for transcoding.
+    
+    Serves the webhook routes of webhook-server-fixed.js: a JSON body with a
+    ``videoUrl`` is downloaded, and a multipart upload with a ``video`` file
+    field is saved, both streamed to ``input/<category>/`` in chunks through
+    bounded buffers. Every chunk is written before the next is read, so a
+    slow disk slows the sender instead of growing memory. Finished files are
+    added to the job queue directly, for a TranscoderService running in the
+    same process.
+    """
+    
+    def __init__(self,
+                 job_queue: JobQueue,
+                 input_dir: str = "input",
+                 host: str = "0.0.0.0",
+                 port: int = 3000,
+                 max_upload_bytes: int = 500 * 1024 * 1024,
+                 max_downloads: int = 4,
+                 timeout: float = 60.0):
+        """
+        Initialize ingest server.
+        
+        Args:
+            job_queue: Queue that received videos are added to
+            input_dir: Directory videos are saved under, per category
+            host: Address to listen on
+            port: Port to listen on
+            max_upload_bytes: Largest accepted upload
+            max_downloads: URL downloads running at once
+            timeout: Seconds without data before a transfer is abandoned
+        """
+        self.job_queue = job_queue
+        self.input_dir = input_dir
+        self.host = host
+        self.port = port
+        self.max_upload_bytes = max_upload_bytes
+        self.max_downloads = max_downloads
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._download_slots: Optional[asyncio.Semaphore] = None
+    
+    def run(self) -> None:
+        """Serve until stop() is called."""
+        asyncio.run(self.serve())
+    
+    def stop(self) -> None:
+        """Stop serving; safe to call from another thread."""
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+    
+    async def serve(self) -> None:
+        """Serve until stop() is called."""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._download_slots = asyncio.Semaphore(self.max_downloads)
+        
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=64 * 1024)
+        self.logger.info(f"Ingest server listening on {self.host}:{self.port}")
+        
+        async with server:
+            await self._stop_event.wait()
+        
+        self.logger.info("Ingest server stopped")
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer one request per connection."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.timeout)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+        
+        try:
+            method, path, headers = self._parse_head(head)
+            status, body = await self._dispatch(method, path, headers, reader)
+        except _HTTPError as e:
+            status, body = e.status, {'success': False, 'error': e.message}
+        except Exception as e:
+            self.logger.error(f"Server error: {e}")
+            status, body = 500, {'success': False, 'error': 'Internal server error'}
+        
+        payload = json.dumps(body).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + payload
+        )
+        
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    def _parse_head(self, head: bytes) -> Tuple[str, str, Dict[str, str]]:
+        """
+        Parse the request line and headers.
+        
+        Returns:
+            Tuple of (method, path, headers) with lowercase header names
+        """
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            raise _HTTPError(400, 'Malformed request')
+        
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        
+        return method.upper(), urlsplit(target).path, headers
+    
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str], reader: asyncio.StreamReader) -> Tuple[int, dict]:
+        """Route a request to its handler."""
+        if path == '/health' and method == 'GET':
+            return 200, {
+                'status': 'OK',
+                'message': 'Video transcoder ingest server running (URL + Upload mode)',
+                'modes': ['url-download', 'file-upload']
+            }
+        
+        if path not in ROUTES:
+            raise _HTTPError(404, 'Not found')
+        if method != 'POST':
+            raise _HTTPError(405, 'Method not allowed')
+        
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise _HTTPError(411, 'Content-Length required')
+        
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            raise _HTTPError(400, 'Invalid Content-Length')
+        
+        category, label = ROUTES[path]
+        body = _BodyReader(reader, length, self.timeout)
+        content_type = headers.get('content-type', '')
+        
+        if content_type.startswith('multipart/form-data'):
+            match = re.search(r'boundary="?([^";]+)"?', content_type)
+            if not match:
+                raise _HTTPError(400, 'Missing multipart boundary')
+            return await self._handle_upload(body, match.group(1).encode(), category, label)
+        
+        if length > MAX_JSON_BYTES:
+            raise _HTTPError(413, 'Request body too large')
+        
+        try:
+            payload = json.loads(await body.read_exactly(length) or b'{}')
+        except ValueError:
+            raise _HTTPError(400, 'Invalid JSON body')
+        
+        if not isinstance(payload, dict) or not payload.get('videoUrl'):
+            raise _HTTPError(400, 'No video URL provided')
+        return await self._handle_url(payload['videoUrl'], category)
+    
+    async def _handle_url(self, video_url: str, category: str) -> Tuple[int, dict]:
+        """Download a video from a URL and queue it."""
+        self.logger.info(f"Received {category} video URL: {video_url}")
+        
+        filename = get_filename_from_url(video_url)
+        video = _IncomingVideo(self._get_upload_path(category, filename))
+        
+        try:
+            async with self._download_slots:
+                await self._download(video_url, video)
+            input_path = await video.finish()
+        except _HTTPError:
+            video.abort()
+            raise
+        except Exception as e:
+            video.abort()
+            self.logger.error(f"Download failed: {e}")
+            raise _HTTPError(500, str(e))
+        
+        self.logger.info(f"Video downloaded: {filename} ({video.size / 1024 / 1024:.2f} MB)")
+        job_id = await asyncio.to_thread(self.job_queue.enqueue, input_path, category)
+        
+        return 200, {
+            'success': True,
+            'message': f'{category} video downloaded and queued for processing',
+            'filename': filename,
+            'videoUrl': video_url,
+            'jobId': job_id
+        }
+    
+    async def _handle_upload(self, body: _BodyReader, boundary: bytes, category: str, label: str) -> Tuple[int, dict]:
+        """Save a multipart upload, or download its videoUrl field, and queue it."""
+        delimiter = b'--' + boundary
+        fields = {}
+        video = None
+        filename = None
+        
+        async def write(data: bytes) -> None:
+            if video.size + len(data) > self.max_upload_bytes:
+                raise _HTTPError(400, f'File too large. Maximum size is {self.max_upload_bytes // (1024 * 1024)}MB.')
+            await video.write(data)
+        
+        try:
+            await body.read_until(delimiter + b'\r\n', 64 * 1024)
+            
+            while True:
+                part_headers = (await body.read_until(b'\r\n\r\n', 16 * 1024)).decode('utf-8', 'replace')
+                name = re.search(r'\bname="([^"]*)"', part_headers)
+                part_filename = re.search(r'\bfilename="([^"]*)"', part_headers)
+                
+                if name and name.group(1) == 'video' and part_filename and video is None:
+                    filename = f"{int(time.time() * 1000)}_{_sanitize(part_filename.group(1))}"
+                    video = _IncomingVideo(self._get_upload_path(category, filename))
+                    await body.stream_until(b'\r\n' + delimiter, write)
+                else:
+                    value = await body.read_until(b'\r\n' + delimiter, 64 * 1024)
+                    if name:
+                        fields[name.group(1)] = value.decode('utf-8', 'replace')
+                
+                if await body.read_exactly(2) == b'--':
+                    break
+            
+            if video is None:
+                if fields.get('videoUrl'):
+                    return await self._handle_url(fields['videoUrl'], category)
+                raise _HTTPError(400, 'No video file uploaded')
+            
+            input_path = await video.finish()
+        except BaseException:
+            if video is not None:
+                video.abort()
+            raise
+        
+        self.logger.info(f"{label} video uploaded: {filename}")
+        job_id = await asyncio.to_thread(self.job_queue.enqueue, input_path, category)
+        
+        return 200, {
+            'success': True,
+            'message': f'{label} video uploaded and queued for processing',
+            'filename': filename,
+            'jobId': job_id
+        }
+    
+    async def _download(self, video_url: str, video: _IncomingVideo, redirects: int = 0) -> None:
+        """
+        Stream a URL into a file, following redirects.
+        
+        Args:
+            video_url: http(s) URL to download
+            video: Destination file
+            redirects: Redirects followed so far
+        """
+        if redirects > MAX_REDIRECTS:
+            raise RuntimeError('Too many redirects')
+        
+        url = urlsplit(video_url)
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise _HTTPError(400, f'Unsupported video URL: {video_url}')
+        
+        secure = url.scheme == 'https'
+        port = url.port or (443 if secure else 80)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                url.hostname, port,
+                ssl=ssl.create_default_context() if secure else None,
+                limit=CHUNK_SIZE
+            ),
+            self.timeout
+        )
+        
+        try:
+            target = (url.path or '/') + (f'?{url.query}' if url.query else '')
+            host = url.hostname if url.port is None else f'{url.hostname}:{url.port}'
+            writer.write(
+                f"GET {target} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                f"User-Agent: video-pipeline-ingest\r\n"
+                f"Accept: */*\r\n"
+                f"Connection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.timeout)
+            status_line, *header_lines = head.decode('latin-1').split('\r\n')
+            status = int(status_line.split(' ', 2)[1])
+            headers = {}
+            for line in header_lines:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+            
+            if 300 <= status < 400 and 'location' in headers:
+                redirect_url = urljoin(video_url, headers['location'])
+                self.logger.info(f"Following redirect to: {redirect_url}")
+                writer.close()
+                return await self._download(redirect_url, video, redirects + 1)
+            
+            if status != 200:
+                raise RuntimeError(f'Failed to download: {status}')
+            
+            if 'chunked' in headers.get('transfer-encoding', '').lower():
+                await self._read_chunked(reader, video)
+            else:
+                remaining = int(headers['content-length']) if 'content-length' in headers else None
+                while remaining is None or remaining > 0:
+                    size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                    data = await asyncio.wait_for(reader.read(size), self.timeout)
+                    if not data:
+                        if remaining:
+                            raise RuntimeError('Download ended early')
+                        break
+                    await video.write(data)
+                    if remaining is not None:
+                        remaining -= len(data)
+        finally:
+            writer.close()
+    
+    async def _read_chunked(self, reader: asyncio.StreamReader, video: _IncomingVideo) -> None:
+        """Stream a chunked transfer-encoded response body into a file."""
+        while True:
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+            size = int(line.split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                # Skip trailers
+                while (await asyncio.wait_for(reader.readline(), self.timeout)).strip():
+                    pass
+                return
+            
+            while size > 0:
+                data = await asyncio.wait_for(reader.readexactly(min(CHUNK_SIZE, size)), self.timeout)
+                await video.write(data)
+                size -= len(data)
+            await reader.readexactly(2)
+    
+    def _get_upload_path(self, category: str, filename: str) -> str:
+        """Path a received video is saved to."""
+        upload_dir = os.path.join(self.input_dir, category)
+        ensure_directory(upload_dir)
+        return os.path.join(upload_dir, filename)
+
+def get_filename_from_url(video_url: str) -> str:
+    """
+    Choose a local filename for a video URL.
+    
+    Uses the URL's file name, or a filename/file/name query parameter, if it
+    has a video extension; otherwise falls back to ``video.mp4``.
+    
+    Args:
+        video_url: Video URL
+    
+    Returns:
+        Timestamp-prefixed, sanitized filename
+    """
+    url = urlsplit(video_url)
+    filename = os.path.basename(url.path)
+    
+    if Path(filename).suffix.lower() not in VIDEO_EXTENSIONS:
+        params = parse_qs(url.query)
+        candidates = [values[0] for key in ('filename', 'file', 'name') for values in [params.get(key)] if values]
+        filename = next(
+            (c for c in candidates if Path(c).suffix.lower() in VIDEO_EXTENSIONS),
+            'video.mp4'
+        )
+    
+    return f"{int(time.time() * 1000)}_{_sanitize(filename)}"
+
+def _sanitize(filename: str) -> str:
+    """Replace characters outside [a-zA-Z0-9._-] in a filename."""
+    return re.sub(r'[^a-zA-Z0-9._-]', '_', os.path.basename(filename)) or 'video.mp4'
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+from pathlib import Path
+from typing import Optional
+
+from .utils import ensure_directory
+
+class JobQueue:
+    """
+    Durable spool-directory job queue.
+    
+    Each job is a small JSON file that moves between ``pending/``, ``active/``,
+    ``done/`` and ``failed/`` using atomic renames, so producers in other
+    processes (e.g. the Node webhook) only need to write a file to enqueue.
+    
+    An active job is leased to the worker that claimed it: the worker keeps
+    the job file's mtime fresh with renew(), and recover() only requeues
+    jobs whose lease ran out. Several services can therefore share one
+    spool directory without taking over each other's running jobs.
+    """
+    
+    STATES = ('pending', 'active', 'done', 'failed')
+    
+    def __init__(self, queue_dir: str = "queue", lease_seconds: float = 60):
+        """
+        Initialize job queue.
+        
+        Args:
+            queue_dir: Root directory of the spool queue
+            lease_seconds: Active jobs not renewed for this long are
+                considered abandoned by a crashed worker
+        """
+        self.queue_dir = queue_dir
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.logger = logging.getLogger(__name__)
+        
+        for state in self.STATES:
+            ensure_directory(os.path.join(self.queue_dir, state))
+    
+    def enqueue(self, input_path: str, category: Optional[str] = None) -> str:
+        """
+        Add a video to the queue.
+        
+        Args:
+            input_path: Path to input video file
+            category: Webhook category the video arrived on (optional)
+        
+        Returns:
+            Job ID
+        """
+        job_id = f"{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
+        job = {
+            'id': job_id,
+            'input': os.path.abspath(input_path),
+            'category': category,
+            'created_at': time.time()
+        }
+        
+        # Write to a hidden temp file first so workers never see partial jobs
+        tmp_path = os.path.join(self.queue_dir, 'pending', f".{job_id}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._job_path('pending', job_id))
+        
+        self.logger.info(f"Enqueued job {job_id}: {input_path}")
+        return job_id
+    
+    def claim(self) -> Optional[dict]:
+        """
+        Claim the oldest pending job.
+        
+        Returns:
+            Job dictionary, or None if the queue is empty
+        """
+        pending_dir = Path(self.queue_dir) / 'pending'
+        
+        for job_file in sorted(pending_dir.glob('[!.]*.json')):
+            job_id = job_file.stem
+            try:
+                os.rename(job_file, self._job_path('active', job_id))
+                # The rename keeps the enqueue mtime; start the lease right away
+                os.utime(self._job_path('active', job_id))
+            except FileNotFoundError:
+                # Another worker claimed it first
+                continue
+            
+            try:
+                with open(self._job_path('active', job_id)) as f:
+                    job = json.load(f)
+            except FileNotFoundError:
+                # Requeued by another worker before the lease was taken
+                continue
+            except (OSError, ValueError) as e:
+                self.logger.error(f"Discarding unreadable job {job_id}: {e}")
+                self._move(job_id, 'active', 'failed')
+                continue
+            
+            job['id'] = job_id
+            job['started_at'] = time.time()
+            job['worker'] = self.worker_id
+            
+            # Rewriting the file records the owner and starts the lease
+            self._write(job, 'active')
+            return job
+        
+        return None
+    
+    def complete(self, job: dict, outputs: list[str]) -> None:
+        """
+        Mark a claimed job as done.
+        
+        Args:
+            job: Job dictionary returned by claim()
+            outputs: Output file paths created
+        """
+        job['outputs'] = outputs
+        job['finished_at'] = time.time()
+        self._finish(job, 'done')
+    
+    def fail(self, job: dict, error: str) -> None:
+        """
+        Mark a claimed job as failed.
+        
+        Args:
+            job: Job dictionary returned by claim()
+            error: Error message
+        """
+        job['error'] = error
+        job['finished_at'] = time.time()
+        self._finish(job, 'failed')
+    
+    def renew(self, job: dict) -> bool:
+        """
+        Extend the lease on a claimed job.
+        
+        Call well within ``lease_seconds`` while the job runs.
+        
+        Args:
+            job: Job dictionary returned by claim()
+        
+        Returns:
+            False if the job is no longer active (its lease had expired)
+        """
+        try:
+            os.utime(self._job_path('active', job['id']))
+            return True
+        except FileNotFoundError:
+            self.logger.warning(f"Lease on job {job['id']} was lost")
+            return False
+    
+    def recover(self) -> int:
+        """
+        Return jobs whose lease expired to the pending state.
+        
+        Jobs of live workers, in this process or another service sharing
+        the queue directory, keep being renewed and are left alone.
+        
+        Returns:
+            Number of jobs requeued
+        """
+        active_dir = Path(self.queue_dir) / 'active'
+        expired = time.time() - self.lease_seconds
+        recovered = 0
+        
+        for job_file in active_dir.glob('[!.]*.json'):
+            try:
+                if job_file.stat().st_mtime > expired:
+                    continue
+            except FileNotFoundError:
+                continue
+            
+            if self._move(job_file.stem, 'active', 'pending'):
+                recovered += 1
+        
+        if recovered:
+            self.logger.info(f"Requeued {recovered} interrupted jobs")
+        return recovered
+    
+    def pending_count(self) -> int:
+        """Get the number of jobs waiting to be claimed."""
+        return len(list((Path(self.queue_dir) / 'pending').glob('[!.]*.json')))
+    
+    def _finish(self, job: dict, state: str) -> None:
+        """Write the final job record and remove it from the active state."""
+        self._write(job, state)
+        
+        try:
+            os.unlink(self._job_path('active', job['id']))
+        except FileNotFoundError:
+            pass
+    
+    def _write(self, job: dict, state: str) -> None:
+        """Atomically write a job record into a state directory."""
+        job_id = job['id']
+        tmp_path = os.path.join(self.queue_dir, state, f".{job_id}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._job_path(state, job_id))
+    
+    def _move(self, job_id: str, source: str, target: str) -> bool:
+        """Move a job file between states; False if it was already gone."""
+        try:
+            os.rename(self._job_path(source, job_id), self._job_path(target, job_id))
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def _job_path(self, state: str, job_id: str) -> str:
+        """Get the path of a job file in a given state."""
+        return os.path.join(self.queue_dir, state, f"{job_id}.json")
@@ -0,0 +1,251 @@
+import os
+import json
+import logging
+import subprocess
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """Probe results for one media file, shared by every pipeline stage."""
+    
+    path: str
+    width: int
+    height: int
+    rotation: int
+    fps: float
+    duration: float
+    frame_count: int
+    video_codec: str
+    video_profile: Optional[str]
+    pix_fmt: Optional[str]
+    video_bitrate: Optional[int]
+    has_b_frames: bool
+    audio_codec: Optional[str]
+    audio_bitrate: Optional[int]
+    audio_channels: Optional[int]
+    audio_sample_rate: Optional[int]
+    format_name: str
+    bit_rate: Optional[int]
+    size: int
+    
+    @property
+    def has_audio(self) -> bool:
+        """Whether the file has an audio stream."""
+        return self.audio_codec is not None
+
+# Memoized probe results keyed on (path, mtime, size)
+_probe_cache: OrderedDict = OrderedDict()
+_probe_cache_lock = threading.Lock()
+_PROBE_CACHE_SIZE = 256
+
+def probe_media(video_path: str) -> MediaInfo:
+    """
+    Probe a media file once with ffprobe.
+    
+    Results are memoized by path and modification time, so every stage of a
+    job can call this without paying for another probe.
+    
+    Args:
+        video_path: Path to video file
+    
+    Returns:
+        MediaInfo for the file
+    """
+    stat = os.stat(video_path)
+    cache_key = (os.path.abspath(video_path), stat.st_mtime_ns, stat.st_size)
+    
+    with _probe_cache_lock:
+        if cache_key in _probe_cache:
+            _probe_cache.move_to_end(cache_key)
+            return _probe_cache[cache_key]
+    
+    try:
+        cmd = [
+            'ffprobe',
+            '-v', 'quiet',
+            '-print_format', 'json',
+            '-show_streams',
+            '-show_format',
+            video_path
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        info = _parse_probe(video_path, json.loads(result.stdout), stat.st_size)
+    
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to probe video: {e}")
+    
+    logger.debug(f"Probed {video_path}: {info.width}x{info.height} {info.video_codec} {info.duration:.1f}s")
+    
+    _store(cache_key, info)
+    return info
+
+def cache_probe(video_path: str, info: MediaInfo) -> MediaInfo:
+    """
+    Memoize probe results taken from another copy of a file.
+    
+    The ingest server probes uploads while they are still ``.part`` files;
+    storing that result under the final path lets the job reuse it instead
+    of running ffprobe again. Stream properties come from the MP4 index and
+    hold for the complete file; size dependent fields are recomputed.
+    
+    Args:
+        video_path: Path of the complete file
+        info: MediaInfo probed from the partial file
+    
+    Returns:
+        MediaInfo for the complete file
+    """
+    stat = os.stat(video_path)
+    bit_rate = int(stat.st_size * 8 / info.duration) if info.duration > 0 else info.bit_rate
+    info = replace(info, path=video_path, size=stat.st_size, bit_rate=bit_rate)
+    
+    _store((os.path.abspath(video_path), stat.st_mtime_ns, stat.st_size), info)
+    return info
+
+def probe_keyframes(video_path: str) -> List[float]:
+    """
+    Get the timestamps of the video keyframes.
+    
+    Reads packet flags only (no decoding). Results are memoized like
+    probe_media, since segmenting and sampling may both ask for them.
+    
+    Args:
+        video_path: Path to video file
+    
+    Returns:
+        Sorted keyframe timestamps in seconds
+    """
+    stat = os.stat(video_path)
+    cache_key = ('keyframes', os.path.abspath(video_path), stat.st_mtime_ns, stat.st_size)
+    
+    with _probe_cache_lock:
+        if cache_key in _probe_cache:
+            _probe_cache.move_to_end(cache_key)
+            return _probe_cache[cache_key]
+    
+    try:
+        cmd = [
+            'ffprobe',
+            '-v', 'quiet',
+            '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,flags',
+            '-of', 'csv=p=0',
+            video_path
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to probe keyframes: {e}")
+    
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags and _to_float(pts_time) is not None:
+            keyframes.append(float(pts_time))
+    keyframes.sort()
+    
+    _store(cache_key, keyframes)
+    return keyframes
+
+def _store(cache_key: tuple, value) -> None:
+    """Add a probe result to the memo, evicting the oldest entries."""
+    with _probe_cache_lock:
+        _probe_cache[cache_key] = value
+        while len(_probe_cache) > _PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+
+def _parse_probe(video_path: str, data: dict, size: int) -> MediaInfo:
+    """
+    Build a MediaInfo from ffprobe JSON output.
+    
+    Args:
+        video_path: Path to video file
+        data: Parsed ffprobe output
+        size: File size in bytes
+    
+    Returns:
+        MediaInfo for the file
+    """
+    streams = data.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    fmt = data.get('format', {})
+    
+    if video is None:
+        raise ValueError("No video stream found")
+    
+    rotation = _get_rotation(video)
+    width, height = int(video['width']), int(video['height'])
+    
+    # Decoders auto-rotate, so report the displayed orientation
+    if rotation in (90, 270):
+        width, height = height, width
+    
+    fps = _parse_rate(video.get('avg_frame_rate')) or _parse_rate(video.get('r_frame_rate')) or 30.0
+    duration = _to_float(video.get('duration')) or _to_float(fmt.get('duration')) or 0.0
+    frame_count = _to_int(video.get('nb_frames')) or int(round(duration * fps))
+    
+    return MediaInfo(
+        path=video_path,
+        width=width,
+        height=height,
+        rotation=rotation,
+        fps=fps,
+        duration=duration,
+        frame_count=frame_count,
+        video_codec=video.get('codec_name', ''),
+        video_profile=video.get('profile'),
+        pix_fmt=video.get('pix_fmt'),
+        video_bitrate=_to_int(video.get('bit_rate')),
+        has_b_frames=bool(_to_int(video.get('has_b_frames'))),
+        audio_codec=audio.get('codec_name') if audio else None,
+        audio_bitrate=_to_int(audio.get('bit_rate')) if audio else None,
+        audio_channels=_to_int(audio.get('channels')) if audio else None,
+        audio_sample_rate=_to_int(audio.get('sample_rate')) if audio else None,
+        format_name=fmt.get('format_name', ''),
+        bit_rate=_to_int(fmt.get('bit_rate')),
+        size=size
+    )
+
+def _get_rotation(stream: dict) -> int:
+    """Get the clockwise display rotation of a video stream in degrees."""
+    rotation = _to_int(stream.get('tags', {}).get('rotate'))
+    
+    for side_data in stream.get('side_data_list', []):
+        if 'rotation' in side_data:
+            # Display matrix rotation is counter-clockwise
+            rotation = -int(float(side_data['rotation']))
+    
+    return (rotation or 0) % 360
+
+def _parse_rate(rate: Optional[str]) -> Optional[float]:
+    """Parse an ffprobe frame rate such as '30000/1001'."""
+    if not rate:
+        return None
+    try:
+        num, _, den = rate.partition('/')
+        value = float(num) / float(den or 1)
+        return value if value > 0 else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def _to_int(value) -> Optional[int]:
+    """Convert an ffprobe field to int, or None if missing."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value) -> Optional[float]:
+    """Convert an ffprobe field to float, or None if missing."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,464 @@
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional
+
+import ffmpeg
+
+from .utils import ensure_directory
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory locks, recorders write unlocked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class FFmpegStats:
+    """Resource usage and progress of one finished ffmpeg process."""
+    
+    cpu_seconds: Optional[float]
+    max_rss_kb: Optional[int]
+    frames: Optional[int] = None
+    fps: Optional[float] = None
+    speed: Optional[float] = None
+    
+    def to_dict(self) -> dict:
+        """Convert to a JSON-serializable dictionary."""
+        return {
+            'cpu_seconds': round(self.cpu_seconds, 3) if self.cpu_seconds is not None else None,
+            'max_rss_kb': self.max_rss_kb,
+            'frames': self.frames,
+            'fps': self.fps,
+            'speed': self.speed
+        }
+
+@dataclass
+class StageTiming:
+    """Timing of one pipeline stage."""
+    
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    ffmpeg: Optional[FFmpegStats] = None
+    detector: Optional[dict] = None
+    
+    def to_dict(self) -> dict:
+        """Convert to a JSON-serializable dictionary."""
+        result = {
+            'name': self.name,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3)
+        }
+        if self.ffmpeg:
+            result['ffmpeg'] = self.ffmpeg.to_dict()
+        if self.detector:
+            result['detector'] = self.detector
+        return result
+
+@dataclass
+class JobMetrics:
+    """Per-stage timings collected while one video is processed."""
+    
+    input_path: str
+    category: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    status: str = 'running'
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    stages: List[StageTiming] = field(default_factory=list)
+    
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+    
+    def add_stage(self, stage: StageTiming) -> None:
+        """Record a finished stage (thread-safe)."""
+        with self._lock:
+            self.stages.append(stage)
+    
+    def finish(self, status: str) -> None:
+        """Mark the job finished and record its total times."""
+        self.status = status
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.cpu_seconds = time.process_time() - self._cpu_start
+    
+    def to_dict(self) -> dict:
+        """Convert to a JSON-serializable dictionary."""
+        return {
+            'input': self.input_path,
+            'category': self.category,
+            'started_at': self.started_at,
+            'status': self.status,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            'stages': [stage.to_dict() for stage in self.stages]
+        }
+
+@dataclass
+class ProgressEvent:
+    """One progress update of a running ffmpeg process."""
+    
+    input_path: Optional[str]
+    stage: str
+    frame: Optional[int]
+    fps: Optional[float]
+    out_time: Optional[float]
+    speed: Optional[float]
+    duration: Optional[float] = None
+    done: bool = False
+    
+    @property
+    def percent(self) -> Optional[float]:
+        """Share of the expected output written so far, if the duration is known."""
+        if not self.duration or self.out_time is None:
+            return None
+        return min(100.0, max(0.0, 100.0 * self.out_time / self.duration))
+
+@dataclass
+class ProgressSettings:
+    """Where progress events go and when a silent ffmpeg counts as stalled."""
+    
+    input_path: Optional[str] = None
+    callback: Optional[Callable[[ProgressEvent], None]] = None
+    stall_timeout: Optional[float] = None
+
+class FFmpegStalledError(RuntimeError):
+    """ffmpeg reported no progress within the stall timeout and was killed."""
+
+class ProgressLogger:
+    """
+    Progress callback that logs each ffmpeg run at most every few seconds.
+    """
+    
+    def __init__(self, interval: float = 10.0):
+        """
+        Initialize progress logger.
+        
+        Args:
+            interval: Minimum seconds between log lines per stage
+        """
+        self.interval = interval
+        self._last_logged = {}
+    
+    def __call__(self, event: ProgressEvent) -> None:
+        """Log a progress event if the stage was not logged recently."""
+        key = (event.input_path, event.stage)
+        now = time.monotonic()
+        
+        if event.done:
+            self._last_logged.pop(key, None)
+        elif now - self._last_logged.get(key, 0.0) < self.interval:
+            return
+        else:
+            self._last_logged[key] = now
+        
+        percent = f"{event.percent:.0f}%" if event.percent is not None else f"{event.out_time or 0:.0f}s"
+        logger.info(f"{event.stage} {os.path.basename(event.input_path or '')}: {percent}, "
+                    f"frame {event.frame}, {event.fps} fps, {event.speed}x{' (done)' if event.done else ''}")
+
+# Metrics of the job running in the current thread/context
+_current_job: ContextVar[Optional[JobMetrics]] = ContextVar('current_job', default=None)
+
+# Progress reporting for ffmpeg runs in the current thread/context
+_current_progress: ContextVar[ProgressSettings] = ContextVar('current_progress', default=ProgressSettings())
+
+@contextmanager
+def track_job(job: JobMetrics) -> Iterator[JobMetrics]:
+    """
+    Make a job the target of track_stage() and run_ffmpeg() calls.
+    
+    Args:
+        job: Metrics of the job being processed
+    
+    Returns:
+        The job
+    """
+    token = _current_job.set(job)
+    try:
+        yield job
+    finally:
+        _current_job.reset(token)
+
+@contextmanager
+def track_progress(settings: ProgressSettings) -> Iterator[ProgressSettings]:
+    """
+    Send progress of run_ffmpeg() calls to a callback and enforce a stall timeout.
+    
+    Args:
+        settings: Progress callback and stall timeout for the current job
+    
+    Returns:
+        The settings
+    """
+    token = _current_progress.set(settings)
+    try:
+        yield settings
+    finally:
+        _current_progress.reset(token)
+
+@contextmanager
+def track_stage(name: str) -> Iterator[StageTiming]:
+    """
+    Time a pipeline stage of the current job.
+    
+    Outside of track_job() the timing is measured but not recorded.
+    
+    Args:
+        name: Stage name, e.g. "probe" or "face_analysis"
+    
+    Returns:
+        The stage timing, filled in when the block exits
+    """
+    stage = StageTiming(name)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    
+    try:
+        yield stage
+    finally:
+        stage.wall_seconds = time.perf_counter() - wall_start
+        stage.cpu_seconds = time.process_time() - cpu_start
+        
+        job = _current_job.get()
+        if job is not None:
+            job.add_stage(stage)
+
+def run_ffmpeg(stream_spec, stage: str = 'encode', duration: Optional[float] = None) -> FFmpegStats:
+    """
+    Run an ffmpeg command and record its resource usage as a job stage.
+    
+    Progress is streamed from ``-progress pipe:1``; every update goes to the
+    current progress callback (see track_progress), and a process that
+    stays silent for longer than the stall timeout is killed. CPU time and
+    peak RSS of the ffmpeg child come from wait4() where the platform has
+    it; elsewhere (Windows) they are left empty.
+    
+    Args:
+        stream_spec: ffmpeg-python output stream or a compiled argument list
+        stage: Stage name to record
+        duration: Expected output duration in seconds, for progress percentages
+    
+    Returns:
+        FFmpegStats of the finished process
+    """
+    args = list(stream_spec) if isinstance(stream_spec, (list, tuple)) else ffmpeg.compile(stream_spec)
+    args = [args[0], '-nostats', '-progress', 'pipe:1'] + args[1:]
+    settings = _current_progress.get()
+    
+    with track_stage(stage) as timing:
+        process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        
+        # Drain stderr in the background so a chatty ffmpeg never blocks
+        stderr_chunks = []
+        stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+        stderr_reader.start()
+        
+        last_output = [time.monotonic()]
+        finished = threading.Event()
+        stalled = threading.Event()
+        watchdog = None
+        
+        if settings.stall_timeout:
+            def watch():
+                while not finished.wait(1.0):
+                    if time.monotonic() - last_output[0] > settings.stall_timeout:
+                        stalled.set()
+                        process.kill()
+                        return
+            
+            watchdog = threading.Thread(target=watch, daemon=True)
+            watchdog.start()
+        
+        progress = {}
+        for line in process.stdout:
+            last_output[0] = time.monotonic()
+            key, _, value = line.decode(errors='replace').strip().partition('=')
+            if not key:
+                continue
+            
+            progress[key] = value
+            if key == 'progress' and settings.callback:
+                _emit_progress(settings, stage, progress, duration, done=value == 'end')
+        
+        # Stop the watchdog before reaping so it can never signal a reused pid
+        finished.set()
+        if watchdog:
+            watchdog.join()
+        
+        usage = None
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        else:
+            process.wait()
+        stderr_reader.join()
+        process.stdout.close()
+        process.stderr.close()
+        
+        timing.ffmpeg = FFmpegStats(
+            cpu_seconds=usage.ru_utime + usage.ru_stime if usage else None,
+            # ru_maxrss is in kilobytes on Linux
+            max_rss_kb=usage.ru_maxrss if usage else None,
+            frames=_to_int(progress.get('frame')),
+            fps=_to_float(progress.get('fps')),
+            speed=_to_float(progress.get('speed', '').rstrip('x'))
+        )
+    
+    if stalled.is_set():
+        raise FFmpegStalledError(f"ffmpeg {stage} made no progress for {settings.stall_timeout:.0f}s and was killed")
+    if process.returncode != 0:
+        raise ffmpeg.Error('ffmpeg', b'', b''.join(stderr_chunks))
+    
+    return timing.ffmpeg
+
+def _emit_progress(settings: ProgressSettings, stage: str, progress: dict, duration: Optional[float], done: bool) -> None:
+    """Send one progress block to the callback; callback errors never stop the encode."""
+    out_time_us = _to_int(progress.get('out_time_us'))
+    event = ProgressEvent(
+        input_path=settings.input_path,
+        stage=stage,
+        frame=_to_int(progress.get('frame')),
+        fps=_to_float(progress.get('fps')),
+        out_time=out_time_us / 1_000_000 if out_time_us is not None else None,
+        speed=_to_float(progress.get('speed', '').rstrip('x')),
+        duration=duration,
+        done=done
+    )
+    
+    try:
+        settings.callback(event)
+    except Exception as e:
+        logger.warning(f"Progress callback failed: {e}")
+
+class MetricsRecorder:
+    """
+    Write finished job metrics as JSON lines and a Prometheus textfile.
+    
+    ``jobs.jsonl`` gets one line per job. ``video_pipeline.prom`` holds
+    running totals per stage in the Prometheus text format, for the
+    node_exporter textfile collector. Totals are kept in a small state file
+    under a file lock, so concurrent worker processes can share a directory
+    (on Unix; Windows has no fcntl and writes unlocked).
+    """
+    
+    def __init__(self, metrics_dir: str = "metrics"):
+        """
+        Initialize metrics recorder.
+        
+        Args:
+            metrics_dir: Directory for the metrics files
+        """
+        self.metrics_dir = metrics_dir
+        self.jobs_path = os.path.join(metrics_dir, 'jobs.jsonl')
+        self.prom_path = os.path.join(metrics_dir, 'video_pipeline.prom')
+        self.state_path = os.path.join(metrics_dir, 'totals.json')
+        self.lock_path = os.path.join(metrics_dir, '.lock')
+        
+        ensure_directory(self.metrics_dir)
+    
+    def record(self, job: JobMetrics) -> None:
+        """
+        Append a finished job and update the Prometheus totals.
+        
+        Args:
+            job: Finished job metrics
+        """
+        try:
+            with open(self.lock_path, 'w') as lock:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                
+                with open(self.jobs_path, 'a') as f:
+                    f.write(json.dumps(job.to_dict()) + '\n')
+                
+                totals = self._load_totals()
+                self._add_job(totals, job)
+                with open(self.state_path, 'w') as f:
+                    json.dump(totals, f)
+                
+                # Write then rename so the collector never reads a partial file
+                tmp_path = f"{self.prom_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    f.write(self._render(totals))
+                os.replace(tmp_path, self.prom_path)
+        
+        except OSError as e:
+            logger.warning(f"Failed to write metrics: {e}")
+    
+    def _load_totals(self) -> dict:
+        """Load the running totals, starting fresh if missing or damaged."""
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'jobs': {}, 'stages': {}}
+    
+    def _add_job(self, totals: dict, job: JobMetrics) -> None:
+        """Add one job to the running totals."""
+        totals['jobs'][job.status] = totals['jobs'].get(job.status, 0) + 1
+        
+        for stage in job.stages:
+            entry = totals['stages'].setdefault(stage.name, {
+                'count': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                'ffmpeg_cpu_seconds': 0.0, 'ffmpeg_max_rss_kb': 0, 'last_fps': None, 'last_speed': None
+            })
+            entry['count'] += 1
+            entry['wall_seconds'] += stage.wall_seconds
+            entry['cpu_seconds'] += stage.cpu_seconds
+            
+            if stage.ffmpeg:
+                entry['ffmpeg_cpu_seconds'] += stage.ffmpeg.cpu_seconds or 0.0
+                entry['ffmpeg_max_rss_kb'] = max(entry['ffmpeg_max_rss_kb'], stage.ffmpeg.max_rss_kb or 0)
+                entry['last_fps'] = stage.ffmpeg.fps
+                entry['last_speed'] = stage.ffmpeg.speed
+    
+    def _render(self, totals: dict) -> str:
+        """Render the running totals in the Prometheus text format."""
+        lines = [
+            '# HELP video_pipeline_jobs_total Processed jobs by status.',
+            '# TYPE video_pipeline_jobs_total counter'
+        ]
+        for status, count in sorted(totals['jobs'].items()):
+            lines.append(f'video_pipeline_jobs_total{{status="{status}"}} {count}')
+        
+        series = [
+            ('stage_runs_total', 'counter', 'Stage executions.', 'count'),
+            ('stage_wall_seconds_total', 'counter', 'Wall time spent per stage.', 'wall_seconds'),
+            ('stage_cpu_seconds_total', 'counter', 'Pipeline process CPU time per stage.', 'cpu_seconds'),
+            ('ffmpeg_cpu_seconds_total', 'counter', 'ffmpeg child CPU time per stage.', 'ffmpeg_cpu_seconds'),
+            ('ffmpeg_max_rss_kilobytes', 'gauge', 'Peak ffmpeg child RSS seen per stage.', 'ffmpeg_max_rss_kb'),
+            ('ffmpeg_last_fps', 'gauge', 'Encode fps of the latest ffmpeg run per stage.', 'last_fps'),
+            ('ffmpeg_last_speed', 'gauge', 'Encode speed (x realtime) of the latest ffmpeg run per stage.', 'last_speed')
+        ]
+        for metric, metric_type, help_text, key in series:
+            lines.append(f'# HELP video_pipeline_{metric} {help_text}')
+            lines.append(f'# TYPE video_pipeline_{metric} {metric_type}')
+            for stage, entry in sorted(totals['stages'].items()):
+                if entry.get(key) is not None:
+                    lines.append(f'video_pipeline_{metric}{{stage="{stage}"}} {entry[key]}')
+        
+        return '\n'.join(lines) + '\n'
+
+def _to_int(value) -> Optional[int]:
+    """Convert a progress field to int, or None if missing."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value) -> Optional[float]:
+    """Convert a progress field to float, or None if missing."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from .utils import ensure_directory, compute_file_fingerprint, get_output_filename
+
+class ResultCache:
+    """
+    Content-addressed cache of finished transcodes.
+    
+    Entries are keyed on a fingerprint of the input file plus the encoding
+    parameters, so re-submitting the same video (under any name) reuses the
+    earlier outputs. Cached files are hard-linked into the output directory
+    and evicted least-recently-used once the cache exceeds its size limit.
+    """
+    
+    # Bump when output naming or encoding changes invalidate old entries
+    CACHE_VERSION = 2
+    
+    def __init__(self, cache_dir: str = "cache", max_bytes: int = 20 * 1024 ** 3):
+        """
+        Initialize result cache.
+        
+        Args:
+            cache_dir: Directory holding cached outputs and the index
+            max_bytes: Total size of cached outputs before eviction
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.db_path = os.path.join(cache_dir, 'index.sqlite')
+        self.logger = logging.getLogger(__name__)
+        
+        ensure_directory(self.cache_dir)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, outputs TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+    
+    def make_key(self, input_path: str, params: dict) -> str:
+        """
+        Build the cache key for an input and its encoding parameters.
+        
+        Args:
+            input_path: Path to input video file
+            params: Encoding parameters that affect the outputs
+        
+        Returns:
+            Hex cache key
+        """
+        key_data = json.dumps({
+            'version': self.CACHE_VERSION,
+            'fingerprint': compute_file_fingerprint(input_path),
+            'params': params
+        }, sort_keys=True)
+        return hashlib.sha256(key_data.encode()).hexdigest()
+    
+    def lookup(self, key: str, input_path: str, output_dir: str) -> Optional[list[str]]:
+        """
+        Materialize cached outputs for an input, if present.
+        
+        Args:
+            key: Cache key from make_key()
+            input_path: Path to input video file (used for output naming)
+            output_dir: Directory to place the outputs in
+        
+        Returns:
+            List of output file paths, or None on a cache miss
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT outputs FROM entries WHERE key = ?", (key,)).fetchone()
+        
+        if row is None:
+            return None
+        
+        entry_dir = os.path.join(self.cache_dir, key)
+        outputs = json.loads(row[0])
+        
+        # An entry is only usable if every file is intact
+        for aspect, size in outputs:
+            cached_path = os.path.join(entry_dir, self._cached_name(aspect))
+            if not os.path.exists(cached_path) or os.path.getsize(cached_path) != size:
+                self.logger.warning(f"Cache entry {key[:12]} is damaged, discarding")
+                self._remove_entry(key)
+                return None
+        
+        output_paths = []
+        for aspect, _ in outputs:
+            output_path = os.path.join(output_dir, get_output_filename(input_path, aspect))
+            self._link(os.path.join(entry_dir, self._cached_name(aspect)), output_path)
+            output_paths.append(output_path)
+        
+        with self._connect() as conn:
+            conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        
+        self.logger.info(f"Cache hit {key[:12]}: reused {len(output_paths)} outputs")
+        return output_paths
+    
+    def store(self, key: str, outputs: dict) -> None:
+        """
+        Add finished outputs to the cache.
+        
+        Args:
+            key: Cache key from make_key()
+            outputs: Mapping of aspect ratio ('16:9' or '9:16') to output path,
+                in the order lookup() should return them
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        ensure_directory(entry_dir)
+        
+        try:
+            recorded = []
+            for aspect, output_path in outputs.items():
+                self._link(output_path, os.path.join(entry_dir, self._cached_name(aspect)))
+                recorded.append((aspect, os.path.getsize(output_path)))
+            
+            now = time.time()
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, outputs, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(recorded), sum(size for _, size in recorded), now, now)
+                )
+            
+            self.logger.info(f"Cached outputs under {key[:12]}")
+        
+        except OSError as e:
+            self.logger.warning(f"Failed to cache outputs: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return
+        
+        self._evict()
+    
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits its size limit."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY last_used DESC").fetchall()
+        
+        total = 0
+        for key, size in rows:
+            total += size
+            if total > self.max_bytes:
+                self.logger.info(f"Evicting cache entry {key[:12]}")
+                self._remove_entry(key)
+    
+    def _remove_entry(self, key: str) -> None:
+        """Delete a cache entry and its files."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+    
+    def _link(self, source: str, destination: str) -> None:
+        """Hard-link a file, falling back to a copy across filesystems."""
+        if os.path.lexists(destination):
+            os.unlink(destination)
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copy2(source, destination)
+    
+    def _cached_name(self, aspect: str) -> str:
+        """Get the file name an aspect ratio output is cached under."""
+        return f"{aspect.replace(':', 'x')}.mp4"
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the index database for one transaction."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,241 @@
+import os
+import bisect
+import shutil
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import ffmpeg
+
+from .media_info import MediaInfo, probe_keyframes
+from .metrics import run_ffmpeg
+from .utils import ensure_directory
+
+class SegmentEncoder:
+    """
+    Encode long videos as keyframe-aligned segments in parallel.
+    
+    The source is cut at keyframes into roughly equal segments. Each segment
+    runs through the same filter graph in its own ffmpeg process (video only),
+    the audio track is encoded once in a separate process, and the pieces are
+    joined losslessly with the concat demuxer.
+    """
+    
+    def __init__(self,
+                 temp_dir: str = "processing",
+                 segment_count: Optional[int] = None,
+                 thread_budget: Optional[int] = None):
+        """
+        Initialize segment encoder.
+        
+        Args:
+            temp_dir: Directory for segment files
+            segment_count: Number of segments encoded in parallel
+                (default: half the thread budget, at least 2)
+            thread_budget: Encoder threads shared by all segment processes
+                (default: the CPU count); in batch mode this is the
+                worker's share, so pool workers don't oversubscribe
+        """
+        thread_budget = thread_budget or os.cpu_count() or 1
+        
+        self.temp_dir = temp_dir
+        self.segment_count = segment_count or max(2, thread_budget // 2)
+        self.ffmpeg_threads = max(1, thread_budget // self.segment_count)
+        self.logger = logging.getLogger(__name__)
+    
+    def encode(self,
+               input_path: str,
+               output_path: str,
+               media_info: MediaInfo,
+               apply_filters: Optional[Callable] = None,
+               output_options: Optional[dict] = None,
+               stage: str = 'encode') -> str:
+        """
+        Encode a video in parallel segments.
+        
+        Args:
+            input_path: Path to input video
+            output_path: Path to the final output file
+            media_info: Probe results for the input
+            apply_filters: Function taking and returning an ffmpeg-python video
+                stream; sees source timestamps, so sendcmd files still line up
+            output_options: ffmpeg output options shared by all segments
+            stage: Metrics stage name prefix
+        
+        Returns:
+            Path to output file
+        """
+        output_options = dict(output_options or {})
+        segments = self._plan_segments(input_path, media_info)
+        if len(segments) < 2:
+            raise RuntimeError("Not enough keyframes to split the video")
+        
+        work_dir = os.path.join(self.temp_dir, f"{Path(output_path).stem}_segments")
+        ensure_directory(work_dir)
+        
+        try:
+            video_options = {k: v for k, v in output_options.items() if k not in ('acodec', 'audio_bitrate', 'movflags')}
+            video_options['threads'] = self.ffmpeg_threads
+            # The setpts pair leaves the frame rate unset; without a rate
+            # ffmpeg falls back to 25 fps and drops frames
+            video_options['r'] = media_info.fps
+            
+            commands = []
+            segment_paths = []
+            for index, (start, end) in enumerate(segments):
+                segment_path = os.path.join(work_dir, f"segment_{index:04d}.mp4")
+                segment_paths.append(segment_path)
+                commands.append((
+                    self._segment_command(input_path, segment_path, start, end, apply_filters, video_options),
+                    f"{stage}_segment",
+                    (end if end is not None else media_info.duration) - start
+                ))
+            
+            audio_path = None
+            if media_info.has_audio:
+                audio_path = os.path.join(work_dir, "audio.m4a")
+                commands.append((
+                    self._audio_command(input_path, audio_path, output_options),
+                    f"{stage}_audio",
+                    media_info.duration
+                ))
+            
+            self.logger.info(f"Encoding {len(segments)} segments of {input_path} in parallel")
+            
+            # Each task gets its own copy of the context so metrics reach the current job
+            with ThreadPoolExecutor(max_workers=self.segment_count) as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, run_ffmpeg, command, command_stage, duration)
+                    for command, command_stage, duration in commands
+                ]
+                for future in futures:
+                    future.result()
+            
+            self._concat(segment_paths, audio_path, output_path, work_dir, f"{stage}_concat", media_info.duration)
+            
+            self.logger.info(f"Joined {len(segments)} segments into {output_path}")
+            return output_path
+        
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    def _plan_segments(self, input_path: str, media_info: MediaInfo) -> List[Tuple[float, Optional[float]]]:
+        """
+        Choose keyframe-aligned segment boundaries.
+        
+        Args:
+            input_path: Path to input video
+            media_info: Probe results for the input
+        
+        Returns:
+            List of (start, end) times; the last segment's end is None
+        """
+        keyframes = probe_keyframes(input_path)
+        boundaries = [0.0]
+        
+        for i in range(1, self.segment_count):
+            target = media_info.duration * i / self.segment_count
+            
+            # First keyframe at or after the target keeps every cut on a keyframe
+            index = bisect.bisect_left(keyframes, target)
+            if index < len(keyframes) and keyframes[index] > boundaries[-1]:
+                boundaries.append(keyframes[index])
+        
+        ends = boundaries[1:] + [None]
+        return list(zip(boundaries, ends))
+    
+    def _segment_command(self,
+                         input_path: str,
+                         segment_path: str,
+                         start: float,
+                         end: Optional[float],
+                         apply_filters: Optional[Callable],
+                         video_options: dict) -> List[str]:
+        """
+        Build the ffmpeg command for one video segment.
+        
+        Args:
+            input_path: Path to input video
+            segment_path: Path to the segment file
+            start: Segment start time (a keyframe)
+            end: Segment end time, or None for the end of the video
+            apply_filters: Filter function from encode()
+            video_options: Video-only output options
+        
+        Returns:
+            ffmpeg argument list
+        """
+        input_options = {'ss': f"{start:.6f}"}
+        if end is not None:
+            input_options['t'] = f"{end - start:.6f}"
+        
+        # Restore source timestamps for the filters, then restart at zero for concat
+        video = ffmpeg.input(input_path, **input_options)['v:0'].filter('setpts', f'PTS+{start:.6f}/TB')
+        if apply_filters:
+            video = apply_filters(video)
+        video = video.filter('setpts', 'PTS-STARTPTS')
+        
+        return (
+            ffmpeg
+            .output(video, segment_path, an=None, **video_options)
+            .overwrite_output()
+            .compile()
+        )
+    
+    def _audio_command(self, input_path: str, audio_path: str, output_options: dict) -> List[str]:
+        """
+        Build the ffmpeg command encoding the whole audio track once.
+        
+        Args:
+            input_path: Path to input video
+            audio_path: Path to the audio file
+            output_options: ffmpeg output options
+        
+        Returns:
+            ffmpeg argument list
+        """
+        audio_options = {k: v for k, v in output_options.items() if k in ('acodec', 'audio_bitrate')}
+        return (
+            ffmpeg
+            .input(input_path)['a:0']
+            .output(audio_path, **audio_options)
+            .overwrite_output()
+            .compile()
+        )
+    
+    def _concat(self,
+                segment_paths: List[str],
+                audio_path: Optional[str],
+                output_path: str,
+                work_dir: str,
+                stage: str = 'concat',
+                duration: Optional[float] = None) -> None:
+        """
+        Join encoded segments and audio without re-encoding.
+        
+        Args:
+            segment_paths: Encoded video segments in order
+            audio_path: Encoded audio track, or None
+            output_path: Path to the final output file
+            work_dir: Directory for the concat list
+            stage: Metrics stage name
+            duration: Expected output duration, for progress reporting
+        """
+        list_path = os.path.join(work_dir, "segments.txt")
+        with open(list_path, 'w') as f:
+            for segment_path in segment_paths:
+                f.write(f"file '{os.path.abspath(segment_path)}'\n")
+        
+        streams = [ffmpeg.input(list_path, format='concat', safe=0).video]
+        if audio_path:
+            streams.append(ffmpeg.input(audio_path).audio)
+        
+        run_ffmpeg(
+            ffmpeg
+            .output(*streams, output_path, c='copy', movflags='faststart')
+            .overwrite_output(),
+            stage,
+            duration
+        )
@@ -0,0 +1,319 @@
+import os
+import bisect
+import logging
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Frames darker than this mean luma are never picked as the poster
+MIN_POSTER_BRIGHTNESS = 24
+
+class PreviewCollector:
+    """
+    Keep poster and sprite candidates from frames decoded for analysis.
+    
+    Pass ``add`` the frames crop analysis already has in memory, together
+    with any faces found in them. Frames are reduced to small tiles right
+    away, and the tile set is thinned to at most ``max_tiles`` evenly spaced
+    frames, so memory stays bounded however many frames are added. Only the
+    best poster candidate is kept at full analysis resolution. The 9:16
+    conversion records its crop with ``set_crop``, so thumbnails are framed
+    like the video.
+    """
+    
+    def __init__(self, tile_size: int = 320, max_tiles: int = 100):
+        """
+        Initialize preview collector.
+        
+        Args:
+            tile_size: Long side of the kept tiles in pixels
+            max_tiles: Maximum number of tiles kept
+        """
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        
+        # (timestamp, tile, face center as a fraction of the width or None)
+        self.tiles: List[Tuple[float, np.ndarray, Optional[float]]] = []
+        self.poster: Optional[np.ndarray] = None
+        self.poster_face: Optional[float] = None
+        self.poster_time = 0.0
+        
+        # (timestamp, crop center as a fraction of the width) of the 9:16 output
+        self.crop: Optional[List[Tuple[float, float]]] = None
+        self.crop_interpolate = True
+        self._poster_score = None
+        self._stride = 1
+        self._seen = 0
+    
+    @property
+    def empty(self) -> bool:
+        """True if no frames were added."""
+        return not self.tiles
+    
+    @property
+    def face_center(self) -> Optional[float]:
+        """Mean face center over all tiles, as a fraction of the width."""
+        centers = [face for _, _, face in self.tiles if face is not None]
+        return float(np.mean(centers)) if centers else None
+    
+    def set_crop(self, path: List[Tuple[float, float]], width: int, interpolate: bool = True) -> None:
+        """
+        Record the crop window used for the 9:16 output.
+        
+        Args:
+            path: List of (timestamp, crop center x) points in source pixels,
+                a single point for a static crop
+            width: Source width in pixels
+            interpolate: Glide between points like a tracking crop; otherwise
+                hold each center until the next point
+        """
+        self.crop = [(timestamp, center_x / width) for timestamp, center_x in path]
+        self.crop_interpolate = interpolate
+    
+    def crop_center(self, timestamp: float) -> Optional[float]:
+        """
+        Get the center of the recorded crop window at a time.
+        
+        Args:
+            timestamp: Time in seconds
+        
+        Returns:
+            Crop center as a fraction of the width, or None without a crop
+        """
+        if not self.crop:
+            return None
+        
+        i = bisect.bisect_right([t for t, _ in self.crop], timestamp) - 1
+        if i < 0:
+            return self.crop[0][1]
+        if i + 1 == len(self.crop) or not self.crop_interpolate:
+            return self.crop[i][1]
+        
+        (t0, c0), (t1, c1) = self.crop[i], self.crop[i + 1]
+        return c0 + (c1 - c0) * (timestamp - t0) / (t1 - t0)
+    
+    def add(self,
+            timestamp: float,
+            frame: np.ndarray,
+            faces: Optional[List[Tuple[int, int, int, int]]] = None) -> None:
+        """
+        Offer an analysis frame.
+        
+        Args:
+            timestamp: Frame timestamp in seconds
+            frame: BGR frame; not kept, so reused buffers are fine
+            faces: Face bounding boxes in frame coordinates (optional)
+        """
+        height, width = frame.shape[:2]
+        largest = max(faces, key=lambda f: f[2] * f[3]) if faces else None
+        face = (largest[0] + largest[2] / 2) / width if largest else None
+        
+        scale = self.tile_size / max(width, height)
+        tile = cv2.resize(frame, (max(2, int(width * scale)), max(2, int(height * scale))), interpolation=cv2.INTER_AREA)
+        
+        # Prefer bright frames, then large faces, then sharp frames
+        gray = cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+        score = (
+            float(gray.mean()) >= MIN_POSTER_BRIGHTNESS,
+            largest[2] * largest[3] / (width * height) if largest else 0.0,
+            float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        )
+        if self._poster_score is None or score > self._poster_score:
+            self._poster_score = score
+            self.poster = frame.copy()
+            self.poster_face = face
+            self.poster_time = timestamp
+        
+        if self._seen % self._stride == 0:
+            self.tiles.append((timestamp, tile, face))
+            if len(self.tiles) > self.max_tiles:
+                # Keep every other tile; spacing stays even
+                del self.tiles[1::2]
+                self._stride *= 2
+        self._seen += 1
+
+class ThumbnailGenerator:
+    """
+    Write posters, sprite sheets and WebVTT sprite indexes for outputs.
+    
+    Images are built from a PreviewCollector filled during crop analysis, so
+    no extra decode is needed. Each output gets the same framing as its
+    video: the source aspect is used as is, a 9:16 output uses the crop
+    window of the conversion (around the faces if none was recorded) and a
+    16:9 output from a 9:16 source is composed over a blurred, stretched
+    copy of the frame.
+    """
+    
+    def __init__(self,
+                 tile_width: int = 160,
+                 columns: int = 10,
+                 max_tiles: int = 100,
+                 image_format: str = "jpg",
+                 quality: int = 85):
+        """
+        Initialize thumbnail generator.
+        
+        Args:
+            tile_width: Long side of a sprite tile in pixels
+            columns: Tiles per sprite sheet row
+            max_tiles: Maximum number of tiles per sprite sheet
+            image_format: "jpg" or "webp"
+            quality: Image quality (0-100)
+        """
+        if image_format not in ("jpg", "webp"):
+            raise ValueError(f"Unsupported image format: {image_format}")
+        
+        self.tile_width = tile_width
+        self.columns = columns
+        self.max_tiles = max_tiles
+        self.image_format = image_format
+        self.quality = quality
+        self.logger = logging.getLogger(__name__)
+    
+    def collector(self) -> PreviewCollector:
+        """
+        Create a collector for one video.
+        
+        Returns:
+            PreviewCollector keeping tiles large enough for both aspects
+        """
+        return PreviewCollector(tile_size=2 * self.tile_width, max_tiles=self.max_tiles)
+    
+    def write(self, preview: PreviewCollector, mp4_path: str, aspect_ratio: str, duration: float) -> List[str]:
+        """
+        Write the poster, sprite sheet and WebVTT index for one output.
+        
+        Files are named after the MP4: ``<name>_poster.jpg``,
+        ``<name>_sprite.jpg`` and ``<name>_sprite.vtt``.
+        
+        Args:
+            preview: Collector filled from the source video
+            mp4_path: Output video the images belong to
+            aspect_ratio: Aspect ratio of the output ('16:9' or '9:16')
+            duration: Video duration in seconds
+        
+        Returns:
+            List of written file paths (empty if there are no frames)
+        """
+        if preview.empty:
+            return []
+        
+        base = os.path.splitext(mp4_path)[0]
+        poster_path = f"{base}_poster.{self.image_format}"
+        sprite_path = f"{base}_sprite.{self.image_format}"
+        vtt_path = f"{base}_sprite.vtt"
+        
+        try:
+            fallback = preview.face_center
+            
+            poster = self._frame(preview.poster, aspect_ratio, preview.poster_face, fallback, preview.crop_center(preview.poster_time))
+            self._write_image(poster_path, poster)
+            
+            tile_width, tile_height = (self.tile_width, self.tile_width * 9 // 16) if aspect_ratio == "16:9" else (self.tile_width * 9 // 16, self.tile_width)
+            tile_width -= tile_width % 2
+            tile_height -= tile_height % 2
+            
+            rows = (len(preview.tiles) + self.columns - 1) // self.columns
+            columns = min(self.columns, len(preview.tiles))
+            sheet = np.zeros((rows * tile_height, columns * tile_width, 3), np.uint8)
+            
+            cues = []
+            timestamps = [timestamp for timestamp, _, _ in preview.tiles]
+            for i, (timestamp, tile, face) in enumerate(preview.tiles):
+                x = (i % self.columns) * tile_width
+                y = (i // self.columns) * tile_height
+                framed = self._frame(tile, aspect_ratio, face, fallback, preview.crop_center(timestamp))
+                sheet[y:y + tile_height, x:x + tile_width] = cv2.resize(framed, (tile_width, tile_height), interpolation=cv2.INTER_AREA)
+                
+                # Each tile covers the time until the next one
+                end = timestamps[i + 1] if i + 1 < len(timestamps) else max(duration, timestamp)
+                cues.append((timestamp if i else 0.0, end, x, y))
+            
+            self._write_image(sprite_path, sheet)
+            
+            sprite_name = os.path.basename(sprite_path)
+            with open(vtt_path, 'w') as f:
+                f.write("WEBVTT\n")
+                for start, end, x, y in cues:
+                    f.write(f"\n{self._vtt_time(start)} --> {self._vtt_time(end)}\n")
+                    f.write(f"{sprite_name}#xywh={x},{y},{tile_width},{tile_height}\n")
+            
+            self.logger.info(f"Wrote poster and {len(cues)}-tile sprite for {mp4_path}")
+            return [poster_path, sprite_path, vtt_path]
+        
+        except Exception as e:
+            self.logger.error(f"Failed to write thumbnails for {mp4_path}: {e}")
+            return []
+    
+    def _frame(self,
+               frame: np.ndarray,
+               aspect_ratio: str,
+               face: Optional[float],
+               fallback: Optional[float],
+               crop: Optional[float] = None) -> np.ndarray:
+        """
+        Frame a source image like the output video.
+        
+        Args:
+            frame: BGR source frame or tile
+            aspect_ratio: Output aspect ratio
+            face: Face center in this frame, as a fraction of the width
+            fallback: Face center to use when the frame has none
+            crop: Center of the video's crop window at this frame, as a
+                fraction of the width; overrides the faces (optional)
+        
+        Returns:
+            BGR image at the output aspect ratio
+        """
+        height, width = frame.shape[:2]
+        
+        if aspect_ratio == "9:16" and width > height:
+            # Same window as the 9:16 conversion, or around the face
+            crop_width = min(width, int(height * 9 / 16))
+            if crop is not None:
+                center = crop
+            else:
+                center = face if face is not None else fallback if fallback is not None else 0.5
+            x = max(0, min(width - crop_width, int(center * width) - crop_width // 2))
+            return frame[:, x:x + crop_width]
+        
+        if aspect_ratio == "16:9" and height > width:
+            # Blurred letterbox, like the 16:9 conversion
+            target_width = int(height * 16 / 9)
+            background = cv2.GaussianBlur(cv2.resize(frame, (target_width, height)), (0, 0), max(1.0, height / 36))
+            x = (target_width - width) // 2
+            background[:, x:x + width] = frame
+            return background
+        
+        return frame
+    
+    def _write_image(self, path: str, image: np.ndarray) -> None:
+        """
+        Encode an image, replacing any earlier file atomically.
+        
+        Args:
+            path: Destination path
+            image: BGR image
+        """
+        if self.image_format == "webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        
+        ok, data = cv2.imencode(f".{self.image_format}", image, params)
+        if not ok:
+            raise RuntimeError(f"Failed to encode {path}")
+        
+        partial = path + '.part'
+        with open(partial, 'wb') as f:
+            f.write(data.tobytes())
+        os.replace(partial, path)
+    
+    def _vtt_time(self, seconds: float) -> str:
+        """Format seconds as a WebVTT timestamp (HH:MM:SS.mmm)."""
+        milliseconds = int(round(seconds * 1000))
+        hours, milliseconds = divmod(milliseconds, 3600000)
+        minutes, milliseconds = divmod(milliseconds, 60000)
+        seconds, milliseconds = divmod(milliseconds, 1000)
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
@@ -0,0 +1,120 @@
+import time
+import logging
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait
+)
+from typing import Optional
+
+from .job_queue import JobQueue
+from .utils import get_thread_budget
+from .video_transcoder import VideoTranscoder, _init_worker, _process_in_worker
+
+class TranscoderService:
+    """Long-lived worker that drains the job queue with warm transcoders."""
+    
+    def __init__(self,
+                 transcoder: VideoTranscoder,
+                 job_queue: JobQueue,
+                 workers: Optional[int] = None,
+                 poll_interval: float = 1.0):
+        """
+        Initialize transcoder service.
+        
+        Args:
+            transcoder: Configured transcoder; used directly when running a
+                single worker, otherwise its settings seed the worker processes
+            job_queue: Queue to pull jobs from
+            workers: Number of jobs to run concurrently
+                (default: the transcoder's max_workers)
+            poll_interval: Seconds to wait between queue polls when idle
+        """
+        self.transcoder = transcoder
+        self.job_queue = job_queue
+        self.workers = workers or transcoder.max_workers
+        self.poll_interval = poll_interval
+        
+        self.logger = logging.getLogger(__name__)
+        self._stop_event = threading.Event()
+    
+    def run(self) -> None:
+        """Process queued jobs until stop() is called."""
+        self.job_queue.recover()
+        next_recover = time.monotonic() + self.job_queue.lease_seconds
+        
+        if self.workers > 1:
+            threads = self.transcoder.ffmpeg_threads or get_thread_budget(self.workers)
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.transcoder._get_worker_config(threads),)
+            )
+            self.logger.info(f"Serving with {self.workers} workers, {threads} ffmpeg threads each")
+        else:
+            # A single job runs on the transcoder already warmed up in this process
+            executor = ThreadPoolExecutor(max_workers=1)
+            self.logger.info("Serving with 1 worker")
+            
+        active: dict[Future, dict] = {}
+        
+        try:
+            while not self._stop_event.is_set():
+                # Pick up jobs of services that stopped renewing their leases
+                if time.monotonic() >= next_recover:
+                    self.job_queue.recover()
+                    next_recover = time.monotonic() + self.job_queue.lease_seconds
+                    
+                # Fill free worker slots from the queue
+                while len(active) < self.workers:
+                    job = self.job_queue.claim()
+                    if job is None:
+                        break
+                        
+                    self.logger.info(f"Starting job {job['id']}: {job['input']}")
+                    active[self._submit(executor, job)] = job
+                    
+                if not active:
+                    self._stop_event.wait(self.poll_interval)
+                    continue
+                    
+                self._wait_for_jobs(active)
+                
+            # Let running jobs finish so they are not left in the active state
+            while active:
+                self._wait_for_jobs(active)
+                
+        finally:
+            executor.shutdown(wait=True)
+    
+    def stop(self) -> None:
+        """Stop claiming new jobs; run() returns once active jobs finish."""
+        self._stop_event.set()
+    
+    def _wait_for_jobs(self, active: dict) -> None:
+        """Wait up to one poll interval, renewing leases and finishing done jobs."""
+        done, _ = wait(active, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+        for future in done:
+            self._finish_job(active.pop(future), future)
+            
+        for job in active.values():
+            self.job_queue.renew(job)
+    
+    def _submit(self, executor, job: dict) -> Future:
+        """Submit a job to the executor."""
+        if isinstance(executor, ProcessPoolExecutor):
+            return executor.submit(_process_in_worker, job['input'], job.get('category'))
+        return executor.submit(self.transcoder.process_video, job['input'], job.get('category'))
+    
+    def _finish_job(self, job: dict, future: Future) -> None:
+        """Record the result of a finished job in the queue."""
+        try:
+            outputs = future.result()
+            self.job_queue.complete(job, outputs)
+            self.logger.info(f"Completed job {job['id']}: {len(outputs)} outputs")
+        except Exception as e:
+            self.job_queue.fail(job, str(e))
+            self.logger.error(f"Job {job['id']} failed: {e}")
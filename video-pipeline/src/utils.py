@@ -1,7 +1,10 @@
 import os
 import logging
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
+
+# Container formats accepted as input
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.m4v'}
 
 def setup_logging(log_level: str = "INFO") -> None:
     """Setup logging configuration."""
@@ -16,7 +19,9 @@ def setup_logging(log_level: str = "INFO") -> None:
 
 def get_video_dimensions(video_path: str) -> Tuple[int, int]:
     """
-    Get video dimensions using ffprobe.
+    Get displayed video dimensions using ffprobe.
+    
+    The probe is memoized, see media_info.probe_media.
     
     Args:
         video_path: Path to video file
@@ -24,30 +29,12 @@ def get_video_dimensions(video_path: str) -> Tuple[int, int]:
     Returns:
         Tuple of (width, height)
     """
-    import subprocess
-    import json
+    from .media_info import probe_media
     
     try:
-        cmd = [
-            'ffprobe',
-            '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_streams',
-            video_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        data = json.loads(result.stdout)
+        info = probe_media(video_path)
+        return info.width, info.height
         
-        # Find video stream
-        for stream in data['streams']:
-            if stream['codec_type'] == 'video':
-                return int(stream['width']), int(stream['height'])
-        
-        raise ValueError("No video stream found")
-        
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Failed to get video dimensions: {e}")
     except Exception as e:
         raise RuntimeError(f"Error processing video info: {e}")
 
@@ -143,6 +130,82 @@ def cleanup_temp_files(temp_dir: str, keep_pattern: Optional[str] = None) -> Non
     except Exception as e:
         logging.warning(f"Failed to cleanup temp files: {e}")
 
+def compute_file_fingerprint(file_path: str, chunk_count: int = 8, chunk_size: int = 64 * 1024) -> str:
+    """
+    Compute a fast content fingerprint of a large file.
+    
+    Hashes the file size plus evenly spaced chunks (always including the
+    start and end) instead of the whole file.
+    
+    Args:
+        file_path: Path to file
+        chunk_count: Number of chunks to sample
+        chunk_size: Bytes per chunk
+        
+    Returns:
+        Hex digest identifying the file contents
+    """
+    import hashlib
+    
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=20)
+    
+    with open(file_path, 'rb') as f:
+        if size <= chunk_count * chunk_size:
+            digest.update(f.read())
+        else:
+            step = (size - chunk_size) // (chunk_count - 1)
+            for i in range(chunk_count):
+                f.seek(i * step)
+                digest.update(f.read(chunk_size))
+    
+    return digest.hexdigest()
+
+def parse_bitrate(bitrate: str) -> int:
+    """
+    Convert an ffmpeg bitrate string such as '2M' or '128k' to bits per second.
+    
+    Args:
+        bitrate: Bitrate string
+        
+    Returns:
+        Bitrate in bits per second
+    """
+    multipliers = {'k': 1000, 'm': 1000 ** 2, 'g': 1000 ** 3}
+    bitrate = str(bitrate).strip().lower()
+    
+    if bitrate and bitrate[-1] in multipliers:
+        return int(float(bitrate[:-1]) * multipliers[bitrate[-1]])
+    return int(float(bitrate))
+
+def get_worker_count(max_workers: Optional[int] = None) -> int:
+    """
+    Determine how many transcoding jobs may run concurrently.
+    
+    Args:
+        max_workers: Explicit worker count (optional)
+        
+    Returns:
+        Worker count, at least 1
+    """
+    if max_workers:
+        return max(1, int(max_workers))
+    
+    # A single libx264 encode scales well up to roughly 4 cores
+    return max(1, (os.cpu_count() or 1) // 4)
+
+def get_thread_budget(workers: int) -> int:
+    """
+    Split the available CPU cores evenly between concurrent jobs.
+    
+    Args:
+        workers: Number of concurrent jobs
+        
+    Returns:
+        ffmpeg thread count per job, at least 1
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
 def validate_video_file(file_path: str) -> bool:
     """
     Validate if file is a supported video format.
@@ -153,8 +216,6 @@ def validate_video_file(file_path: str) -> bool:
     Returns:
         True if valid video file
     """
-    supported_formats = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.m4v'}
-    
     path = Path(file_path)
     
     # Check if file exists
@@ -162,7 +223,7 @@ def validate_video_file(file_path: str) -> bool:
         return False
     
     # Check file extension
-    if path.suffix.lower() not in supported_formats:
+    if path.suffix.lower() not in VIDEO_EXTENSIONS:
         return False
     
     # Check if file is not empty
@@ -170,3 +231,22 @@ def validate_video_file(file_path: str) -> bool:
         return False
     
     return True
+
+def find_video_files(input_dir: str) -> List[str]:
+    """
+    Find all video files below a directory in a single pass.
+    
+    Args:
+        input_dir: Directory to search recursively
+        
+    Returns:
+        Sorted list of video file paths
+    """
+    video_files = []
+    
+    for root, _, files in os.walk(input_dir):
+        for name in files:
+            if Path(name).suffix.lower() in VIDEO_EXTENSIONS:
+                video_files.append(os.path.join(root, name))
+    
+    return sorted(video_files)
@@ -2,19 +2,43 @@ import os
 import logging
 import subprocess
 import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 import ffmpeg
 
 from .utils import (
-    get_video_dimensions, 
     determine_aspect_ratio, 
     get_output_filename,
     ensure_directory,
     cleanup_temp_files,
-    validate_video_file
+    validate_video_file,
+    find_video_files,
+    get_worker_count,
+    get_thread_budget,
+    parse_bitrate
 )
 from .face_detector import FaceDetector
+from .media_info import MediaInfo, probe_media
+from .result_cache import ResultCache
+from .analysis_cache import AnalysisCache
+from .batch_manifest import BatchManifest
+from .hls_packager import HLSPackager
+from .thumbnails import PreviewCollector, ThumbnailGenerator
+from .segment_encoder import SegmentEncoder
+from .metrics import (
+    FFmpegStalledError,
+    JobMetrics,
+    MetricsRecorder,
+    ProgressSettings,
+    StageTiming,
+    run_ffmpeg,
+    track_job,
+    track_progress,
+    track_stage
+)
+from .encoding_profiles import CATEGORY_PROFILES, EncodingProfile, get_category_from_path, get_profile
 
 class VideoTranscoder:
     """Main video transcoding pipeline for aspect ratio conversion."""
@@ -23,7 +47,35 @@ class VideoTranscoder:
                  temp_dir: str = "processing",
                  output_dir: str = "output",
                  video_bitrate: str = "2M",
-                 audio_bitrate: str = "128k"):
+                 audio_bitrate: str = "128k",
+                 single_decode: bool = False,
+                 max_workers: Optional[int] = None,
+                 ffmpeg_threads: Optional[int] = None,
+                 crop_mode: str = "static",
+                 cache_dir: Optional[str] = None,
+                 cache_max_bytes: int = 20 * 1024 ** 3,
+                 stream_copy: bool = True,
+                 segment_threshold: Optional[float] = None,
+                 segment_count: Optional[int] = None,
+                 blur_mode: str = "gblur",
+                 background_fps: Optional[float] = None,
+                 profile: Optional[str] = None,
+                 output_profiles: Optional[dict] = None,
+                 category_profiles: bool = False,
+                 metrics_dir: Optional[str] = None,
+                 progress_callback: Optional[Callable] = None,
+                 stall_timeout: Optional[float] = None,
+                 batch_manifest: Optional[str] = None,
+                 hls_ladder: Optional[List[int]] = None,
+                 hls_segment_seconds: float = 4.0,
+                 thumbnails: bool = False,
+                 thumbnail_format: str = "jpg",
+                 analysis_cache: Optional[str] = None,
+                 detector: str = "haar",
+                 detector_model: Optional[str] = None,
+                 detector_config: Optional[str] = None,
+                 subject_fallback: bool = False,
+                 adaptive_crop_tolerance: Optional[float] = None):
         """
         Initialize video transcoder.
         
@@ -32,14 +84,121 @@ class VideoTranscoder:
             output_dir: Output directory for final files
             video_bitrate: Video bitrate for encoding
             audio_bitrate: Audio bitrate for encoding
+            single_decode: Decode the source once and encode both versions
+                from a single split filter graph
+            max_workers: Number of concurrent jobs in batch_process
+                (default: derived from the CPU count)
+            ffmpeg_threads: Encoder threads per ffmpeg process
+                (default: ffmpeg decides, or an even share of cores in batches)
+            crop_mode: 16:9 to 9:16 crop strategy, "static" for one crop
+                position, "tracking" to follow the subject over time or
+                "scene" to re-center at every scene cut
+            cache_dir: Directory for the content-addressed result cache
+                (default: caching disabled)
+            cache_max_bytes: Size limit of the result cache
+            stream_copy: Remux instead of re-encoding the original aspect
+                version when the source is already H.264/AAC MP4 within
+                the target bitrate
+            segment_threshold: Encode videos at least this many seconds long
+                as parallel keyframe-aligned segments (default: disabled)
+            segment_count: Number of parallel segments
+                (default: half the CPU cores, at least 2)
+            blur_mode: 9:16 to 16:9 background blur, "gblur" for a full
+                resolution gaussian blur, or "fast" to box blur at 1/8 scale
+                and upscale (much cheaper, slightly different look)
+            background_fps: Update the "fast" blurred background at this
+                frame rate (default: every frame)
+            profile: Encoding profile for outputs without a more specific
+                one (default: libx264 at video_bitrate with ffmpeg defaults)
+            output_profiles: Encoding profile per output aspect ratio, e.g.
+                {'9:16': 'fast-preview'}; overrides category and default profiles
+            category_profiles: Pick per-output profiles from the job's webhook
+                category (see CATEGORY_PROFILES; default: categories do not
+                change encoding settings)
+            metrics_dir: Directory for per-job stage metrics as JSON lines and
+                a Prometheus textfile (default: metrics disabled)
+            progress_callback: Called with a metrics.ProgressEvent for every
+                ffmpeg progress update; pass a queue's put method to consume
+                events elsewhere. Must be picklable for batch workers.
+            stall_timeout: Kill an ffmpeg process that reports no progress
+                for this many seconds (default: no timeout)
+            batch_manifest: SQLite file recording which inputs batch_process
+                already finished, so reruns only process new or changed
+                files (default: every batch processes all files)
+            hls_ladder: Also package every output as an HLS ladder with
+                these rendition sizes (short side in pixels), e.g.
+                [1080, 720, 480] (default: MP4 outputs only)
+            hls_segment_seconds: Target HLS segment duration
+            thumbnails: Also write a poster, sprite sheet and WebVTT sprite
+                index next to every output, from the crop analysis frames
+            thumbnail_format: Image format of posters and sprites,
+                "jpg" or "webp"
+            analysis_cache: SQLite file storing crop analysis results, so
+                re-encodes of a source skip face detection (default: disabled)
+            detector: Crop analysis backend, "haar", "dnn" (OpenCV DNN face
+                detector) or "saliency" (most salient region)
+            detector_model: Model file of the backend (Haar cascade or DNN
+                network; default: OpenCV's frontal face cascade)
+            detector_config: Network config of a res10 SSD model
+            subject_fallback: Crop to the most salient region in frames
+                without faces
+            adaptive_crop_tolerance: Stop sampling frames for the static crop
+                once its center is known to within this many source pixels
+                (default: always 20 frames)
         """
         self.temp_dir = temp_dir
         self.output_dir = output_dir
         self.video_bitrate = video_bitrate
         self.audio_bitrate = audio_bitrate
+        self.single_decode = single_decode
+        self.max_workers = get_worker_count(max_workers)
+        self.ffmpeg_threads = ffmpeg_threads
+        self.crop_mode = crop_mode
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.stream_copy = stream_copy
+        self.segment_threshold = segment_threshold
+        self.segment_count = segment_count
+        self.blur_mode = blur_mode
+        self.background_fps = background_fps
+        self.profile = profile
+        self.output_profiles = output_profiles or {}
+        self.category_profiles = category_profiles
+        self.metrics_dir = metrics_dir
+        self.progress_callback = progress_callback
+        self.stall_timeout = stall_timeout
+        self.batch_manifest = batch_manifest
+        self.hls_ladder = hls_ladder
+        self.hls_segment_seconds = hls_segment_seconds
+        self.thumbnails = thumbnails
+        self.thumbnail_format = thumbnail_format
+        self.analysis_cache = analysis_cache
+        self.detector = detector
+        self.detector_model = detector_model
+        self.detector_config = detector_config
+        self.subject_fallback = subject_fallback
+        self.adaptive_crop_tolerance = adaptive_crop_tolerance
+        
+        # Fail on unknown profile names at startup rather than mid-job
+        for name in [profile, *self.output_profiles.values()]:
+            if name:
+                get_profile(name)
         
         self.logger = logging.getLogger(__name__)
-        self.face_detector = FaceDetector()
+        self.face_detector = FaceDetector(
+            model_path=detector_model,
+            analysis_cache=AnalysisCache(analysis_cache) if analysis_cache else None,
+            backend=detector,
+            config_path=detector_config,
+            subject_fallback=subject_fallback,
+            adaptive_tolerance=adaptive_crop_tolerance
+        )
+        self.result_cache = ResultCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.segment_encoder = SegmentEncoder(temp_dir, segment_count, ffmpeg_threads)
+        self.metrics_recorder = MetricsRecorder(metrics_dir) if metrics_dir else None
+        self.manifest = BatchManifest(batch_manifest) if batch_manifest else None
+        self.hls_packager = HLSPackager(hls_ladder, hls_segment_seconds, audio_bitrate, ffmpeg_threads) if hls_ladder else None
+        self.thumbnail_generator = ThumbnailGenerator(image_format=thumbnail_format) if thumbnails else None
         
         # Ensure directories exist
         ensure_directory(self.temp_dir)
@@ -47,55 +206,141 @@ class VideoTranscoder:
         
         self.logger.info("VideoTranscoder initialized")
     
-    def process_video(self, input_path: str) -> list[str]:
+    def process_video(self, input_path: str, category: Optional[str] = None) -> list[str]:
         """
         Process a single video file, creating both aspect ratio versions.
         
         Args:
             input_path: Path to input video file
-            
+            category: Webhook category, selects encoding profiles per output
+                when category_profiles is enabled (optional)
+        
         Returns:
             List of output file paths created
         """
         if not validate_video_file(input_path):
             raise ValueError(f"Invalid video file: {input_path}")
         
+        job_metrics = JobMetrics(input_path, category)
+        progress = ProgressSettings(input_path, self.progress_callback, self.stall_timeout)
+        
+        try:
+            with track_job(job_metrics), track_progress(progress):
+                output_files = self._process_video(input_path, category)
+            job_metrics.finish('ok')
+            return output_files
+        
+        except Exception:
+            job_metrics.finish('failed')
+            raise
+        
+        finally:
+            if self.metrics_recorder:
+                self.metrics_recorder.record(job_metrics)
+    
+    def _process_video(self, input_path: str, category: Optional[str] = None) -> list[str]:
+        """
+        Create both aspect ratio versions of a validated video.
+        
+        Args:
+            input_path: Path to input video file
+            category: Webhook category (optional)
+        
+        Returns:
+            List of output file paths created
+        """
         self.logger.info(f"Processing video: {input_path}")
         
         try:
-            # Get video dimensions and determine original aspect ratio
-            width, height = get_video_dimensions(input_path)
+            # Reuse earlier outputs for identical content and settings
+            cache_key = None
+            if self.result_cache:
+                with track_stage('cache_lookup'):
+                    cache_key = self.result_cache.make_key(input_path, self._get_cache_params(category))
+                    cached_files = self.result_cache.lookup(cache_key, input_path, self.output_dir)
+                if cached_files:
+                    self.logger.info(f"Reused cached outputs. Created {len(cached_files)} output files.")
+                    # Ladders built from these outputs before are reused, not repackaged
+                    return (cached_files
+                            + self._package_hls(input_path, cached_files, category)
+                            + self._write_thumbnails(input_path, cached_files))
+            
+            # Probe once; every later stage reuses this MediaInfo
+            with track_stage('probe'):
+                media_info = probe_media(input_path)
+            width, height = media_info.width, media_info.height
             original_aspect = determine_aspect_ratio(width, height)
+            converted_aspect = "9:16" if original_aspect == "16:9" else "16:9"
             
             self.logger.info(f"Video dimensions: {width}x{height}, aspect ratio: {original_aspect}")
             
-            output_files = []
+            if self.result_cache:
+                # Outputs may be hard links into the cache; never write through them
+                for aspect in (original_aspect, converted_aspect):
+                    output_path = os.path.join(self.output_dir, get_output_filename(input_path, aspect))
+                    if os.path.lexists(output_path):
+                        os.unlink(output_path)
             
-            # Keep original aspect ratio version
-            original_output = self._create_original_version(input_path, original_aspect)
-            if original_output:
-                output_files.append(original_output)
+            # Crop analysis offers its frames to the thumbnail stage
+            preview = self.thumbnail_generator.collector() if self.thumbnail_generator else None
             
-            # Create converted aspect ratio version
-            converted_output = self._create_converted_version(input_path, original_aspect, width, height)
-            if converted_output:
-                output_files.append(converted_output)
+            # A remuxed original needs no decode, so only the converted version is encoded;
+            # segmented encodes parallelize each version on their own
+            if self.single_decode and not self._can_stream_copy(media_info) and not self._use_segments(media_info):
+                output_files = self._create_versions_single_decode(input_path, original_aspect, media_info, category, preview)
+            else:
+                output_files = []
+                
+                # Keep original aspect ratio version
+                original_output = self._create_original_version(input_path, original_aspect, media_info, category)
+                if original_output:
+                    output_files.append(original_output)
+                
+                # Create converted aspect ratio version
+                converted_output = self._create_converted_version(input_path, original_aspect, media_info, category, preview)
+                if converted_output:
+                    output_files.append(converted_output)
+            
+            # Only complete results are worth caching
+            if self.result_cache and len(output_files) == 2:
+                with track_stage('cache_store'):
+                    self.result_cache.store(cache_key, {
+                        original_aspect: output_files[0],
+                        converted_aspect: output_files[1]
+                    })
+            
+            if self.hls_packager:
+                output_files += self._package_hls(input_path, output_files, category)
+            
+            if self.thumbnail_generator:
+                output_files += self._write_thumbnails(input_path, output_files, media_info, preview)
             
             self.logger.info(f"Successfully processed video. Created {len(output_files)} output files.")
             return output_files
-            
+        
         except Exception as e:
             self.logger.error(f"Failed to process video {input_path}: {e}")
             raise
     
-    def _create_original_version(self, input_path: str, aspect_ratio: str) -> Optional[str]:
+    def _create_original_version(self,
+                                 input_path: str,
+                                 aspect_ratio: str,
+                                 media_info: MediaInfo,
+                                 category: Optional[str] = None) -> Optional[str]:
         """
         Create a copy of the original video with proper naming.
         
+        Compliant sources are remuxed without re-encoding; everything else
+        (or a failed remux) is re-encoded with the standard output options.
+        Like every output, it carries the primary video stream and the first
+        audio stream only, never cover art or extra tracks.
+        
         Args:
             input_path: Path to input video
             aspect_ratio: Original aspect ratio
-            
+            media_info: Probe results for the input
+            category: Webhook category (optional)
+        
         Returns:
             Path to output file or None if failed
         """
@@ -103,56 +348,179 @@ class VideoTranscoder:
             output_filename = get_output_filename(input_path, aspect_ratio)
             output_path = os.path.join(self.output_dir, output_filename)
             
-            # Simple copy with re-encoding for consistency
-            (
-                ffmpeg
-                .input(input_path)
-                .output(
-                    output_path,
-                    vcodec='libx264',
-                    acodec='aac',
-                    video_bitrate=self.video_bitrate,
-                    audio_bitrate=self.audio_bitrate,
-                    movflags='faststart'
-                )
-                .overwrite_output()
-                .run(quiet=True)
-            )
+            if self._can_stream_copy(media_info):
+                try:
+                    source = ffmpeg.input(input_path)
+                    run_ffmpeg(
+                        ffmpeg
+                        .output(source['v:0'], source['a:0?'], output_path, c='copy', movflags='faststart')
+                        .overwrite_output(),
+                        'remux_original',
+                        media_info.duration
+                    )
+                    
+                    self.logger.info(f"Created original version by stream copy: {output_path}")
+                    return output_path
+                
+                except ffmpeg.Error as e:
+                    self.logger.warning(f"Stream copy failed, re-encoding instead: {e}")
+            
+            # Re-encode for consistency
+            self._encode(input_path, output_path, media_info,
+                         output_options=self._get_output_options(aspect_ratio, media_info, category),
+                         stage='encode_original')
             
             self.logger.info(f"Created original version: {output_path}")
             return output_path
-            
+        
         except Exception as e:
             self.logger.error(f"Failed to create original version: {e}")
             return None
     
-    def _create_converted_version(self, input_path: str, original_aspect: str, width: int, height: int) -> Optional[str]:
+    def _package_hls(self, input_path: str, output_files: List[str], category: Optional[str] = None) -> List[str]:
+        """
+        Package the MP4 outputs of a video as HLS ladders.
+        
+        Args:
+            input_path: Path to input video
+            output_files: MP4 outputs created for the input
+            category: Webhook category (optional)
+        
+        Returns:
+            List of master playlist paths
+        """
+        if not self.hls_packager:
+            return []
+        
+        playlists = []
+        for aspect in ("16:9", "9:16"):
+            output_path = os.path.join(self.output_dir, get_output_filename(input_path, aspect))
+            if output_path not in output_files:
+                continue
+            
+            # Renditions use the output's speed/quality preset
+            profile = self._get_profile(aspect, category)
+            playlist = self.hls_packager.package(output_path, profile.preset if profile else None)
+            if playlist:
+                playlists.append(playlist)
+        
+        return playlists
+    
+    def _write_thumbnails(self,
+                          input_path: str,
+                          output_files: List[str],
+                          media_info: Optional[MediaInfo] = None,
+                          preview: Optional[PreviewCollector] = None) -> List[str]:
+        """
+        Write posters and sprite sheets for the MP4 outputs of a video.
+        
+        Args:
+            input_path: Path to input video
+            output_files: MP4 outputs created for the input
+            media_info: Probe results for the input (probed if needed)
+            preview: Frames collected during crop analysis (optional)
+        
+        Returns:
+            List of image and WebVTT paths
+        """
+        if not self.thumbnail_generator:
+            return []
+        
+        media_info = media_info or probe_media(input_path)
+        if preview is None:
+            preview = self.thumbnail_generator.collector()
+        
+        # Cache hits skipped the conversion; redo its crop analysis so 9:16 thumbnails match the video
+        converted_path = os.path.join(self.output_dir, get_output_filename(input_path, "9:16"))
+        if preview.crop is None and converted_path in output_files and determine_aspect_ratio(media_info.width, media_info.height) == "16:9":
+            self._calculate_9_16_crop(input_path, media_info, preview)
+        
+        with track_stage('thumbnails'):
+            # Only sources without crop analysis frames (9:16, analysis cache hits) decode again
+            if preview.empty:
+                self.face_detector.fill_preview(input_path, preview, media_info)
+            
+            files = []
+            for aspect in ("16:9", "9:16"):
+                output_path = os.path.join(self.output_dir, get_output_filename(input_path, aspect))
+                if output_path in output_files:
+                    files += self.thumbnail_generator.write(preview, output_path, aspect, media_info.duration)
+            
+            return files
+    
+    def _can_stream_copy(self, media_info: MediaInfo) -> bool:
+        """
+        Check whether the source can be remuxed as the original aspect version.
+        
+        Args:
+            media_info: Probe results for the input
+        
+        Returns:
+            True if the source already matches the output encoding
+        """
+        if not self.stream_copy:
+            return False
+        
+        source_bitrate = media_info.video_bitrate or media_info.bit_rate
+        reasons = []
+        
+        if 'mp4' not in media_info.format_name.split(','):
+            reasons.append(f"container {media_info.format_name}")
+        if media_info.video_codec != 'h264':
+            reasons.append(f"video codec {media_info.video_codec}")
+        if media_info.pix_fmt != 'yuv420p':
+            reasons.append(f"pixel format {media_info.pix_fmt}")
+        if media_info.audio_codec not in (None, 'aac'):
+            reasons.append(f"audio codec {media_info.audio_codec}")
+        if media_info.rotation:
+            reasons.append(f"rotation {media_info.rotation}")
+        if source_bitrate is None or source_bitrate > parse_bitrate(self.video_bitrate):
+            reasons.append(f"bitrate {source_bitrate}")
+        
+        if reasons:
+            self.logger.debug(f"Re-encoding original version: {', '.join(reasons)}")
+            return False
+        
+        return True
+    
+    def _create_converted_version(self,
+                                  input_path: str,
+                                  original_aspect: str,
+                                  media_info: MediaInfo,
+                                  category: Optional[str] = None,
+                                  preview: Optional[PreviewCollector] = None) -> Optional[str]:
         """
         Create converted aspect ratio version.
         
         Args:
             input_path: Path to input video
             original_aspect: Original aspect ratio
-            width: Original video width
-            height: Original video height
-            
+            media_info: Probe results for the input
+            category: Webhook category (optional)
+            preview: Collects the analysis frames for thumbnails (optional)
+        
         Returns:
             Path to output file or None if failed
         """
         if original_aspect == "16:9":
-            return self._convert_16_9_to_9_16(input_path, width, height)
+            return self._convert_16_9_to_9_16(input_path, media_info, category, preview)
         else:
-            return self._convert_9_16_to_16_9(input_path, width, height)
+            return self._convert_9_16_to_16_9(input_path, media_info, category)
     
-    def _convert_16_9_to_9_16(self, input_path: str, width: int, height: int) -> Optional[str]:
+    def _convert_16_9_to_9_16(self,
+                              input_path: str,
+                              media_info: MediaInfo,
+                              category: Optional[str] = None,
+                              preview: Optional[PreviewCollector] = None) -> Optional[str]:
         """
         Convert 16:9 video to 9:16 with face-centered cropping.
         
         Args:
             input_path: Path to input video
-            width: Original video width
-            height: Original video height
-            
+            media_info: Probe results for the input
+            category: Webhook category (optional)
+            preview: Collects the analysis frames for thumbnails (optional)
+        
         Returns:
             Path to output file or None if failed
         """
@@ -160,60 +528,30 @@ class VideoTranscoder:
             output_filename = get_output_filename(input_path, "9:16")
             output_path = os.path.join(self.output_dir, output_filename)
             
-            # Calculate crop dimensions for 9:16
-            target_width = int(height * (9/16))
-            
-            if target_width > width:
-                # If calculated width is larger than source, use full width and adjust height
-                target_width = width
-                target_height = int(width * (16/9))
-                crop_x = 0
-                crop_y = (height - target_height) // 2
-            else:
-                # Use face detection to determine optimal crop center
-                center_x, center_y = self.face_detector.get_optimal_crop_center(input_path, 16/9)
-                
-                # Calculate crop position
-                crop_x = max(0, min(width - target_width, center_x - target_width // 2))
-                crop_y = 0
-                target_height = height
-            
-            self.logger.info(f"Cropping 16:9 to 9:16: crop at ({crop_x}, {crop_y}), size {target_width}x{target_height}")
+            crop = self._calculate_9_16_crop(input_path, media_info, preview)
             
             # Apply crop and scale to standard 9:16 resolution (1080x1920)
-            (
-                ffmpeg
-                .input(input_path)
-                .filter('crop', target_width, target_height, crop_x, crop_y)
-                .filter('scale', 1080, 1920)
-                .output(
-                    output_path,
-                    vcodec='libx264',
-                    acodec='aac',
-                    video_bitrate=self.video_bitrate,
-                    audio_bitrate=self.audio_bitrate,
-                    movflags='faststart'
-                )
-                .overwrite_output()
-                .run(quiet=True)
-            )
+            self._encode(input_path, output_path, media_info,
+                         lambda video: self._apply_9_16_filters(video, crop),
+                         self._get_output_options("9:16", media_info, category),
+                         'encode_9_16')
             
             self.logger.info(f"Created 9:16 version: {output_path}")
             return output_path
-            
+        
         except Exception as e:
             self.logger.error(f"Failed to convert 16:9 to 9:16: {e}")
             return None
     
-    def _convert_9_16_to_16_9(self, input_path: str, width: int, height: int) -> Optional[str]:
+    def _convert_9_16_to_16_9(self, input_path: str, media_info: MediaInfo, category: Optional[str] = None) -> Optional[str]:
         """
         Convert 9:16 video to 16:9 with blurred letterbox bars.
         
         Args:
             input_path: Path to input video
-            width: Original video width
-            height: Original video height
-            
+            media_info: Probe results for the input
+            category: Webhook category (optional)
+        
         Returns:
             Path to output file or None if failed
         """
@@ -221,110 +559,642 @@ class VideoTranscoder:
             output_filename = get_output_filename(input_path, "16:9")
             output_path = os.path.join(self.output_dir, output_filename)
             
-            # Target 16:9 resolution (1920x1080)
-            target_width = 1920
-            target_height = 1080
+            self._encode(input_path, output_path, media_info,
+                         lambda video: self._apply_16_9_filters(video, media_info.width, media_info.height, media_info.fps),
+                         self._get_output_options("16:9", media_info, category),
+                         'encode_16_9')
             
-            # Calculate scaling for the main video (maintain aspect ratio)
-            scale_factor = min(target_width / width, target_height / height)
-            scaled_width = int(width * scale_factor)
-            scaled_height = int(height * scale_factor)
+            self.logger.info(f"Created 16:9 version: {output_path}")
+            return output_path
+        
+        except Exception as e:
+            self.logger.error(f"Failed to convert 9:16 to 16:9: {e}")
+            return None
+    
+    def _encode(self,
+                input_path: str,
+                output_path: str,
+                media_info: MediaInfo,
+                apply_filters=None,
+                output_options: Optional[dict] = None,
+                stage: str = 'encode') -> None:
+        """
+        Encode one output, in parallel segments for long videos.
+        
+        Args:
+            input_path: Path to input video
+            output_path: Path to output file
+            media_info: Probe results for the input
+            apply_filters: Function taking and returning an ffmpeg-python
+                video stream (optional)
+            output_options: ffmpeg output options
+                (default: _get_output_options())
+            stage: Metrics stage name for the encode
+        """
+        output_options = output_options or self._get_output_options()
+        
+        # Segmented or not, outputs get the first video and audio streams
+        if self._use_segments(media_info):
+            try:
+                self.segment_encoder.encode(input_path, output_path, media_info, apply_filters, output_options, stage)
+                return
+            except FFmpegStalledError:
+                # A stalled source would stall a one-pass encode too
+                raise
+            except Exception as e:
+                self.logger.warning(f"Segmented encode failed, encoding in one pass: {e}")
+        
+        source = ffmpeg.input(input_path)
+        video = source['v:0']
+        if apply_filters:
+            video = apply_filters(video)
+        
+        run_ffmpeg(
+            ffmpeg
+            .output(video, source['a:0?'], output_path, **output_options)
+            .overwrite_output(),
+            stage,
+            media_info.duration
+        )
+    
+    def _use_segments(self, media_info: MediaInfo) -> bool:
+        """
+        Check whether a video is long enough for a segmented encode.
+        
+        Args:
+            media_info: Probe results for the input
+        
+        Returns:
+            True if the video should be encoded in parallel segments
+        """
+        return bool(self.segment_threshold) and media_info.duration >= self.segment_threshold
+    
+    def _create_versions_single_decode(self,
+                                       input_path: str,
+                                       original_aspect: str,
+                                       media_info: MediaInfo,
+                                       category: Optional[str] = None,
+                                       preview: Optional[PreviewCollector] = None) -> list[str]:
+        """
+        Create both aspect ratio versions from a single decode of the source.
+        
+        The decoded video is split once; one branch is encoded as the original
+        aspect version and the other runs through the conversion filters. Both
+        outputs are written by the same ffmpeg process.
+        
+        Args:
+            input_path: Path to input video
+            original_aspect: Original aspect ratio
+            media_info: Probe results for the input
+            category: Webhook category (optional)
+            preview: Collects the analysis frames for thumbnails (optional)
+        
+        Returns:
+            List of output file paths created
+        """
+        converted_aspect = "9:16" if original_aspect == "16:9" else "16:9"
+        original_path = os.path.join(self.output_dir, get_output_filename(input_path, original_aspect))
+        converted_path = os.path.join(self.output_dir, get_output_filename(input_path, converted_aspect))
+        
+        try:
+            source = ffmpeg.input(input_path)
+            branches = source['v:0'].split()
             
-            # Calculate positioning (center the video)
-            x_offset = (target_width - scaled_width) // 2
-            y_offset = (target_height - scaled_height) // 2
+            if original_aspect == "16:9":
+                crop = self._calculate_9_16_crop(input_path, media_info, preview)
+                converted = self._apply_9_16_filters(branches[1], crop)
+            else:
+                converted = self._apply_16_9_filters(branches[1], media_info.width, media_info.height, media_info.fps)
+            
+            audio = source['a:0?']
+            self.logger.info(f"Encoding {original_aspect} and {converted_aspect} versions from a single decode")
             
-            self.logger.info(f"Converting 9:16 to 16:9: scaling to {scaled_width}x{scaled_height}, offset ({x_offset}, {y_offset})")
+            run_ffmpeg(
+                ffmpeg
+                .merge_outputs(
+                    ffmpeg.output(branches[0], audio, original_path,
+                                  **self._get_output_options(original_aspect, media_info, category)),
+                    ffmpeg.output(converted, audio, converted_path,
+                                  **self._get_output_options(converted_aspect, media_info, category))
+                )
+                .overwrite_output(),
+                'encode_single_decode',
+                media_info.duration
+            )
             
-            # Create blurred background and overlay main video
-            main_video = ffmpeg.input(input_path)
+            self.logger.info(f"Created original version: {original_path}")
+            self.logger.info(f"Created {converted_aspect} version: {converted_path}")
+            return [original_path, converted_path]
+        
+        except Exception as e:
+            self.logger.error(f"Single-decode encode failed: {e}")
+            return []
+    
+    def _calculate_9_16_crop(self,
+                             input_path: str,
+                             media_info: MediaInfo,
+                             preview: Optional[PreviewCollector] = None) -> Tuple[int, int, int, int, Optional[str]]:
+        """
+        Calculate the 9:16 crop window for a 16:9 source.
+        
+        Args:
+            input_path: Path to input video
+            media_info: Probe results for the input
+            preview: Collects the analysis frames and the crop window for
+                thumbnails (optional)
+        
+        Returns:
+            Tuple of (crop_width, crop_height, crop_x, crop_y, crop_commands),
+            where crop_commands is a sendcmd file moving the crop over time
+            in tracking and scene modes, or None for a static crop
+        """
+        crop_commands = None
+        width, height = media_info.width, media_info.height
+        
+        # Calculate crop dimensions for 9:16
+        target_width = int(height * (9/16))
+        
+        if target_width > width:
+            # If calculated width is larger than source, use full width and adjust height
+            target_width = width
+            target_height = int(width * (16/9))
+            crop_x = 0
+            crop_y = (height - target_height) // 2
+            crop_path = [(0.0, width // 2)]
+        elif self.crop_mode == 'tracking':
+            # Follow the subject with a smoothed crop path
+            with self._track_face_analysis():
+                trajectory = self.face_detector.get_crop_trajectory(input_path, media_info=media_info, preview=preview)
+            crop_commands = self._write_crop_commands(input_path, trajectory, target_width, width)
+            crop_x = max(0, min(width - target_width, trajectory[0][1] - target_width // 2))
+            crop_y = 0
+            target_height = height
+            crop_path = trajectory
+        elif self.crop_mode == 'scene':
+            # Re-center the crop at every cut, holding it within a shot
+            with self._track_face_analysis():
+                plan = self.face_detector.get_scene_crop_plan(input_path, media_info=media_info, preview=preview)
+            if len(plan) > 1:
+                crop_commands = self._write_crop_commands(input_path, plan, target_width, width, interpolate=False)
+            crop_x = max(0, min(width - target_width, plan[0][1] - target_width // 2))
+            crop_y = 0
+            target_height = height
+            crop_path = plan
+        else:
+            # Use face detection to determine optimal crop center
+            with self._track_face_analysis():
+                center_x, center_y = self.face_detector.get_optimal_crop_center(input_path, 9/16, media_info, preview)
             
+            # Calculate crop position
+            crop_x = max(0, min(width - target_width, center_x - target_width // 2))
+            crop_y = 0
+            target_height = height
+            crop_path = [(0.0, center_x)]
+        
+        if preview is not None:
+            # Thumbnails use the same (clamped) crop window as the video
+            preview.set_crop(
+                [(t, max(0, min(width - target_width, center_x - target_width // 2)) + target_width / 2) for t, center_x in crop_path],
+                width,
+                interpolate=self.crop_mode != 'scene'
+            )
+        
+        self.logger.info(f"Cropping 16:9 to 9:16: crop at ({crop_x}, {crop_y}), size {target_width}x{target_height}")
+        return target_width, target_height, crop_x, crop_y, crop_commands
+    
+    @contextmanager
+    def _track_face_analysis(self) -> Iterator[StageTiming]:
+        """
+        Time a face analysis stage, recording the detector's per-frame latency.
+        
+        Returns:
+            The stage timing
+        """
+        backend = self.face_detector.backend
+        snapshot = backend.stats.snapshot()
+        
+        with track_stage('face_analysis') as timing:
+            try:
+                yield timing
+            finally:
+                timing.detector = dict(backend.stats.since(snapshot), backend=backend.name)
+    
+    def _write_crop_commands(self, input_path: str, trajectory: list, crop_width: int, width: int, interpolate: bool = True) -> str:
+        """
+        Write a sendcmd file that moves the crop window along a trajectory.
+        
+        Between trajectory points the crop x position is linearly interpolated
+        with a per-frame expression, so the crop glides instead of jumping.
+        
+        Args:
+            input_path: Path to input video
+            trajectory: List of (timestamp, center_x) points
+            crop_width: Width of the crop window
+            width: Original video width
+            interpolate: Glide between points; otherwise hold each position
+                until the next point, e.g. to jump at scene cuts
+        
+        Returns:
+            Path to the sendcmd file
+        """
+        positions = [
+            (t, max(0, min(width - crop_width, center_x - crop_width // 2)))
+            for t, center_x in trajectory
+        ]
+        
+        lines = []
+        for (t0, x0), (t1, x1) in zip(positions, positions[1:]):
+            if x0 == x1 or not interpolate:
+                lines.append(f"{t0:.3f} crop x {x0};")
+            else:
+                lines.append(f"{t0:.3f} crop x '{x0}+({x1 - x0})*(t-{t0:.3f})/{t1 - t0:.3f}';")
+        lines.append(f"{positions[-1][0]:.3f} crop x {positions[-1][1]};")
+        
+        commands_path = os.path.join(self.temp_dir, f"{Path(input_path).stem}_crop.cmd")
+        with open(commands_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        
+        self.logger.info(f"Crop trajectory with {len(positions)} points written to {commands_path}")
+        return commands_path
+    
+    def _apply_9_16_filters(self, video, crop: Tuple[int, int, int, int, Optional[str]]):
+        """
+        Apply the 9:16 crop and scale filters to a video stream.
+        
+        Args:
+            video: ffmpeg-python video stream
+            crop: Crop plan from _calculate_9_16_crop
+        
+        Returns:
+            Filtered ffmpeg-python stream
+        """
+        crop_width, crop_height, crop_x, crop_y, crop_commands = crop
+        
+        if crop_commands:
+            video = video.filter('sendcmd', f=crop_commands)
+        
+        return (
+            video
+            .filter('crop', crop_width, crop_height, crop_x, crop_y)
+            .filter('scale', 1080, 1920)
+        )
+    
+    def _apply_16_9_filters(self, video, width: int, height: int, fps: float = 30.0):
+        """
+        Apply the blurred letterbox filters to a 9:16 video stream.
+        
+        Args:
+            video: ffmpeg-python video stream
+            width: Original video width
+            height: Original video height
+            fps: Original frame rate
+        
+        Returns:
+            Filtered ffmpeg-python stream
+        """
+        # Target 16:9 resolution (1920x1080)
+        target_width = 1920
+        target_height = 1080
+        
+        # Calculate scaling for the main video (maintain aspect ratio)
+        scale_factor = min(target_width / width, target_height / height)
+        scaled_width = int(width * scale_factor)
+        scaled_height = int(height * scale_factor)
+        
+        # Calculate positioning (center the video)
+        x_offset = (target_width - scaled_width) // 2
+        y_offset = (target_height - scaled_height) // 2
+        
+        self.logger.info(f"Converting 9:16 to 16:9: scaling to {scaled_width}x{scaled_height}, offset ({x_offset}, {y_offset})")
+        
+        # Filter outputs can only be consumed once, so split for background and foreground
+        branches = video.split()
+        
+        if self.blur_mode == 'gblur':
             # Create blurred background (scaled and heavily blurred)
             background = (
-                main_video
+                branches[0]
                 .filter('scale', target_width, target_height)
                 .filter('gblur', sigma=50)
             )
-            
-            # Scale main video to fit
-            foreground = (
-                main_video
-                .filter('scale', scaled_width, scaled_height)
-            )
-            
-            # Overlay main video on blurred background
-            output_stream = ffmpeg.overlay(background, foreground, x=x_offset, y=y_offset)
-            
-            (
-                output_stream
-                .output(
-                    output_path,
-                    vcodec='libx264',
-                    acodec='aac',
-                    video_bitrate=self.video_bitrate,
-                    audio_bitrate=self.audio_bitrate,
-                    movflags='faststart'
-                )
-                .overwrite_output()
-                .run(quiet=True)
+        else:
+            # Blur at 1/8 scale; a small box blur there matches gblur sigma=50 at full size
+            background = branches[0].filter('scale', target_width // 8, target_height // 8)
+            if self.background_fps:
+                background = background.filter('fps', self.background_fps)
+            background = (
+                background
+                .filter('boxblur', luma_radius=6, luma_power=2)
+                .filter('scale', target_width, target_height)
             )
-            
-            self.logger.info(f"Created 16:9 version: {output_path}")
-            return output_path
-            
-        except Exception as e:
-            self.logger.error(f"Failed to convert 9:16 to 16:9: {e}")
-            return None
+            if self.background_fps:
+                # overlay follows the background's timing, so repeat frames back up to the source rate
+                background = background.filter('fps', fps)
+        
+        # Scale main video to fit
+        foreground = (
+            branches[1]
+            .filter('scale', scaled_width, scaled_height)
+        )
+        
+        # Overlay main video on blurred background
+        return ffmpeg.overlay(background, foreground, x=x_offset, y=y_offset)
+    
+    def _get_cache_params(self, category: Optional[str] = None) -> dict:
+        """
+        Get the settings that determine output content, for result caching.
+        
+        Args:
+            category: Webhook category (optional)
+        
+        Returns:
+            Dictionary of encoding parameters
+        """
+        return {
+            'video_bitrate': self.video_bitrate,
+            'audio_bitrate': self.audio_bitrate,
+            'vcodec': 'libx264',
+            'acodec': 'aac',
+            'resolution_9_16': (1080, 1920),
+            'resolution_16_9': (1920, 1080),
+            'crop_mode': self.crop_mode,
+            'stream_copy': self.stream_copy,
+            'segment_threshold': self.segment_threshold,
+            'blur_mode': self.blur_mode,
+            'background_fps': self.background_fps,
+            'detector': self.face_detector.get_detector_params(),
+            'adaptive_crop_tolerance': self.adaptive_crop_tolerance,
+            # HLS forces keyframes on segment boundaries in the MP4s
+            'hls_segment_seconds': self.hls_segment_seconds if self.hls_ladder else None,
+            'profiles': {
+                aspect: getattr(self._get_profile(aspect, category), 'name', None)
+                for aspect in ("16:9", "9:16")
+            }
+        }
     
-    def batch_process(self, input_dir: str) -> dict:
+    def _get_profile(self, aspect_ratio: str, category: Optional[str] = None) -> Optional[EncodingProfile]:
+        """
+        Choose the encoding profile for one output.
+        
+        Args:
+            aspect_ratio: Output aspect ratio ('16:9' or '9:16')
+            category: Webhook category (optional; only used with
+                category_profiles enabled)
+        
+        Returns:
+            EncodingProfile, or None for the plain bitrate settings
+        """
+        category_profile = CATEGORY_PROFILES.get(category, {}).get(aspect_ratio) if self.category_profiles else None
+        name = self.output_profiles.get(aspect_ratio) or category_profile or self.profile
+        return get_profile(name) if name else None
+    
+    def _get_output_options(self,
+                            aspect_ratio: Optional[str] = None,
+                            media_info: Optional[MediaInfo] = None,
+                            category: Optional[str] = None) -> dict:
+        """
+        Get the encoder options for an MP4 output.
+        
+        Args:
+            aspect_ratio: Output aspect ratio, selects the encoding profile
+                (optional)
+            media_info: Probe results for the input, for GOP sizing (optional)
+            category: Webhook category (optional)
+        
+        Returns:
+            Dictionary of ffmpeg output keyword arguments
+        """
+        profile = self._get_profile(aspect_ratio, category) if aspect_ratio else None
+        
+        if profile:
+            options = profile.get_video_options(self.video_bitrate, media_info.fps if media_info else None)
+        else:
+            options = {
+                'vcodec': 'libx264',
+                'video_bitrate': self.video_bitrate
+            }
+        
+        options.update({
+            'acodec': 'aac',
+            'audio_bitrate': self.audio_bitrate,
+            'movflags': 'faststart'
+        })
+        
+        # The HLS top rung is this MP4's video, so its segments follow these keyframes
+        if self.hls_packager:
+            options.update(self.hls_packager.get_keyframe_options())
+        
+        # The batch thread budget is an upper bound on the profile's threads
+        threads = [t for t in (self.ffmpeg_threads, profile and profile.threads) if t]
+        if threads:
+            options['threads'] = min(threads)
+        
+        return options
+    
+    def batch_process(self, input_dir: str, force: bool = False) -> dict:
         """
         Process all videos in input directory.
         
+        Videos are distributed over a pool of worker processes sized by
+        ``max_workers``. Each worker gets an equal share of the CPU cores as
+        its ffmpeg thread budget so concurrent encodes don't oversubscribe.
+        
+        With a batch manifest, inputs already processed with the current
+        encoding parameters are skipped, and each result is recorded as soon
+        as it finishes so an interrupted batch resumes where it stopped.
+        
         Args:
             input_dir: Directory containing input videos
-            
+            force: Reprocess inputs the manifest lists as done
+        
         Returns:
             Dictionary with processing results
         """
         results = {
             'processed': [],
             'failed': [],
-            'skipped': []
+            'skipped': [],
+            'unchanged': []
         }
         
         input_path = Path(input_dir)
         if not input_path.exists():
             raise ValueError(f"Input directory does not exist: {input_dir}")
         
-        # Find all video files
-        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.m4v'}
-        video_files = []
+        video_files = find_video_files(input_dir)
         
-        for ext in video_extensions:
-            video_files.extend(input_path.glob(f'**/*{ext}'))
-            video_files.extend(input_path.glob(f'**/*{ext.upper()}'))
-        
-        self.logger.info(f"Found {len(video_files)} video files to process")
+        self.logger.info(f"Found {len(video_files)} video files")
         
+        pending = []
+        params_keys = {}
         for video_file in video_files:
-            try:
-                if validate_video_file(str(video_file)):
-                    output_files = self.process_video(str(video_file))
-                    results['processed'].append({
-                        'input': str(video_file),
-                        'outputs': output_files
-                    })
-                else:
-                    results['skipped'].append(str(video_file))
-                    
-            except Exception as e:
-                self.logger.error(f"Failed to process {video_file}: {e}")
-                results['failed'].append({
-                    'input': str(video_file),
-                    'error': str(e)
-                })
+            if not validate_video_file(video_file):
+                results['skipped'].append(video_file)
+                continue
+            
+            if self.manifest:
+                # HLS ladders and thumbnails are not cached, but are part of a finished batch input
+                params_keys[video_file] = BatchManifest.make_params_key(dict(
+                    self._get_cache_params(get_category_from_path(video_file)),
+                    hls_ladder=self.hls_ladder,
+                    hls_segment_seconds=self.hls_segment_seconds if self.hls_ladder else None,
+                    thumbnail_format=self.thumbnail_format if self.thumbnails else None
+                ))
+                if not force and self.manifest.is_current(video_file, params_keys[video_file], self._get_expected_outputs(video_file)):
+                    results['unchanged'].append(video_file)
+                    continue
+            
+            pending.append(video_file)
+        
+        self.logger.info(f"Processing {len(pending)} videos, {len(results['unchanged'])} unchanged since the last batch")
+        
+        workers = min(self.max_workers, len(pending)) if pending else 1
+        
+        if workers <= 1:
+            for video_file in pending:
+                self._record_batch_start(video_file, params_keys)
+                try:
+                    output_files = self.process_video(video_file, get_category_from_path(video_file))
+                    self._record_batch_result(results, video_file, output_files)
+                except Exception as e:
+                    self._record_batch_result(results, video_file, error=e)
+        else:
+            threads = self.ffmpeg_threads or get_thread_budget(workers)
+            self.logger.info(f"Processing with {workers} workers, {threads} ffmpeg threads each")
+            
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self._get_worker_config(threads),)
+            ) as executor:
+                futures = {}
+                for video_file in pending:
+                    self._record_batch_start(video_file, params_keys)
+                    future = executor.submit(_process_in_worker, video_file, get_category_from_path(video_file))
+                    futures[future] = video_file
+                
+                for future in as_completed(futures):
+                    video_file = futures[future]
+                    try:
+                        self._record_batch_result(results, video_file, future.result())
+                    except Exception as e:
+                        self._record_batch_result(results, video_file, error=e)
         
         # Cleanup temp files
         cleanup_temp_files(self.temp_dir)
         
         return results
+    
+    def _record_batch_start(self, video_file: str, params_keys: dict) -> None:
+        """
+        Mark a batch input as started in the manifest.
+        
+        Args:
+            video_file: Path to input video file
+            params_keys: Manifest parameters key per input
+        """
+        if self.manifest:
+            self.manifest.mark_running(video_file, params_keys[video_file])
+    
+    def _record_batch_result(self, results: dict, video_file: str, output_files: Optional[List[str]] = None, error: Optional[Exception] = None) -> None:
+        """
+        Add the result of a batch input to the results and the manifest.
+        
+        An input that finished without one of its aspect versions counts as
+        failed, so the next batch retries it.
+        
+        Args:
+            results: Batch results dictionary
+            video_file: Path to input video file
+            output_files: Output files of a successful input
+            error: Exception of a failed input
+        """
+        if error is None:
+            missing = [path for path in self._get_expected_outputs(video_file) if path not in (output_files or [])]
+            if missing:
+                error = RuntimeError(f"Missing outputs: {', '.join(missing)}")
+        
+        if error is None:
+            results['processed'].append({
+                'input': video_file,
+                'outputs': output_files
+            })
+            if self.manifest:
+                self.manifest.mark_done(video_file, output_files)
+        else:
+            self.logger.error(f"Failed to process {video_file}: {error}")
+            results['failed'].append({
+                'input': video_file,
+                'error': str(error)
+            })
+            if self.manifest:
+                self.manifest.mark_failed(video_file, str(error))
+    
+    def _get_expected_outputs(self, video_file: str) -> List[str]:
+        """
+        Get the MP4 outputs a complete run creates for an input.
+        
+        Args:
+            video_file: Path to input video file
+        
+        Returns:
+            Output paths of both aspect versions
+        """
+        return [os.path.join(self.output_dir, get_output_filename(video_file, aspect)) for aspect in ("16:9", "9:16")]
+    
+    def _get_worker_config(self, threads: int) -> dict:
+        """
+        Get constructor arguments for a transcoder running in a worker process.
+        
+        Args:
+            threads: ffmpeg thread budget for each encode in the worker
+        
+        Returns:
+            Dictionary of VideoTranscoder keyword arguments
+        """
+        return {
+            'temp_dir': self.temp_dir,
+            'output_dir': self.output_dir,
+            'video_bitrate': self.video_bitrate,
+            'audio_bitrate': self.audio_bitrate,
+            'single_decode': self.single_decode,
+            'max_workers': 1,
+            'ffmpeg_threads': threads,
+            'crop_mode': self.crop_mode,
+            'cache_dir': self.cache_dir,
+            'cache_max_bytes': self.cache_max_bytes,
+            'stream_copy': self.stream_copy,
+            'segment_threshold': self.segment_threshold,
+            'segment_count': self.segment_count,
+            'blur_mode': self.blur_mode,
+            'background_fps': self.background_fps,
+            'profile': self.profile,
+            'output_profiles': self.output_profiles,
+            'category_profiles': self.category_profiles,
+            'metrics_dir': self.metrics_dir,
+            'progress_callback': self.progress_callback,
+            'stall_timeout': self.stall_timeout,
+            'hls_ladder': self.hls_ladder,
+            'hls_segment_seconds': self.hls_segment_seconds,
+            'thumbnails': self.thumbnails,
+            'thumbnail_format': self.thumbnail_format,
+            'analysis_cache': self.analysis_cache,
+            'detector': self.detector,
+            'detector_model': self.detector_model,
+            'detector_config': self.detector_config,
+            'subject_fallback': self.subject_fallback,
+            'adaptive_crop_tolerance': self.adaptive_crop_tolerance
+        }
+
+
+# Transcoder owned by the current worker process
+_worker_transcoder: Optional[VideoTranscoder] = None
+
+def _init_worker(config: dict) -> None:
+    """Create the warm per-process transcoder used by pool workers."""
+    global _worker_transcoder
+    _worker_transcoder = VideoTranscoder(**config)
+
+def _process_in_worker(input_path: str, category: Optional[str] = None) -> list[str]:
+    """Process a single video inside a worker process."""
+    return _worker_transcoder.process_video(input_path, category)
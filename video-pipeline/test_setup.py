@@ -3,6 +3,7 @@
 Test script to validate Video Transcoder Pipeline setup
 """
 
+import importlib
 import os
 import sys
 import subprocess
@@ -123,19 +124,20 @@ def test_imports():
     """Test if source modules can be imported."""
     print("\nTesting module imports...")
     
-    sys.path.insert(0, 'src')
+    # Modules use package-relative imports, so import them through src
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
     
     modules = [
-        ('utils', 'setup_logging'),
-        ('face_detector', 'FaceDetector'),
-        ('video_transcoder', 'VideoTranscoder')
+        ('src.utils', 'setup_logging'),
+        ('src.face_detector', 'FaceDetector'),
+        ('src.video_transcoder', 'VideoTranscoder')
     ]
     
     all_imported = True
     
     for module_name, class_name in modules:
         try:
-            module = __import__(module_name)
+            module = importlib.import_module(module_name)
             if hasattr(module, class_name):
                 print(f"  ✓ {module_name}.{class_name}")
             else:
@@ -19,6 +19,10 @@ cp webhook-server-fixed.js webhook-server.js
 echo "🔄 Restarting webhook server..."
 pm2 restart video-webhook
 
+# Restart the queue worker that processes webhook jobs
+echo "🔄 Restarting transcoder service..."
+pm2 restart video-transcoder || pm2 start main.py --name video-transcoder --interpreter python3 -- --serve
+
 # Save PM2 configuration
 pm2 save
 
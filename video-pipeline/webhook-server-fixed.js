@@ -2,7 +2,6 @@ const express = require('express');
 const multer = require('multer');
 const path = require('path');
 const fs = require('fs');
-const { spawn } = require('child_process');
 const https = require('https');
 const http = require('http');
 const { URL } = require('url');
@@ -39,6 +38,31 @@ const upload = multer({
   limits: { fileSize: 500 * 1024 * 1024 } // 500MB
 });
 
+// Job queue shared with the Python transcoder service (python3 main.py --serve)
+const QUEUE_DIR = process.env.QUEUE_DIR || path.join(__dirname, 'queue');
+
+// Enqueue a video for the transcoder service. The job is written to a hidden
+// temp file and renamed into place so the worker never reads a partial job.
+function enqueueJob(inputPath, category) {
+  const pendingDir = path.join(QUEUE_DIR, 'pending');
+  fs.mkdirSync(pendingDir, { recursive: true });
+  
+  const jobId = `${Date.now()}_${Math.random().toString(16).slice(2, 10).padEnd(8, '0')}`;
+  const job = {
+    id: jobId,
+    input: path.resolve(inputPath),
+    category: category,
+    created_at: Date.now() / 1000
+  };
+  
+  const tmpPath = path.join(pendingDir, `.${jobId}.tmp`);
+  fs.writeFileSync(tmpPath, JSON.stringify(job));
+  fs.renameSync(tmpPath, path.join(pendingDir, `${jobId}.json`));
+  
+  console.log(`🗂️  Queued transcode job ${jobId}`);
+  return jobId;
+}
+
 // Helper function to download video from URL with redirect support
 function downloadVideo(videoUrl, destination, redirectCount = 0) {
   return new Promise((resolve, reject) => {
@@ -191,22 +215,15 @@ async function processVideoFromUrl(req, res, category) {
       throw downloadError;
     }
     
-    // Trigger Python transcoder
-    const pythonProcess = spawn('python3', ['main.py', '--input', downloadPath]);
-    
-    pythonProcess.stdout.on('data', (data) => {
-      console.log(`Transcoder: ${data}`);
-    });
-    
-    pythonProcess.stderr.on('data', (data) => {
-      console.error(`Transcoder Error: ${data}`);
-    });
+    // Hand off to the transcoder service
+    const jobId = enqueueJob(downloadPath, category);
     
     res.json({
       success: true,
-      message: `${category} video downloaded and processing started`,
+      message: `${category} video downloaded and queued for processing`,
       filename: filename,
-      videoUrl: videoUrl
+      videoUrl: videoUrl,
+      jobId: jobId
     });
     
   } catch (error) {
@@ -229,21 +246,14 @@ function processVideoFromUpload(req, res, category) {
   
   console.log(`✅ ${category} video uploaded:`, req.file.filename);
   
-  // Trigger Python transcoder
-  const pythonProcess = spawn('python3', ['main.py', '--input', req.file.path]);
-  
-  pythonProcess.stdout.on('data', (data) => {
-    console.log(`Transcoder: ${data}`);
-  });
-  
-  pythonProcess.stderr.on('data', (data) => {
-    console.error(`Transcoder Error: ${data}`);
-  });
+  // Hand off to the transcoder service
+  const jobId = enqueueJob(req.file.path, path.basename(req.file.destination));
   
   res.json({ 
     success: true, 
-    message: `${category} video uploaded and processing started`,
-    filename: req.file.filename
+    message: `${category} video uploaded and queued for processing`,
+    filename: req.file.filename,
+    jobId: jobId
   });
 }
 